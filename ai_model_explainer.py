@@ -1,8 +1,8 @@
-import pandas as pd
 import numpy as np
-import joblib
-from sklearn.inspection import permutation_importance
-import matplotlib.pyplot as plt
+from functools import cached_property
+from dataset import FEATURES, load_frame
+from forest_compiler import load_compiled
+from scoring import score_patient
 
 # Heart emoji styling
 HEART_DIVIDER = "❤️" * 30
@@ -21,19 +21,25 @@ class AIHeartModelExplainer:
         print("🤖 AI MODEL EXPLAINER INITIALIZED 🤖")
         print(f"{HEART_DIVIDER}\n")
         
-        self.model = joblib.load(model_path)
-        
-        # Load data
-        self.data = pd.read_csv(data_path, header=None, names=[
-            'age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal', 'target'
-        ])
-        
-        self.data = self.data.replace('?', pd.NA).dropna()
-        self.X = self.data.drop('target', axis=1)
-        self.y = self.data['target']
-        
-        self.feature_names = self.X.columns.tolist()
-        
+        self.model = load_compiled(model_path)
+        self.data_path = data_path
+        self.feature_names = list(FEATURES)
+
+    @cached_property
+    def data(self):
+        """Cleaned training rows, memory-mapped from the dataset cache on first use."""
+        return load_frame(self.data_path)
+
+    @cached_property
+    def X(self):
+        """Feature columns of the training rows."""
+        return self.data.drop('target', axis=1)
+
+    @cached_property
+    def y(self):
+        """Binary diagnosis (any degree of disease is 1), as the model was trained on."""
+        return (self.data['target'] != 0).astype(int)
+
     def explain_features(self):
         """Explain what each feature represents and its importance."""
         print(f"\n{HEART_DIVIDER}")
@@ -89,8 +95,9 @@ class AIHeartModelExplainer:
         print("🔮 AI PREDICTION WITH EXPLANATION 🔮")
         print(f"{HEART_DIVIDER}\n")
         
-        prediction = self.model.predict(features)[0]
-        probabilities = self.model.predict_proba(features)[0]
+        result = score_patient(self.model, features)
+        prediction = result['prediction']
+        probabilities = result['probabilities']
         
         prob_no_disease = probabilities[0]
         prob_disease = probabilities[1]
@@ -102,6 +109,7 @@ class AIHeartModelExplainer:
         # Confidence analysis
         confidence = max(prob_disease, prob_no_disease)
         print(f"🎯 Model Confidence: {confidence:.1%}")
+        print(f"🌲 Tree Vote Spread: ±{result['uncertainty']:.1%}")
         
         if confidence < 0.6:
             print("   ⚠️  Low confidence - result should be verified with healthcare professional")
@@ -123,7 +131,7 @@ class AIHeartModelExplainer:
         print(f"  Heart Disease Cases: {(self.y == 1).sum()} ({(self.y == 1).sum()/len(self.y)*100:.1f}%)")
         print(f"  Number of Features: {len(self.feature_names)}")
         print(f"  Model Type: Random Forest Classifier")
-        print(f"  Number of Trees: {len(self.model.estimators_)}")
+        print(f"  Number of Trees: {self.model.n_estimators}")
     
     def generate_report(self):
         """Generate a comprehensive AI analysis report."""
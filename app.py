@@ -1,14 +1,28 @@
 import streamlit as st
-import joblib
 import numpy as np
 import pandas as pd
 import time
 from datetime import datetime
 import csv
 import io
+from model_registry import registry
+from inference_service import connect_model
+from async_inference import DeadlineExceeded, OverloadedError
+from prediction_cache import prediction_cache
+from training import load_metrics
 
-# Load the model
-model = joblib.load('model.pkl')
+# Load the model (cached per process, reloaded only when model.pkl changes),
+# or use the shared inference service when INFERENCE_URL is set
+model = connect_model()
+# Accuracy and AUC of the served model: its published metadata with MODEL_DIR,
+# else what the last training run (python model.py) measured
+model_metrics = load_metrics(registry=registry) or {}
+model_accuracy = f"{model_metrics['accuracy']:.2%}" if 'accuracy' in model_metrics else "N/A"
+if 'test_rows' in model_metrics and 'train_rows' in model_metrics:
+    test_share = f"{model_metrics['test_rows'] / (model_metrics['train_rows'] + model_metrics['test_rows']):.0%}"
+else:
+    test_share = "N/A"
+train_rows = model_metrics.get('train_rows', "N/A")
 
 # Initialize session state
 if 'prediction_history' not in st.session_state:
@@ -162,10 +176,13 @@ st.markdown("""
 # Sidebar with model info
 with st.sidebar:
     st.markdown("### 📊 Model Information")
-    st.metric("🎯 Model Accuracy", "88.33%", help="Accuracy on test set")
+    st.metric("🎯 Model Accuracy", model_accuracy, help="Accuracy on test set")
+    if 'auc' in model_metrics:
+        st.metric("📉 ROC AUC", f"{model_metrics['auc']:.3f}", help="Area under the ROC curve on test set")
     st.metric("🤖 Algorithm", "Random Forest", help="Machine Learning Model")
-    st.metric("🌳 Number of Trees", "100", help="Ensemble estimators")
-    st.metric("📈 Test Set Size", "20%", help="Validation data split")
+    st.metric("🌳 Number of Trees", str(model_metrics.get('n_estimators', 100)),
+              help="Ensemble estimators")
+    st.metric("📈 Test Set Size", test_share, help="Validation data split")
     
     st.markdown("---")
     st.markdown("### � Patient Management")
@@ -223,7 +240,7 @@ with st.sidebar:
 
 # Welcome section
 with st.expander("📖 About This App", expanded=False):
-    st.markdown("""
+    st.markdown(f"""
     🏥 **Welcome to the Heart Disease Prediction System**
     
     This cutting-edge application uses advanced machine learning to assess your heart health risk.
@@ -235,8 +252,8 @@ with st.expander("📖 About This App", expanded=False):
     - 💡 Receive personalized insights
     
     **Model Performance:**
-    - 🎯 **Accuracy: 88.33%** - Highly reliable predictions
-    - 🌳 Trained on 297 patient samples
+    - 🎯 **Accuracy: {model_accuracy}** - Highly reliable predictions
+    - 🌳 Trained on {train_rows} patient samples
     - 📊 13 different health factors analyzed
     
     **Important:** This tool is for educational purposes only. Always consult qualified healthcare professionals.
@@ -451,8 +468,13 @@ with tab1:
             time.sleep(1)
             
             features = np.array([[age, sex, cp, trestbps, chol, fbs, restecg, thalach, exang, oldpeak, slope, ca, thal]])
-            prediction = model.predict(features)[0]
-            prob = model.predict_proba(features)[0]
+            try:
+                result = prediction_cache.score(model, features)
+            except (OverloadedError, DeadlineExceeded):
+                st.warning("⏳ The prediction service is busy right now. Please try again in a moment.")
+                st.stop()
+            prediction = result['prediction']
+            prob = result['probabilities']
             
             prob_no_disease = prob[0]
             prob_disease = prob[1]
@@ -511,6 +533,8 @@ with tab1:
             st.metric("⚠️ Risk Level", risk_level)
         with col_score3:
             st.metric("📊 Confidence", f"{max(prob_disease, prob_no_disease):.1%}")
+            if np.isfinite(result['uncertainty']):
+                st.caption(f"Tree vote spread: ±{result['uncertainty']:.1%}")
         
         # Additional insights
         st.markdown("---")
@@ -1,19 +1,40 @@
 import streamlit as st
-import joblib
 import numpy as np
 import pandas as pd
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 import csv
 import io
 import yaml
 import os
+from pathlib import Path
 from auth import auth
 from prediction_logger import logger
 from pdf_report import pdf_generator
+from model_registry import registry
+from inference_service import connect_model
+from async_inference import DeadlineExceeded, OverloadedError
+from scoring import FEATURES, validation_errors
+from prediction_cache import prediction_cache
+from batch_scoring import RESULT_COLUMNS, BatchLimitError, new_output_file, score_csv
+from training import load_metrics
 
-# Load the model
-model = joblib.load('model.pkl')
+# Load the model (cached per process, reloaded only when model.pkl changes),
+# or use the shared inference service when INFERENCE_URL is set
+model = connect_model()
+# Accuracy and AUC of the served model: its published metadata with MODEL_DIR,
+# else what the last training run (python model.py) measured
+model_metrics = load_metrics(registry=registry) or {}
+model_accuracy = f"{model_metrics['accuracy']:.2%}" if 'accuracy' in model_metrics else "N/A"
+model_auc = f"{model_metrics['auc']:.3f}" if 'auc' in model_metrics else "N/A"
+
+# Batch scoring limits: rows per chunk, maximum rows per upload, and maximum
+# scored output per session. Scored files are written to disk and only read
+# into memory when the user clicks download, so the output cap bounds that copy.
+BATCH_CHUNK_ROWS = 50_000
+BATCH_MAX_ROWS = int(os.environ.get("BATCH_MAX_ROWS", 1_000_000))
+BATCH_MAX_OUTPUT_BYTES = int(os.environ.get("BATCH_MAX_OUTPUT_MB", 64)) * 1024 * 1024
+BATCH_OUTPUT_TTL = float(os.environ.get("BATCH_OUTPUT_TTL", 3600))
 
 # Page configuration
 st.set_page_config(
@@ -228,27 +249,8 @@ def login_page():
 # Validate input function
 def validate_input(age, gender, cp, trtbps, chol, fbs, restecg, thalachh, exng, oldpeak, slp, caa, thall):
     """Validate user inputs with comprehensive checks"""
-    errors = []
-    
-    if age < 18 or age > 120:
-        errors.append("Age must be between 18 and 120 years")
-    
-    if trtbps < 80 or trtbps > 250:
-        errors.append("Blood Pressure must be between 80-250 mmHg")
-    
-    if chol < 0 or chol > 600:
-        errors.append("Cholesterol must be between 0-600 mg/dL")
-    
-    if thalachh < 40 or thalachh > 220:
-        errors.append("Max Heart Rate must be between 40-220 bpm")
-    
-    if oldpeak < 0 or oldpeak > 10:
-        errors.append("ST Depression must be between 0-10")
-    
-    if caa < 0 or caa > 4:
-        errors.append("Major Vessels must be between 0-4")
-    
-    return errors
+    values = dict(zip(FEATURES, [age, gender, cp, trtbps, chol, fbs, restecg, thalachh, exng, oldpeak, slp, caa, thall]))
+    return validation_errors(values)
 
 # Main app
 def main_app():
@@ -280,10 +282,12 @@ def main_app():
         st.markdown("---")
         
         st.markdown("### 📊 Model Information")
-        st.info("""
+        st.info(f"""
         **Algorithm:** Random Forest Classifier
-        **Accuracy:** 88.33%
+        **Accuracy:** {model_accuracy}
+        **ROC AUC:** {model_auc}
         **Features:** 13 cardiac indicators
+        **Version:** {registry.version}
         **Status:** ✅ Trained & Ready
         """)
         
@@ -315,7 +319,7 @@ def main_app():
             st.rerun()
     
     # Main tabs
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["🩺 Prediction", "📊 Dashboard", "📝 Notes & Goals", "❓ Health Tips", "⚙️ Analytics"])
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["🩺 Prediction", "📊 Dashboard", "📝 Notes & Goals", "❓ Health Tips", "⚙️ Analytics", "📦 Batch Scoring"])
     
     # TAB 1: Prediction
     with tab1:
@@ -340,7 +344,7 @@ def main_app():
             oldpeak = st.number_input("📉 ST Depression (induced by exercise)", min_value=0.0, max_value=10.0, value=0.0, step=0.1)
         
         with col3:
-            caa = st.selectbox("🩻 Major Vessels", options=[0, 1, 2, 3, 4], value=0)
+            caa = st.selectbox("🩻 Major Vessels", options=[0, 1, 2, 3, 4], index=0)
             thall = st.selectbox("🧪 Thalassemia", options=[0, 1, 2, 3], 
                                 format_func=lambda x: ["Normal", "Fixed Defect", "Reversible Defect", "Unknown"][x])
             slp = st.selectbox("📊 Slope of ST Segment", options=[0, 1, 2], 
@@ -376,22 +380,16 @@ def main_app():
                 input_data = np.array([[age, gender, cp, trtbps, chol, fbs, restecg, 
                                        thalachh, exng, oldpeak, slp, caa, thall]])
                 
-                # Make prediction
-                prediction = model.predict(input_data)[0]
-                probability = model.predict_proba(input_data)[0]
-                
-                # Calculate health score
-                health_score = max(0, 100 - (prediction * 50) - (probability[1] * 50))
-                
-                # Determine risk level
-                if probability[1] >= 0.8:
-                    risk_level = "🔴 CRITICAL"
-                elif probability[1] >= 0.6:
-                    risk_level = "🟠 HIGH"
-                elif probability[1] >= 0.4:
-                    risk_level = "🟡 MODERATE"
-                else:
-                    risk_level = "🟢 LOW"
+                # Make prediction (one cached pass gives class, probability, risk level and health score)
+                try:
+                    result = prediction_cache.score(model, input_data)
+                except (OverloadedError, DeadlineExceeded):
+                    st.warning("⏳ The prediction service is busy right now. Please try again in a moment.")
+                    st.stop()
+                prediction = result['prediction']
+                probability = result['probabilities']
+                health_score = result['health_score']
+                risk_level = result['risk_level']
                 
                 # Log prediction
                 patient_data = {
@@ -400,7 +398,7 @@ def main_app():
                     'exng': exng, 'oldpeak': oldpeak, 'slp': slp, 'caa': caa, 'thall': thall
                 }
                 
-                logger.log_prediction(patient_data, prediction, probability[1], risk_level)
+                log_entry = logger.log_prediction(patient_data, prediction, probability[1], risk_level)
                 
                 # Store in history
                 st.session_state.prediction_history.append({
@@ -446,6 +444,10 @@ def main_app():
                     - Continue preventive measures
                     """)
                 
+                if np.isfinite(result['uncertainty']):
+                    st.caption(f"Model uncertainty: individual trees vary by ±{result['uncertainty']*100:.1f}% around this probability")
+                st.caption(f"Prediction ID: `{log_entry['id']}` (quote it when recording the confirmed diagnosis)")
+                
                 # Export options
                 col1, col2, col3 = st.columns(3)
                 
@@ -629,14 +631,20 @@ def main_app():
             
             st.markdown("---")
             
-            col1, col2 = st.columns(2)
+            col1, col2, col3 = st.columns(3)
             
             with col1:
                 st.metric("Average Probability", f"{stats['avg_probability']*100:.1f}%")
             
             with col2:
+                st.metric("Probability Std Dev", f"{stats['std_probability']*100:.1f}%")
+            
+            with col3:
                 st.metric("Prediction Rate", f"{stats['positive_cases']/max(1, stats['total_predictions'])*100:.1f}%")
             
+            st.markdown("#### Risk Level Distribution")
+            st.bar_chart(pd.Series(stats['risk_level_counts'], name="Predictions"))
+            
             st.info("""
             **Prediction Logs:**
             - First Prediction: """ + stats['first_prediction'] + """
@@ -644,6 +652,109 @@ def main_app():
             """)
         else:
             st.info("No prediction logs available yet.")
+        
+        if logger.store.backend == "sqlite":
+            st.markdown("---")
+            st.markdown("#### 🔎 Query Prediction Log")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                days = st.number_input("Last N days", min_value=1, max_value=3650, value=7)
+            with col2:
+                risk_filter = st.multiselect("Risk Level", ["🔴 CRITICAL", "🟠 HIGH", "🟡 MODERATE", "🟢 LOW"],
+                                             default=["🔴 CRITICAL", "🟠 HIGH"])
+            with col3:
+                min_age = st.number_input("Minimum Age", min_value=0, max_value=120, value=60)
+            
+            since = (datetime.now() - timedelta(days=days)).isoformat()
+            matches = logger.store.query(start=since, risk_levels=risk_filter, min_age=min_age)
+            st.write(f"**{logger.store.count(start=since, risk_levels=risk_filter, min_age=min_age)}** matching predictions")
+            if matches:
+                st.dataframe(pd.DataFrame(matches), use_container_width=True)
+            
+            daily = logger.store.daily_counts(start=since)
+            if daily:
+                st.line_chart(pd.DataFrame(daily).set_index('day'))
+        
+        with st.expander("🗄️ Logging Health"):
+            log_metrics = logger.metrics()
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Queue Depth", log_metrics['queue_depth'])
+            with col2:
+                st.metric("Avg Flush Latency", f"{log_metrics['avg_flush_latency']*1000:.2f} ms")
+            with col3:
+                st.metric("Max Flush Latency", f"{log_metrics['max_flush_latency']*1000:.2f} ms")
+        
+        with st.expander("⚡ Prediction Cache"):
+            cache_stats = prediction_cache.stats()
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Cached Results", f"{cache_stats['size']}/{cache_stats['max_size']}")
+            with col2:
+                st.metric("Hit Rate", f"{cache_stats['hit_rate']*100:.1f}%")
+            with col3:
+                st.metric("Hits / Misses", f"{cache_stats['hits']} / {cache_stats['misses']}")
+            with col4:
+                st.metric("Evictions", cache_stats['evictions'])
+
+    # TAB 6: Batch Scoring
+    with tab6:
+        st.markdown("### 📦 Batch Scoring")
+        st.write("Upload a CSV with one patient per row to score a whole roster at once.")
+        st.caption("Required columns: " + ", ".join(FEATURES) +
+                   " (training-data names such as sex, trestbps, thalach, exang, slope, ca, thal are also accepted)")
+        
+        uploaded = st.file_uploader("📤 Patient CSV", type=["csv"])
+        
+        if uploaded is not None and st.button("⚡ Score Batch", use_container_width=True):
+            # Progress follows the read position in the upload, so it is never copied just to count rows
+            upload_bytes = max(1, uploaded.size)
+            progress_bar = st.progress(0.0, text="Scoring patients...")
+            # One scored file per session on disk; the previous batch's file is replaced
+            previous = st.session_state.pop("batch_output_path", None)
+            if previous and os.path.exists(previous):
+                os.remove(previous)
+            # Also clears files left by sessions idle for longer than BATCH_OUTPUT_TTL
+            fd, output_path = new_output_file(BATCH_OUTPUT_TTL)
+            uploaded.seek(0)
+            
+            try:
+                with os.fdopen(fd, "w", newline="") as output:
+                    summary = score_csv(
+                        model, uploaded, output,
+                        chunksize=BATCH_CHUNK_ROWS,
+                        max_rows=BATCH_MAX_ROWS,
+                        max_output_bytes=BATCH_MAX_OUTPUT_BYTES,
+                        progress=lambda done: progress_bar.progress(min(1.0, uploaded.tell() / upload_bytes),
+                                                                    text=f"Scored {done:,} patients")
+                    )
+            except (BatchLimitError, ValueError) as e:
+                os.remove(output_path)
+                st.error(f"❌ {e}")
+            else:
+                st.session_state.batch_output_path = output_path
+                progress_bar.progress(1.0, text=f"✅ Scored {summary['rows']:,} patients")
+                
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Rows", f"{summary['rows']:,}")
+                with col2:
+                    st.metric("Valid", f"{summary['valid_rows']:,}")
+                with col3:
+                    st.metric("Invalid", f"{summary['invalid_rows']:,}")
+                with col4:
+                    st.metric("High Risk Cases", f"{summary['positive_cases']:,}")
+                
+                if summary['risk_level_counts']:
+                    st.bar_chart(pd.Series(summary['risk_level_counts'], name="Patients"))
+                
+                preview = pd.read_csv(output_path, nrows=20)
+                st.dataframe(preview[[c for c in preview.columns if c not in RESULT_COLUMNS] + RESULT_COLUMNS],
+                             use_container_width=True)
+                
+                # Deferred: the file is read from disk only when the download is requested
+                st.download_button("📥 Download Scored CSV", lambda: Path(output_path).read_bytes(),
+                                   "scored_patients.csv", "text/csv", on_click="ignore")
 
 # Main execution
 if __name__ == "__main__":
@@ -0,0 +1,306 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from model_registry import registry
+from scoring import FEATURES
+
+
+class OverloadedError(RuntimeError):
+    """Raised when a request is rejected because too many are already waiting"""
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request could not be answered before its deadline"""
+
+
+def _score_in_worker(rows):
+    """Score rows in an executor process using that process's own registry"""
+    return registry.get_model().predict_proba_with_std(rows)
+
+
+class AsyncPredictor:
+    """Admission-controlled asyncio front end for the model.
+
+    At most max_concurrency scoring calls run at once, on a thread pool (or
+    a process pool with use_processes=True) so the event loop never blocks
+    on the forest. Up to max_queue further requests may wait for a slot;
+    beyond that new requests fail immediately with OverloadedError instead
+    of piling up. Every request has a deadline covering both the wait and
+    the scoring; when it passes the caller gets DeadlineExceeded. A slot is
+    only freed when its scoring call has really finished, so abandoned
+    work still counts against the concurrency limit.
+    """
+
+    def __init__(self, model_provider=registry.get_model, max_concurrency=None, max_queue=64, deadline=1.0,
+                 use_processes=False, latency_window=10000):
+        self.model_provider = model_provider
+        self.max_concurrency = max_concurrency or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.use_processes = use_processes
+        if use_processes:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_concurrency)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="async-predict")
+        self._slots = None
+        self._slots_loop = None
+        self._latencies = deque(maxlen=latency_window)
+        self.queued = 0
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _score(self, rows):
+        return self.model_provider().predict_proba_with_std(rows)
+
+    def _loop_slots(self):
+        """Concurrency semaphore for the running loop (asyncio primitives are bound to one loop)"""
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._slots_loop = loop
+        return self._slots
+
+    async def predict_proba_with_std(self, X, deadline=None):
+        """Score rows (or one row) of 13 features; returns (probabilities, std across trees)"""
+        rows = np.asarray(X, dtype=np.float64)
+        rows = rows.reshape(1, -1) if rows.ndim == 1 else rows
+        if rows.ndim != 2 or rows.shape[1] != len(FEATURES):
+            raise ValueError(f"Expected {len(FEATURES)} features per row, got shape {rows.shape}")
+
+        slots = self._loop_slots()
+        start = time.perf_counter()
+        timeout = self.deadline if deadline is None else deadline
+        if not slots.locked():
+            # A free slot is taken without suspending, so no other request can claim it first
+            self.admitted += 1
+            await slots.acquire()
+        elif self.queued >= self.max_queue:
+            self.rejected += 1
+            raise OverloadedError(f"Server overloaded: {self.queued} requests already waiting "
+                                  f"(limit {self.max_queue})")
+        else:
+            self.admitted += 1
+            self.queued += 1
+            try:
+                await asyncio.wait_for(slots.acquire(), timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise DeadlineExceeded(f"No capacity within the {timeout:.3f}s deadline") from None
+            finally:
+                self.queued -= 1
+
+        self.in_flight += 1
+        loop = asyncio.get_running_loop()
+        if self.use_processes:
+            future = loop.run_in_executor(self._executor, _score_in_worker, rows)
+        else:
+            future = loop.run_in_executor(self._executor, self._score, rows)
+
+        def release(_):
+            self.in_flight -= 1
+            slots.release()
+
+        future.add_done_callback(release)
+        remaining = None if timeout is None else max(timeout - (time.perf_counter() - start), 0)
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), remaining)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise DeadlineExceeded(f"Scoring did not finish within the {timeout:.3f}s deadline") from None
+        except Exception:
+            self.failed += 1
+            raise
+        self.completed += 1
+        self._latencies.append(time.perf_counter() - start)
+        return result
+
+    async def predict_proba(self, X, deadline=None):
+        return (await self.predict_proba_with_std(X, deadline))[0]
+
+    def stats(self):
+        """Admission counters, current occupancy and latency percentiles (ms) of completed requests"""
+        latencies = np.array(self._latencies) * 1000
+        stats = {
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "completed": self.completed,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
+        for p in (50, 95, 99):
+            stats[f"p{p}_ms"] = float(np.percentile(latencies, p)) if len(latencies) else None
+        return stats
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class AsyncInferenceServer:
+    """Minimal asyncio HTTP server speaking the same JSON API as inference_service.
+
+    POST /predict ({"instances": [...]} or {"features": [...]}, optional
+    "deadline_ms"), GET /metrics and GET /health. Overload answers 503 with
+    Retry-After and a missed deadline answers 504, so InferenceClient and
+    the apps can point INFERENCE_URL at either server. Any other failure
+    (a model that raises, a broken process pool) answers 500 and is counted
+    as internal_errors in /metrics.
+    """
+
+    def __init__(self, predictor, host="127.0.0.1", port=8601):
+        self.predictor = predictor
+        self.host = host
+        self.port = port
+        self.internal_errors = 0
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _route(self, method, path, body):
+        if method == "GET" and path == "/metrics":
+            return 200, {**self.predictor.stats(), "internal_errors": self.internal_errors}
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok", "model_version": registry.version}
+        if method != "POST" or path != "/predict":
+            return 404, {"error": "not found"}
+        try:
+            payload = json.loads(body)
+            instances = payload["instances"] if "instances" in payload else [payload["features"]]
+            deadline = payload.get("deadline_ms")
+            proba, std = await self.predictor.predict_proba_with_std(
+                instances, None if deadline is None else deadline / 1000)
+        except OverloadedError as e:
+            return 503, {"error": str(e)}
+        except DeadlineExceeded as e:
+            return 504, {"error": str(e)}
+        except (KeyError, ValueError, TypeError) as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            self.internal_errors += 1
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+        return 200, {"probabilities": proba.tolist(), "std": std.tolist(), "model_version": registry.version}
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if len(request_line) < 2:
+                status, payload = 400, {"error": "malformed request"}
+            else:
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, payload = await self._route(request_line[0], request_line[1], body)
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            # Never reset the connection without an answer
+            self.internal_errors += 1
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+
+        body = json.dumps(payload).encode("utf-8")
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error",
+                  503: "Service Unavailable", 504: "Gateway Timeout"}[status]
+        head = [f"HTTP/1.1 {status} {reason}", "Content-Type: application/json",
+                f"Content-Length: {len(body)}", "Connection: close"]
+        if status == 503:
+            head.append("Retry-After: 1")
+        try:
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+def serve(host="127.0.0.1", port=8601, max_concurrency=None, max_queue=64, deadline=1.0, use_processes=False,
+          on_start=None):
+    """Run the asyncio inference server until interrupted"""
+    # Load the model up front so the first requests don't pay for it
+    registry.get_model()
+    if registry.store:
+        registry.start_watcher()
+    predictor = AsyncPredictor(max_concurrency=max_concurrency, max_queue=max_queue, deadline=deadline,
+                               use_processes=use_processes)
+
+    async def main():
+        server = await AsyncInferenceServer(predictor, host, port).start()
+        if on_start:
+            on_start(server)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    finally:
+        predictor.close()
+
+
+async def run_load(predictor, concurrency, duration=2.0, seed=0, retry_after=0.005):
+    """Closed-loop load: concurrency clients sending single rows for duration seconds.
+
+    Rejected clients back off for retry_after seconds, like a client
+    honouring Retry-After. Returns latency percentiles (ms) of successful
+    requests plus success/reject/timeout counts and throughput.
+    """
+    rng = np.random.default_rng(seed)
+    low = [29, 0, 0, 94, 126, 0, 0, 71, 0, 0, 0, 0, 0]
+    high = [77, 1, 3, 200, 564, 1, 2, 202, 1, 6.2, 2, 3, 3]
+    rows = rng.uniform(low, high, size=(1024, 13)).round(1)
+    latencies = []
+    counts = {"ok": 0, "rejected": 0, "timed_out": 0}
+    stop = time.perf_counter() + duration
+
+    async def client(i):
+        n = i
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                await predictor.predict_proba(rows[n % len(rows)])
+            except OverloadedError:
+                counts["rejected"] += 1
+                await asyncio.sleep(retry_after)
+                continue
+            except DeadlineExceeded:
+                counts["timed_out"] += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            counts["ok"] += 1
+            n += concurrency
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    report = {"concurrency": concurrency, **counts, "throughput_rps": counts["ok"] / elapsed}
+    for p in (50, 95, 99):
+        report[f"p{p}_ms"] = float(np.percentile(latencies, p)) if len(latencies) else None
+    return report
@@ -0,0 +1,262 @@
+import atexit
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from early_exit import early_exit_proba
+from forest_compiler import load_compiled
+from scoring import FEATURES, FEATURE_ALIASES, VALIDATION_RULES, risk_levels, health_scores
+
+# Output columns appended to every scored row
+RESULT_COLUMNS = ["prediction", "probability", "risk_level", "health_score", "errors"]
+
+
+class BatchLimitError(ValueError):
+    """Raised when a batch exceeds the configured row or output size limit"""
+
+
+# Process-wide directory for scored files the app offers for download
+_output_dir = None
+_output_dir_lock = threading.Lock()
+
+
+def output_dir():
+    """Temporary directory for scored batch files, created once per process and removed at exit"""
+    global _output_dir
+    with _output_dir_lock:
+        if _output_dir is None:
+            _output_dir = tempfile.mkdtemp(prefix="heart-batch-")
+            atexit.register(shutil.rmtree, _output_dir, ignore_errors=True)
+    return _output_dir
+
+
+def new_output_file(ttl):
+    """Open a new scored file in output_dir(), returning (fd, path).
+
+    Files not written to for ttl seconds are removed first: sessions that
+    end without scoring another batch never replace theirs.
+    """
+    directory = output_dir()
+    cutoff = time.time() - ttl
+    for entry in os.scandir(directory):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            # Removed by another session's cleanup
+            pass
+    return tempfile.mkstemp(suffix=".csv", dir=directory)
+
+
+def normalize_columns(frame):
+    """Rename training-data column names to the app's feature names and check none are missing"""
+    frame = frame.rename(columns=lambda c: FEATURE_ALIASES.get(str(c).strip().lower(), str(c).strip().lower()))
+    missing = [feature for feature in FEATURES if feature not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+    return frame
+
+
+def validate_frame(frame):
+    """Vectorized version of the app's input validation.
+
+    Returns the numeric feature matrix and a Series of error messages
+    (empty string for valid rows).
+    """
+    features = frame[FEATURES].apply(pd.to_numeric, errors='coerce')
+    errors = pd.Series("", index=frame.index, dtype=object)
+
+    missing = features.isna().any(axis=1)
+    errors[missing] = "Missing or non-numeric values; "
+
+    for feature, low, high, message in VALIDATION_RULES:
+        column = features[feature]
+        out_of_range = (column < low) | (column > high)
+        errors[out_of_range] += message + "; "
+
+    return features, errors.str.rstrip("; ")
+
+
+def score_frame(model, frame, early_exit=None):
+    """Validate and score one chunk of patients with a single predict_proba call.
+
+    With early_exit set to an error tolerance, rows stop being scored once
+    their class and risk level are settled (see early_exit.py); their
+    probability is then the estimate from the trees evaluated so far.
+    """
+    frame = normalize_columns(frame)
+    features, errors = validate_frame(frame)
+    valid = (errors == "").to_numpy()
+
+    probability = np.full(len(frame), np.nan)
+    prediction = np.full(len(frame), np.nan)
+    if valid.any() and early_exit is not None:
+        probability[valid], _ = early_exit_proba(model, features.to_numpy(dtype=np.float64)[valid],
+                                                 tolerance=early_exit)
+        prediction[valid] = model.classes_.take((probability[valid] > 0.5).astype(np.intp))
+    elif valid.any():
+        proba = model.predict_proba(features.to_numpy(dtype=np.float64)[valid])
+        probability[valid] = proba[:, 1]
+        prediction[valid] = model.classes_.take(np.argmax(proba, axis=1))
+
+    scored = frame.copy()
+    scored["prediction"] = pd.array(prediction, dtype="Int64")
+    scored["probability"] = probability
+    scored["risk_level"] = np.where(valid, risk_levels(np.nan_to_num(probability)), "")
+    scored["health_score"] = np.where(valid, health_scores(np.nan_to_num(prediction), np.nan_to_num(probability)), np.nan)
+    scored["errors"] = errors
+    return scored
+
+
+def _empty_summary():
+    return {"rows": 0, "valid_rows": 0, "invalid_rows": 0, "positive_cases": 0,
+            "risk_level_counts": {}, "output_bytes": 0}
+
+
+def _add_to_summary(summary, scored, output_bytes):
+    """Fold one scored chunk into a running summary"""
+    valid = scored["errors"] == ""
+    summary["rows"] += len(scored)
+    summary["valid_rows"] += int(valid.sum())
+    summary["invalid_rows"] += int((~valid).sum())
+    summary["positive_cases"] += int(scored["prediction"].fillna(0).sum())
+    summary["output_bytes"] += output_bytes
+    for level, count in scored.loc[valid, "risk_level"].value_counts().items():
+        summary["risk_level_counts"][level] = summary["risk_level_counts"].get(level, 0) + int(count)
+
+
+def _merge_summary(summary, other):
+    for key in ("rows", "valid_rows", "invalid_rows", "positive_cases", "output_bytes"):
+        summary[key] += other[key]
+    for level, count in other["risk_level_counts"].items():
+        summary["risk_level_counts"][level] = summary["risk_level_counts"].get(level, 0) + count
+
+
+def score_csv(model, source, destination, chunksize=50_000, max_rows=1_000_000, max_output_bytes=512 * 1024 * 1024,
+              progress=None):
+    """Stream a patient CSV through the model in chunks and write a scored CSV.
+
+    source and destination may be paths or file objects. Only one chunk is
+    held in memory at a time; max_rows and max_output_bytes cap how much a
+    single upload may consume and raise BatchLimitError when exceeded.
+    progress, if given, is called with the number of rows processed so far.
+    Returns a summary dict.
+    """
+    summary = _empty_summary()
+
+    for i, chunk in enumerate(pd.read_csv(source, chunksize=chunksize)):
+        if summary["rows"] + len(chunk) > max_rows:
+            raise BatchLimitError(f"Batch exceeds the limit of {max_rows:,} rows")
+
+        scored = score_frame(model, chunk)
+        text = scored.to_csv(index=False, header=(i == 0))
+        _add_to_summary(summary, scored, len(text.encode("utf-8")))
+        if summary["output_bytes"] > max_output_bytes:
+            raise BatchLimitError(f"Scored output exceeds the limit of {max_output_bytes // (1024 * 1024)} MB")
+
+        if isinstance(destination, str):
+            with open(destination, 'w' if i == 0 else 'a', newline='') as f:
+                f.write(text)
+        else:
+            destination.write(text)
+
+        if progress:
+            progress(summary["rows"])
+
+    return summary
+
+
+# ----------------------------------------------------------------------
+# Multi-process scoring for large files (python -m heart score)
+# ----------------------------------------------------------------------
+_worker_model = None
+
+
+def _init_worker(model_path, first_stage_path=None, band=None):
+    """Load the model (or first-stage cascade) once per worker process"""
+    global _worker_model
+    if first_stage_path:
+        from cascade import DEFAULT_BAND, load_cascade
+        _worker_model = load_cascade(first_stage_path, model_path, band or DEFAULT_BAND)
+    else:
+        _worker_model = load_compiled(model_path)
+
+
+def _score_block(header, block, first, early_exit=None):
+    """Parse, score and format one block of raw CSV lines inside a worker"""
+    scored = score_frame(_worker_model, pd.read_csv(io.StringIO(header + block)), early_exit)
+    text = scored.to_csv(index=False, header=first)
+    summary = _empty_summary()
+    _add_to_summary(summary, scored, len(text.encode("utf-8")))
+    return text, summary
+
+
+def _read_blocks(f, chunksize):
+    """Yield blocks of up to chunksize raw lines from an open CSV file"""
+    lines = []
+    for line in f:
+        if not line.strip():
+            continue
+        lines.append(line if line.endswith("\n") else line + "\n")
+        if len(lines) == chunksize:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+def score_csv_file(source_path, destination_path, model_path='model.pkl', workers=None, chunksize=50_000,
+                   progress=None, early_exit=None, first_stage_path=None, band=None):
+    """Score a CSV file of any size with a pool of worker processes.
+
+    The input is read as raw text in blocks of chunksize lines; parsing,
+    validation, scoring and formatting all happen in the workers, each of
+    which loads the model once. At most two blocks per worker are in
+    flight, so memory stays constant regardless of file size, and results
+    are written in input order. Rows must not contain quoted newlines.
+    early_exit is passed through to score_frame; first_stage_path scores
+    through a cascade that only sends the uncertain band to the forest.
+    Returns a summary dict.
+    """
+    if early_exit is not None and first_stage_path:
+        raise ValueError("Early exit and the first-stage cascade can't be combined")
+    workers = workers or os.cpu_count() or 1
+    summary = _empty_summary()
+
+    with open(source_path, 'r', newline='') as src, open(destination_path, 'w', newline='') as dst:
+        header = src.readline()
+        if workers == 1:
+            _init_worker(model_path, first_stage_path, band)
+            for i, block in enumerate(_read_blocks(src, chunksize)):
+                text, block_summary = _score_block(header, block, i == 0, early_exit)
+                dst.write(text)
+                _merge_summary(summary, block_summary)
+                if progress:
+                    progress(summary["rows"])
+            return summary
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_path, first_stage_path, band)) as pool:
+            pending = deque()
+
+            def write_oldest():
+                text, block_summary = pending.popleft().result()
+                dst.write(text)
+                _merge_summary(summary, block_summary)
+                if progress:
+                    progress(summary["rows"])
+
+            for i, block in enumerate(_read_blocks(src, chunksize)):
+                pending.append(pool.submit(_score_block, header, block, i == 0, early_exit))
+                if len(pending) >= 2 * workers:
+                    write_oldest()
+            while pending:
+                write_oldest()
+
+    return summary
@@ -0,0 +1,56 @@
+"""Load test of the asyncio API: latency past saturation with and without admission control.
+
+Usage: python benchmarks/bench_async_inference.py [--concurrency 1 4 16 64 256] [--duration 3]
+
+Closed-loop clients send single patients as fast as they are answered;
+rejected clients back off for --retry-after seconds, as they would when
+honouring the server's Retry-After. "admission control" bounds concurrent
+scoring to the core count, queues at most --max-queue requests and gives
+each a --deadline; "unbounded" queues everything, which is what happens
+without backpressure. Latencies are for answered requests only.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from async_inference import AsyncPredictor, run_load  # noqa: E402
+from forest_compiler import load_compiled  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=os.path.join(ROOT, 'model.pkl'))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64, 256])
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--max-queue', type=int, default=8)
+    parser.add_argument('--deadline', type=float, default=0.25)
+    parser.add_argument('--retry-after', type=float, default=0.25)
+    args = parser.parse_args()
+
+    model = load_compiled(args.model)
+    configs = {
+        "admission control": dict(max_queue=args.max_queue, deadline=args.deadline),
+        "unbounded": dict(max_queue=float('inf'), deadline=None),
+    }
+    for name, config in configs.items():
+        predictor = AsyncPredictor(lambda: model, **config)
+        print(f"📊 {name} (concurrency limit {predictor.max_concurrency}, queue limit {config['max_queue']}, "
+              f"deadline {config['deadline']})")
+        print(f"   {'clients':>7} {'answered/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'rejected':>9} {'timed out':>9}")
+        for concurrency in args.concurrency:
+            r = asyncio.run(run_load(predictor, concurrency, args.duration, retry_after=args.retry_after))
+            print(f"   {concurrency:>7} {r['throughput_rps']:>10,.0f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+                  f"{r['p99_ms']:>8.2f} {r['rejected']:>9,} {r['timed_out']:>9,}")
+        stats = predictor.stats()
+        print(f"   Counters: admitted {stats['admitted']:,}, rejected {stats['rejected']:,}, "
+              f"timed out {stats['timed_out']:,}\n")
+        predictor.close()
+
+
+if __name__ == '__main__':
+    main()
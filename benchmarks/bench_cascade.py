@@ -0,0 +1,78 @@
+"""First-stage cascade vs the full forest: traffic per stage, accuracy and throughput.
+
+Usage: python benchmarks/bench_cascade.py [--rows 200000]
+
+Accuracy is measured on the same held-out split model.py uses. Throughput
+is measured on a large batch resampled from the training patients with
+small jitter (screening-like traffic) and on one drawn uniformly over the
+training ranges (a harder, mostly ambiguous mix).
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cascade import CascadeModel, LinearStage, cascade_report  # noqa: E402
+from forest_compiler import load_compiled  # noqa: E402
+
+BANDS = [(0.05, 0.95), (0.1, 0.9), (0.2, 0.8), (0.3, 0.7)]
+
+
+def load_data(path):
+    data = pd.read_csv(path, header=None).replace('?', np.nan).dropna().astype(float)
+    X, y = data.iloc[:, :13].to_numpy(), (data.iloc[:, 13] != 0).astype(int).to_numpy()
+    return train_test_split(X, y, test_size=0.2, random_state=42)
+
+
+def rows_per_second(model, X, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict_proba(X)
+        best = min(best, time.perf_counter() - start)
+    return len(X) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=os.path.join(ROOT, 'model.pkl'))
+    parser.add_argument('--first-stage', default=os.path.join(ROOT, 'first_stage.json'))
+    parser.add_argument('--data', default=os.path.join(ROOT, 'data', 'heart.csv'))
+    parser.add_argument('--rows', type=int, default=200_000)
+    args = parser.parse_args()
+
+    forest = load_compiled(args.model)
+    first_stage = LinearStage.load(args.first_stage)
+    X_train, X_test, y_train, y_test = load_data(args.data)
+
+    rng = np.random.default_rng(0)
+    all_rows = np.vstack([X_train, X_test])
+    resampled = all_rows[rng.integers(0, len(all_rows), args.rows)]
+    resampled[:, [0, 3, 4, 7]] += rng.normal(0, 2, size=(args.rows, 4)).round()
+    uniform = rng.uniform(all_rows.min(axis=0), all_rows.max(axis=0), size=(args.rows, 13)).round(1)
+
+    forest_speed = {name: rows_per_second(forest, X) for name, X in (("resampled", resampled), ("uniform", uniform))}
+    print(f"🌲 Forest alone: test accuracy {(forest.predict(X_test) == y_test).mean():.2%}, "
+          f"{forest_speed['resampled']:,.0f} rows/s resampled, {forest_speed['uniform']:,.0f} rows/s uniform\n")
+    print(f"{'band':<12} {'1st stage':>9} {'accuracy':>9} {'class agr':>9} {'risk agr':>9} "
+          f"{'resampled':>22} {'uniform':>22}")
+    for band in BANDS:
+        cascade = CascadeModel(first_stage, forest, band)
+        report = cascade_report(cascade, X_test, y_test)
+        cells = []
+        for name, X in (("resampled", resampled), ("uniform", uniform)):
+            fraction = cascade_report(cascade, X)["first_stage_fraction"]
+            speed = rows_per_second(cascade, X)
+            cells.append(f"{fraction:>5.0%} {speed:>9,.0f}/s {speed / forest_speed[name]:>4.1f}x")
+        print(f"{band[0]:.2f}-{band[1]:.2f}   {report['first_stage_fraction']:>9.0%} {report['cascade_accuracy']:>9.2%} "
+              f"{report['class_agreement']:>9.1%} {report['risk_level_agreement']:>9.1%} {cells[0]:>22} {cells[1]:>22}")
+
+
+if __name__ == '__main__':
+    main()
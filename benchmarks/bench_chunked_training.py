@@ -0,0 +1,126 @@
+"""Chunked out-of-core training vs the in-memory path: peak RSS and wall time.
+
+Usage: python benchmarks/bench_chunked_training.py [--rows 2000000] [--chunksize 100000] [--trees-per-chunk 5]
+                                                   [--workers N] [--min-samples-leaf 50] [--keep]
+
+Writes a synthetic headerless CSV in data/heart.csv's layout: real
+patients resampled with jitter on the continuous features and 5% of
+labels flipped. Each path then runs in its own subprocess so its peak RSS
+is measured cleanly:
+- in-memory reads the whole file with pandas and fits one forest with
+  n_jobs=-1;
+- chunked streams it through train_chunked.
+Both fit the same total number of trees. The chunked path reports the
+parent's peak RSS and the largest worker's. Accuracy is measured on
+fresh synthetic rows. min_samples_leaf keeps trees trained on millions
+of rows a sensible size for both paths.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from chunked_training import train_chunked  # noqa: E402
+from training import COLUMNS, clean_frame, load_dataset  # noqa: E402
+
+# Features resampled with gaussian jitter (the rest are categorical)
+JITTER = {"age": 3, "trestbps": 8, "chol": 20, "thalach": 10, "oldpeak": 0.3}
+
+
+def synthetic_blocks(rows, seed=0, block=500_000):
+    """Blocks of synthetic rows (13 features then the target)"""
+    X, y = load_dataset(os.path.join(ROOT, 'data', 'heart.csv'))
+    data = X.assign(target=y).to_numpy(dtype=np.float64)
+    jitter = np.array([JITTER.get(name, 0) for name in COLUMNS])
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, block):
+        n = min(block, rows - start)
+        sample = data[rng.integers(0, len(data), n)]
+        sample = np.maximum(0, sample + rng.normal(size=sample.shape) * jitter).round(1)
+        flip = rng.random(n) < 0.05
+        sample[flip, -1] = 1 - sample[flip, -1]
+        yield sample
+
+
+def write_synthetic_csv(path, rows, seed=0):
+    with open(path, 'w') as f:
+        for sample in synthetic_blocks(rows, seed):
+            pd.DataFrame(sample).to_csv(f, header=False, index=False, float_format='%.1f')
+
+
+def peak_rss_mb(who):
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def child(args):
+    params = {"min_samples_leaf": args.min_samples_leaf}
+    start = time.perf_counter()
+    if args.child == "in-memory":
+        from sklearn.ensemble import RandomForestClassifier
+
+        X, y = clean_frame(pd.read_csv(args.csv, header=None, names=COLUMNS, na_values='?'))
+        forest = RandomForestClassifier(n_estimators=args.trees, random_state=42, n_jobs=-1, **params).fit(X, y)
+        del X, y
+    else:
+        forest, _ = train_chunked(args.csv, args.chunksize, args.trees_per_chunk, params, args.workers)
+    seconds = time.perf_counter() - start
+    rss_mb, worker_rss_mb = peak_rss_mb(resource.RUSAGE_SELF), peak_rss_mb(resource.RUSAGE_CHILDREN)
+    # Fresh rows from the same distribution, never trained on
+    test = next(synthetic_blocks(50_000, seed=1))
+    accuracy = float(np.mean(forest.predict(pd.DataFrame(test[:, :-1], columns=COLUMNS[:-1])) == test[:, -1]))
+    print(json.dumps({"seconds": seconds, "rss_mb": rss_mb, "worker_rss_mb": worker_rss_mb, "accuracy": accuracy}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--trees-per-chunk', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--min-samples-leaf', type=int, default=50)
+    parser.add_argument('--keep', action='store_true', help="keep the synthetic CSV")
+    parser.add_argument('--child', choices=["in-memory", "chunked"], help=argparse.SUPPRESS)
+    parser.add_argument('--csv', help=argparse.SUPPRESS)
+    parser.add_argument('--trees', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+        return
+
+    path = os.path.join(tempfile.gettempdir(), f"heart_synthetic_{args.rows}.csv")
+    if not os.path.exists(path):
+        print(f"📝 Writing {args.rows:,} synthetic rows to {path}...")
+        write_synthetic_csv(path, args.rows)
+    chunks = -(-args.rows // args.chunksize)
+    trees = chunks * args.trees_per_chunk
+    print(f"📊 {args.rows:,} rows ({os.path.getsize(path) / 2 ** 20:,.0f} MB CSV), {trees} trees, "
+          f"chunks of {args.chunksize:,} rows\n")
+    print(f"   {'path':<12} {'seconds':>9} {'peak RSS MB':>12} {'largest worker MB':>18} {'accuracy':>9}")
+    try:
+        for mode in ("in-memory", "chunked"):
+            command = [sys.executable, "-W", "ignore", os.path.abspath(__file__), "--child", mode, "--csv", path,
+                       "--trees", str(trees), "--chunksize", str(args.chunksize),
+                       "--trees-per-chunk", str(args.trees_per_chunk),
+                       "--min-samples-leaf", str(args.min_samples_leaf)]
+            if args.workers:
+                command += ["--workers", str(args.workers)]
+            result = json.loads(subprocess.run(command, check=True, capture_output=True, text=True).stdout)
+            worker = "-" if mode == "in-memory" else f"{result['worker_rss_mb']:,.0f}"
+            print(f"   {mode:<12} {result['seconds']:>9.1f} {result['rss_mb']:>12,.0f} {worker:>18} "
+                  f"{result['accuracy']:>9.2%}")
+    finally:
+        if not args.keep:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
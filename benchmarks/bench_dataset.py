@@ -0,0 +1,69 @@
+"""Dataset load time: parsing the CSV vs the memory-mapped column cache, next to the model load.
+
+Usage: python benchmarks/bench_dataset.py [--repeat 1 100 1000] [--runs 5]
+
+For each size (data/heart.csv with its rows repeated --repeat times,
+written to a temp directory) reports the median time to parse the CSV
+the way training used to, to build the column cache (first load), to
+load it again (memory-mapped columns and as a frame), and to load the
+compiled model.pkl, the other half of the explainer's start-up.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dataset import COLUMNS, cache_dir, load_columns, load_frame  # noqa: E402
+from forest_compiler import load_compiled  # noqa: E402
+from training import clean_frame  # noqa: E402
+
+
+def _median_ms(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=os.path.join(ROOT, 'data', 'heart.csv'))
+    parser.add_argument('--model', default=os.path.join(ROOT, 'model.pkl'))
+    parser.add_argument('--repeat', type=int, nargs='+', default=[1, 100, 1000])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.data, 'r') as f:
+        lines = f.read().splitlines(keepends=True)
+    model_ms = _median_ms(lambda: load_compiled(args.model), args.runs)
+    print(f"Model load (compiled): {model_ms:.1f} ms\n")
+    print(f"{'rows':>9} {'parse CSV':>11} {'build cache':>12} {'mmap load':>10} {'frame load':>11}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for repeat in args.repeat:
+            path = os.path.join(tmp_dir, f"heart-x{repeat}.csv")
+            with open(path, 'w') as f:
+                f.writelines(lines * repeat)
+            parse_ms = _median_ms(lambda: clean_frame(pd.read_csv(path, header=None, names=COLUMNS)), args.runs)
+
+            def build():
+                shutil.rmtree(cache_dir(path), ignore_errors=True)
+                load_columns(path)
+
+            build_ms = _median_ms(build, args.runs)
+            mmap_ms = _median_ms(lambda: load_columns(path), args.runs)
+            frame_ms = _median_ms(lambda: load_frame(path), args.runs)
+            rows = len(load_columns(path)["target"])
+            print(f"{rows:>9} {parse_ms:>9.1f}ms {build_ms:>10.1f}ms {mmap_ms:>8.2f}ms {frame_ms:>9.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
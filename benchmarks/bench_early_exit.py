@@ -0,0 +1,62 @@
+"""Early-exit forest evaluation: trees evaluated and speedup vs the full forest.
+
+Usage: python benchmarks/bench_early_exit.py [--rows 200000] [--block-size 10]
+
+Runs on the training data and on a large synthetic batch drawn uniformly
+over the training ranges, for the 0.5 decision boundary alone and for the
+boundary plus the risk-level cutoffs, at several error tolerances.
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from early_exit import DEFAULT_CUTOFFS, early_exit_proba  # noqa: E402
+from forest_compiler import load_compiled  # noqa: E402
+
+
+def best_time(fn, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=os.path.join(ROOT, 'model.pkl'))
+    parser.add_argument('--data', default=os.path.join(ROOT, 'data', 'heart.csv'))
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--block-size', type=int, default=10)
+    args = parser.parse_args()
+
+    forest = load_compiled(args.model)
+    data = pd.read_csv(args.data, header=None).iloc[:, :13].apply(pd.to_numeric, errors='coerce').dropna()
+    train = data.to_numpy(dtype=float)
+    rng = np.random.default_rng(0)
+    synthetic = rng.uniform(train.min(axis=0), train.max(axis=0), size=(args.rows, 13)).round(1)
+
+    print(f"🌲 {forest.n_estimators} trees, blocks of {args.block_size}\n")
+    print(f"{'data':<10} {'cutoffs':<22} {'tolerance':>9} {'avg trees':>10} {'speedup':>8} {'bucket changes':>15}")
+    for name, X in (("train", train), ("synthetic", synthetic)):
+        repeats = 20 if len(X) < 10_000 else 2
+        full_time, proba = best_time(lambda: forest.predict_proba(X)[:, 1], repeats)
+        for cutoffs in ((0.5,), DEFAULT_CUTOFFS):
+            expected = np.searchsorted(cutoffs, proba, side='left')
+            for tolerance in (0.0, 0.01, 0.05):
+                elapsed, (estimate, trees) = best_time(
+                    lambda: early_exit_proba(forest, X, cutoffs, tolerance, args.block_size), repeats)
+                changes = int((np.searchsorted(cutoffs, estimate, side='left') != expected).sum())
+                print(f"{name:<10} {str(cutoffs):<22} {tolerance:>9} {trees.mean():>10.1f} "
+                      f"{full_time / elapsed:>7.2f}x {changes:>15}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Pickle vs memory-mapped bundle: cold-start time and memory per worker.
+
+Usage: python benchmarks/bench_model_artifact.py [--workers 4] [--runs 5]
+
+Each measurement runs in fresh interpreter processes, like new Streamlit
+workers. Memory is read from /proc (Linux): RSS counts shared pages in
+every process, PSS splits them between the processes that share them,
+and "model" is the growth in RSS caused by loading and using the model.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORKER = r"""
+import sys, time
+start = time.perf_counter()
+import numpy as np
+from forest_compiler import load_compiled
+
+def memory():
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:'):
+                values[parts[0][:-1]] = int(parts[1]) / 1024
+    return values
+
+before = memory()["Rss"]
+imported = time.perf_counter()
+model = load_compiled(sys.argv[1])
+model.predict_proba(np.array([[63, 1, 3, 145, 233, 1, 0, 150, 0, 2.3, 0, 0, 1]]))
+ready = time.perf_counter()
+# Touch every node so all of the model is resident, as after real traffic
+model.apply(np.random.default_rng(0).uniform(0, 600, size=(5000, 13)))
+after = memory()["Rss"]
+print(f"{imported - start:.4f} {ready - imported:.4f} {after - before:.2f}", flush=True)
+sys.stdin.read()
+"""
+
+
+def proc_mb(pid, field):
+    """RSS or PSS of a process in MB"""
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def start_workers(path, count):
+    workers = [subprocess.Popen([sys.executable, '-W', 'ignore', '-c', WORKER, path], cwd=ROOT,
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+               for _ in range(count)]
+    timings = [tuple(float(v) for v in w.stdout.readline().split()) for w in workers]
+    return workers, timings
+
+
+def stop_workers(workers):
+    for w in workers:
+        w.stdin.close()
+        w.wait()
+
+
+def measure(path, workers, runs):
+    import_times, load_times = [], []
+    for _ in range(runs):
+        procs, timings = start_workers(path, 1)
+        stop_workers(procs)
+        import_times.append(timings[0][0])
+        load_times.append(timings[0][1])
+
+    procs, timings = start_workers(path, workers)
+    rss = [proc_mb(p.pid, 'Rss') for p in procs]
+    pss = [proc_mb(p.pid, 'Pss') for p in procs]
+    model_mb = [t[2] for t in timings]
+    stop_workers(procs)
+    return {
+        "import_s": sorted(import_times)[len(import_times) // 2],
+        "load_s": sorted(load_times)[len(load_times) // 2],
+        "rss_mb": sum(rss) / len(rss),
+        "pss_mb": sum(pss) / len(pss),
+        "model_mb": sum(model_mb) / len(model_mb),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=os.path.join(ROOT, 'model.pkl'))
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    from forest_compiler import load_compiled
+    bundle = os.path.join(tempfile.mkdtemp(), 'model.bundle')
+    load_compiled(args.model).save(bundle)
+
+    print(f"⏱️  Cold start (median of {args.runs} fresh processes) and memory with {args.workers} workers\n")
+    print(f"{'artifact':<10} {'file':>9} {'imports':>9} {'load+1st':>9} {'RSS/wkr':>9} {'PSS/wkr':>9} {'model':>9}")
+    for label, path in (("pickle", args.model), ("bundle", bundle)):
+        r = measure(path, args.workers, args.runs)
+        print(f"{label:<10} {os.path.getsize(path) / 1024:>7.0f}KB {r['import_s'] * 1000:>7.0f}ms "
+              f"{r['load_s'] * 1000:>7.1f}ms {r['rss_mb']:>7.1f}MB {r['pss_mb']:>7.1f}MB {r['model_mb']:>7.2f}MB")
+
+
+if __name__ == '__main__':
+    main()
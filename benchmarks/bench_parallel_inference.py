@@ -0,0 +1,91 @@
+"""Shared-memory process pool vs single-process scoring: scaling from 1 to N cores.
+
+Usage: python benchmarks/bench_parallel_inference.py [--rows 100000 1000000 10000000] [--workers 1 2 4 8]
+
+Rows are synthetic patients drawn uniformly over the training ranges and
+generated straight into float32 so ten million of them fit in ~520 MB.
+For each size the table lists the in-process compiled forest, sklearn's
+own predict_proba with n_jobs=-1 (threads over trees, up to 10^6 rows)
+and the pool at each worker count, with speedup and parallel efficiency
+relative to one worker. Pool start-up is excluded; it happens once.
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from forest_compiler import compile_forest  # noqa: E402
+from parallel_inference import ParallelScorer  # noqa: E402
+
+LOW = [29, 0, 0, 94, 126, 0, 0, 71, 0, 0, 0, 0, 0]
+HIGH = [77, 1, 3, 200, 564, 1, 2, 202, 1, 6.2, 2, 3, 3]
+
+
+def synthetic_rows(n, seed=0, block=1_000_000):
+    rng = np.random.default_rng(seed)
+    X = np.empty((n, 13), dtype=np.float32)
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        X[start:stop] = rng.uniform(LOW, HIGH, size=(stop - start, 13)).round(1)
+    return X
+
+
+def timed(fn, X):
+    start = time.perf_counter()
+    fn(X)
+    return time.perf_counter() - start
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=os.path.join(ROOT, 'model.pkl'))
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, *[2 ** i for i in range(1, cores.bit_length())], cores}))
+    args = parser.parse_args()
+
+    import joblib
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        sklearn_model = joblib.load(args.model)
+    forest = compile_forest(sklearn_model)
+    print(f"🖥️  {cores} cores available; workers tested: {args.workers}\n")
+
+    scorers = {workers: ParallelScorer(forest, workers) for workers in args.workers}
+    try:
+        for scorer in scorers.values():
+            scorer.predict_proba(synthetic_rows(1_000, seed=1))  # start and warm every worker
+
+        for n in args.rows:
+            X = synthetic_rows(n)
+            print(f"📊 {n:,} rows")
+            print(f"   {'engine':<24} {'seconds':>9} {'rows/s':>12} {'speedup':>8} {'efficiency':>10}")
+            single = timed(forest.predict_proba, X)
+            print(f"   {'in-process':<24} {single:>9.2f} {n / single:>12,.0f}")
+            if n <= 1_000_000:
+                sklearn_model.set_params(n_jobs=-1)
+                seconds = timed(sklearn_model.predict_proba, X)
+                print(f"   {'sklearn n_jobs=-1':<24} {seconds:>9.2f} {n / seconds:>12,.0f}")
+
+            baseline = None
+            for workers, scorer in scorers.items():
+                seconds = timed(scorer.predict_proba, X)
+                baseline = baseline or seconds
+                speedup = baseline / seconds
+                print(f"   {f'pool, {workers} worker(s)':<24} {seconds:>9.2f} {n / seconds:>12,.0f} "
+                      f"{speedup:>7.2f}x {speedup / workers:>9.0%}")
+            print()
+            del X
+    finally:
+        for scorer in scorers.values():
+            scorer.close()
+
+
+if __name__ == '__main__':
+    main()
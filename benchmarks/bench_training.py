@@ -0,0 +1,62 @@
+"""Training wall time: serial vs parallel cross-validation and final fit.
+
+Usage: python benchmarks/bench_training.py [--folds 5] [--workers 1 2 4 8] [--n-estimators 100] [--repeat 1]
+
+For each worker count, times stratified k-fold cross-validation with the
+folds trained in that many processes, then times the final forest fitted
+with n_jobs=1 and n_jobs=-1. The dataset is parsed once and cached before
+timing starts. The dataset can be enlarged with --repeat (rows are
+duplicated) so the scaling is visible beyond process start-up.
+"""
+import argparse
+import os
+import sys
+import time
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from training import DEFAULT_PARAMS, cross_validate, holdout_split, load_dataset  # noqa: E402
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=os.path.join(ROOT, 'data', 'heart.csv'))
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, *[2 ** i for i in range(1, cores.bit_length())], cores}))
+    parser.add_argument('--n-estimators', type=int, default=DEFAULT_PARAMS["n_estimators"])
+    parser.add_argument('--repeat', type=int, default=1, help="duplicate the dataset this many times")
+    args = parser.parse_args()
+
+    from sklearn.ensemble import RandomForestClassifier
+
+    X, y = load_dataset(args.data)
+    X, y = pd.concat([X] * args.repeat, ignore_index=True), pd.concat([y] * args.repeat, ignore_index=True)
+    X_train, _, y_train, _ = holdout_split(X, y)
+    params = {**DEFAULT_PARAMS, "n_estimators": args.n_estimators}
+    print(f"🖥️  {cores} cores; {len(X_train):,} training rows, {args.n_estimators} trees, {args.folds} folds\n")
+
+    print(f"   {'cross-validation':<24} {'seconds':>9} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        cross_validate(X_train, y_train, args.folds, workers, params)
+        seconds = time.perf_counter() - start
+        baseline = baseline or seconds
+        print(f"   {f'{workers} worker(s)':<24} {seconds:>9.2f} {baseline / seconds:>7.2f}x")
+
+    print(f"\n   {'final fit':<24} {'seconds':>9} {'speedup':>8}")
+    baseline = None
+    for n_jobs in (1, -1):
+        start = time.perf_counter()
+        RandomForestClassifier(**params, n_jobs=n_jobs).fit(X_train, y_train)
+        seconds = time.perf_counter() - start
+        baseline = baseline or seconds
+        print(f"   {f'n_jobs={n_jobs}':<24} {seconds:>9.2f} {baseline / seconds:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
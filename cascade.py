@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from forest_compiler import load_compiled
+
+# Default first-stage probability band sent on to the forest: patients the
+# first stage scores below 0.1 or above 0.9 are decided by it alone
+DEFAULT_BAND = (0.1, 0.9)
+
+
+class LinearStage:
+    """Cheap first-stage model: calibrated logistic regression as plain weights.
+
+    Trained with a standardising scaler, then Platt-calibrated on
+    out-of-fold decision scores. Scaler, coefficients and calibration are
+    all affine in the inputs, so they fold into one weight vector and bias
+    and scoring a patient is a single dot product and sigmoid.
+    """
+
+    def __init__(self, weights, bias, feature_names=None):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.feature_names_in_ = None if feature_names is None else np.asarray(feature_names, dtype=object)
+        self.classes_ = np.array([0, 1])
+        self.n_features_in_ = len(self.weights)
+
+    @classmethod
+    def fit(cls, X, y, C=1.0, cv=5, random_state=42):
+        """Train and calibrate on a feature frame/matrix and binary labels"""
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.model_selection import StratifiedKFold, cross_val_predict
+        from sklearn.pipeline import make_pipeline
+        from sklearn.preprocessing import StandardScaler
+
+        feature_names = list(X.columns) if isinstance(X, pd.DataFrame) else None
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y).astype(int)
+
+        pipeline = make_pipeline(StandardScaler(), LogisticRegression(C=C, max_iter=1000))
+        folds = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+        scores = cross_val_predict(pipeline, X, y, cv=folds, method='decision_function')
+        platt = LogisticRegression(C=1e6).fit(scores.reshape(-1, 1), y)
+        pipeline.fit(X, y)
+
+        scaler, logistic = pipeline[0], pipeline[1]
+        a, b = platt.coef_[0, 0], platt.intercept_[0]
+        weights = logistic.coef_[0] / scaler.scale_
+        bias = logistic.intercept_[0] - weights @ scaler.mean_
+        return cls(a * weights, a * bias + b, feature_names)
+
+    def _validate(self, X):
+        if isinstance(X, pd.DataFrame) and self.feature_names_in_ is not None:
+            if set(self.feature_names_in_).issubset(X.columns):
+                X = X[list(self.feature_names_in_)]
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected a 2D array with {self.n_features_in_} features, got shape {X.shape}")
+        return X
+
+    def predict_proba(self, X):
+        p = 1 / (1 + np.exp(-(self._validate(X) @ self.weights + self.bias)))
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X):
+        return self.classes_.take((self.predict_proba(X)[:, 1] > 0.5).astype(np.intp))
+
+    def save(self, path):
+        """Write the weights as JSON (atomically)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                "weights": self.weights.tolist(),
+                "bias": self.bias,
+                "feature_names": None if self.feature_names_in_ is None else list(self.feature_names_in_),
+            }, f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return cls(data["weights"], data["bias"], data.get("feature_names"))
+
+
+class CascadeModel:
+    """First stage for clear-cut patients, full forest for the uncertain band.
+
+    Rows whose first-stage disease probability falls inside band (the
+    inclusive low/high pair) are re-scored by the forest; all others keep
+    the first-stage probabilities. Behaves like the forest (predict_proba,
+    predict, classes_) and counts how many rows each stage handled.
+    """
+
+    def __init__(self, first_stage, forest, band=DEFAULT_BAND):
+        low, high = band
+        if not 0 <= low <= high <= 1:
+            raise ValueError(f"Invalid confidence band: {band}")
+        self.first_stage = first_stage
+        self.forest = forest
+        self.band = (float(low), float(high))
+        self.classes_ = forest.classes_
+        self.n_features_in_ = forest.n_features_in_
+        self.feature_names_in_ = getattr(forest, "feature_names_in_", None)
+        self._lock = threading.Lock()
+        self.first_stage_rows = 0
+        self.forest_rows = 0
+
+    def predict_proba(self, X):
+        proba = self.first_stage.predict_proba(X)
+        low, high = self.band
+        uncertain = (proba[:, 1] >= low) & (proba[:, 1] <= high)
+        if uncertain.any():
+            rows = X.iloc[uncertain] if isinstance(X, pd.DataFrame) else np.asarray(X)[uncertain]
+            proba[uncertain] = self.forest.predict_proba(rows)
+        with self._lock:
+            self.forest_rows += int(uncertain.sum())
+            self.first_stage_rows += int((~uncertain).sum())
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def stats(self):
+        """Rows handled by each stage so far"""
+        with self._lock:
+            total = self.first_stage_rows + self.forest_rows
+            return {
+                "band": self.band,
+                "first_stage_rows": self.first_stage_rows,
+                "forest_rows": self.forest_rows,
+                "first_stage_fraction": self.first_stage_rows / total if total else 0.0,
+            }
+
+
+def load_cascade(first_stage_path='first_stage.json', model_path='model.pkl', band=DEFAULT_BAND):
+    """Build a cascade from a saved first stage and forest artifact"""
+    return CascadeModel(LinearStage.load(first_stage_path), load_compiled(model_path), band)
+
+
+def cascade_report(cascade, X, y=None):
+    """Fraction of rows per stage and agreement with (and accuracy against) the forest alone"""
+    from scoring import risk_levels
+
+    forest_proba = cascade.forest.predict_proba(X)
+    first_proba = cascade.first_stage.predict_proba(X)[:, 1]
+    low, high = cascade.band
+    uncertain = (first_proba >= low) & (first_proba <= high)
+    proba = cascade.predict_proba(X)
+
+    forest_pred = cascade.classes_.take(np.argmax(forest_proba, axis=1))
+    cascade_pred = cascade.classes_.take(np.argmax(proba, axis=1))
+    report = {
+        "rows": len(proba),
+        "band": cascade.band,
+        "first_stage_fraction": float((~uncertain).mean()),
+        "forest_fraction": float(uncertain.mean()),
+        "class_agreement": float((forest_pred == cascade_pred).mean()),
+        "risk_level_agreement": float((risk_levels(forest_proba[:, 1]) == risk_levels(proba[:, 1])).mean()),
+    }
+    if y is not None:
+        y = np.asarray(y)
+        report["forest_accuracy"] = float((forest_pred == y).mean())
+        report["cascade_accuracy"] = float((cascade_pred == y).mean())
+        report["first_stage_accuracy"] = float((cascade.first_stage.predict(X) == y).mean())
+    return report
@@ -0,0 +1,196 @@
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from batch_scoring import _read_blocks
+from retraining import Reservoir
+from training import COLUMNS, DEFAULT_PARAMS, clean_frame
+
+# Raw CSV lines parsed and trained on by one worker task
+CHUNK_ROWS = 100_000
+TREES_PER_CHUNK = 10
+# Smallest leaf of the chunk trees, so a tree's size is bounded by the chunk size rather than growing with
+# every row it sees
+MIN_SAMPLES_LEAF = 50
+# Rows of earlier chunks (split evenly between the classes) mixed into each chunk's training data
+RESERVOIR_ROWS = 10_000
+# Chunk i gets the reservoir of chunks before i - RESERVOIR_LAG, whatever the number of workers
+RESERVOIR_LAG = 8
+# Rows held back from each chunk, and in total, to evaluate the merged forest
+HOLDOUT_PER_CHUNK = 200
+HOLDOUT_ROWS = 20_000
+
+
+def _fit_chunk(block, index, trees, params, carried, sample_rows, seed):
+    """Parse one block of raw CSV lines and train a sub-forest on it inside a worker.
+
+    A few rows are held back for evaluation; carried is a (X, y) sample of
+    earlier chunks added to the training rows. Returns the sub-forest
+    (None if the data has a single class), the held-back rows and, when
+    sample_rows is set, a per-class sample of the chunk for the reservoir.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+
+    start = time.perf_counter()
+    X, y = clean_frame(pd.read_csv(io.StringIO(block), header=None, names=COLUMNS, na_values='?'))
+    X, y = X.to_numpy(dtype=np.float64), y.to_numpy()
+    rng = np.random.default_rng([seed, index])
+    order = rng.permutation(len(y))
+    held_back, train = order[:min(HOLDOUT_PER_CHUNK, len(y) // 10)], order[min(HOLDOUT_PER_CHUNK, len(y) // 10):]
+
+    sample = None
+    if sample_rows:
+        sample = np.concatenate([train[y[train] == label][:sample_rows] for label in (0, 1)])
+        sample = (X[sample], y[sample])
+    X_fit, y_fit = X[train], y[train]
+    if carried is not None:
+        X_fit, y_fit = np.concatenate([X_fit, carried[0]]), np.concatenate([y_fit, carried[1]])
+
+    forest = None
+    if len(np.unique(y_fit)) == 2:
+        forest = RandomForestClassifier(**params, n_estimators=trees, random_state=seed + index,
+                                        n_jobs=1).fit(X_fit, y_fit)
+    return {
+        "index": index,
+        "rows": len(y),
+        "forest": forest,
+        "held_back": (X[held_back], y[held_back]),
+        "sample": sample,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def merge_forests(forests):
+    """One forest holding every tree of the given forests, in order (all must share classes and features)"""
+    merged = forests[0]
+    for forest in forests[1:]:
+        if not np.array_equal(forest.classes_, merged.classes_) or forest.n_features_in_ != merged.n_features_in_:
+            raise ValueError("Sub-forests disagree on classes or features")
+        merged.estimators_ = merged.estimators_ + forest.estimators_
+    merged.n_estimators = len(merged.estimators_)
+    return merged
+
+
+def _skip_header(f):
+    """Skip a header line if the file has one (the training CSV doesn't)"""
+    position = f.tell()
+    first = f.readline()
+    if not any(character.isalpha() for character in first.replace('?', '')):
+        f.seek(position)
+
+
+def train_chunked(data_path, chunksize=CHUNK_ROWS, trees_per_chunk=TREES_PER_CHUNK, params=None, workers=None,
+                  reservoir_rows=RESERVOIR_ROWS, reservoir_lag=RESERVOIR_LAG, seed=DEFAULT_PARAMS["random_state"],
+                  progress=None):
+    """Train a forest on a CSV of any size without loading the data into memory.
+
+    The file is read as raw text in blocks of chunksize lines; parsing and
+    training happen in worker processes, each fitting trees_per_chunk
+    trees on its block. At most two blocks per worker are in flight, so
+    the memory spent on data is bounded by the chunk size, not the file
+    size. The model itself is not: every block adds trees_per_chunk trees,
+    kept in the parent until they are merged, so the forest (and the
+    artifact) grows linearly with the number of blocks, and each tree with
+    its block unless params bound it (min_samples_leaf or max_depth).
+    With reservoir_rows > 0 each block's training data also gets a
+    stratified reservoir sample of the blocks more than reservoir_lag
+    before it, so sub-forests don't only know their own slice of a file
+    sorted by site or date. The lag is fixed rather than tied to the
+    blocks in flight, so the model doesn't depend on the worker count;
+    at most reservoir_lag + 1 blocks are then in flight. Blocks whose
+    data has only one class contribute no trees. The sub-forests are
+    merged into one forest in file order.
+    Returns (forest, metrics); metrics are measured on rows held back
+    from every block.
+    """
+    from sklearn.metrics import accuracy_score, roc_auc_score
+
+    # Tree count and seeds come from trees_per_chunk and seed
+    params = {key: value for key, value in (params or {}).items() if key not in ("n_estimators", "random_state")}
+    workers = workers or os.cpu_count() or 1
+    per_class = reservoir_rows // 2
+    reservoirs = {label: Reservoir(per_class, seed=seed + label) for label in (0, 1)} if per_class else None
+    held_back = Reservoir(HOLDOUT_ROWS, seed=seed)
+    forests, chunk_seconds = [], []
+    summary = {"rows": 0, "chunks": 0, "skipped_chunks": 0}
+    # Samples of collected chunks not yet added to the reservoirs, by chunk index
+    samples = {}
+    pending = deque()
+    applied = 0
+    start = time.perf_counter()
+
+    def collect(result):
+        summary["rows"] += result["rows"]
+        summary["chunks"] += 1
+        chunk_seconds.append(result["seconds"])
+        if result["forest"] is None:
+            summary["skipped_chunks"] += 1
+        else:
+            forests.append(result["forest"])
+        held_back.add(*result["held_back"])
+        if reservoirs is not None:
+            samples[result["index"]] = result["sample"]
+        if progress:
+            progress(summary["rows"])
+
+    def carried(index):
+        """Reservoir sample of the chunks before index - reservoir_lag, collecting them first if needed"""
+        nonlocal applied
+        if reservoirs is None:
+            return None
+        while applied < index - reservoir_lag:
+            if applied not in samples:
+                collect(pending.popleft().result())
+                continue
+            X, y = samples.pop(applied)
+            for label, reservoir in reservoirs.items():
+                reservoir.add(X[y == label], y[y == label])
+            applied += 1
+        if not any(len(r) for r in reservoirs.values()):
+            return None
+        return (np.concatenate([r.X for r in reservoirs.values()]), np.concatenate([r.y for r in reservoirs.values()]))
+
+    with open(data_path, 'r', newline='') as f:
+        _skip_header(f)
+        blocks = enumerate(_read_blocks(f, chunksize))
+        if workers == 1:
+            for i, block in blocks:
+                collect(_fit_chunk(block, i, trees_per_chunk, params, carried(i), per_class, seed))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for i, block in blocks:
+                    pending.append(pool.submit(_fit_chunk, block, i, trees_per_chunk, params, carried(i),
+                                               per_class, seed))
+                    if len(pending) >= 2 * workers:
+                        collect(pending.popleft().result())
+                while pending:
+                    collect(pending.popleft().result())
+
+    if not forests:
+        raise ValueError(f"No chunk of {data_path} had both classes to train on")
+    forest = merge_forests(forests)
+    forest.feature_names_in_ = np.array(COLUMNS[:-1], dtype=object)
+    seconds = time.perf_counter() - start
+
+    X_test = pd.DataFrame(held_back.X, columns=forest.feature_names_in_)
+    proba = forest.predict_proba(X_test)[:, 1]
+    metrics = {
+        **summary,
+        "accuracy": float(accuracy_score(held_back.y, forest.classes_.take((proba > 0.5).astype(int)))),
+        "auc": float(roc_auc_score(held_back.y, proba)) if len(np.unique(held_back.y)) == 2 else None,
+        "n_estimators": forest.n_estimators,
+        "params": params,
+        "chunksize": chunksize,
+        "trees_per_chunk": trees_per_chunk,
+        "reservoir_rows": reservoir_rows,
+        "reservoir_lag": reservoir_lag,
+        "test_rows": len(held_back),
+        "workers": workers,
+        "wall_seconds": seconds,
+        "chunk_seconds": chunk_seconds,
+        "trained_at": time.time(),
+    }
+    return forest, metrics
@@ -0,0 +1,140 @@
+"""Binary column cache of the training CSV.
+
+data/heart.csv is parsed once; its cleaned columns are stored beside it as
+one typed .npy file per column (data/.cache/heart.csv/<sha256>/), and later
+loads memory-map them instead of parsing text. The cache is keyed by the
+CSV's sha256, so editing the file rebuilds it on the next load.
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+DATA_PATH = 'data/heart.csv'
+COLUMNS = ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach', 'exang', 'oldpeak', 'slope', 'ca',
+           'thal', 'target']
+FEATURES = COLUMNS[:-1]
+MANIFEST = 'manifest.json'
+
+
+def cache_dir(path=DATA_PATH):
+    """Cache directory of a CSV: .cache/<file name> beside it"""
+    path = os.path.abspath(path)
+    return os.path.join(os.path.dirname(path), '.cache', os.path.basename(path))
+
+
+def _column_dtype(values):
+    """Smallest integer type holding an all-integer column, float64 otherwise"""
+    if len(values) and np.array_equal(values, np.round(values)):
+        for dtype in (np.int8, np.int16, np.int32):
+            info = np.iinfo(dtype)
+            if info.min <= values.min() and values.max() <= info.max:
+                return dtype
+    return np.float64
+
+
+def parse_csv(source):
+    """Typed columns of the raw CSV (a path or its bytes), rows with missing values ('?') dropped"""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    data = pd.read_csv(source, header=None, names=COLUMNS, na_values='?').dropna()
+    columns = {}
+    for name in COLUMNS:
+        values = data[name].to_numpy(dtype=np.float64)
+        columns[name] = values.astype(_column_dtype(values))
+    return columns
+
+
+def _read_manifest(cache):
+    try:
+        with open(os.path.join(cache, MANIFEST), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(cache, manifest):
+    path = os.path.join(cache, MANIFEST)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _store(cache, checksum, columns):
+    """Write the columns to cache/<checksum>/ atomically (staged in a temp directory, then renamed)"""
+    os.makedirs(cache, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=cache, prefix='.build-')
+    try:
+        os.chmod(tmp_dir, 0o755)
+        for name, values in columns.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), values)
+        try:
+            os.rename(tmp_dir, os.path.join(cache, checksum))
+        except OSError:
+            # Another process stored the same content first
+            pass
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _remove_stale(cache, checksum):
+    for entry in os.listdir(cache):
+        if entry != checksum and not entry.startswith('.') and os.path.isdir(os.path.join(cache, entry)):
+            shutil.rmtree(os.path.join(cache, entry), ignore_errors=True)
+
+
+def _valid(cache, manifest):
+    return manifest is not None and all(
+        os.path.exists(os.path.join(cache, manifest["sha256"], f"{name}.npy")) for name in COLUMNS)
+
+
+def load_columns(path=DATA_PATH):
+    """Cleaned columns of the CSV as read-only memory-mapped arrays, building the cache if needed.
+
+    The CSV is checked cheaply with os.stat on every load and only
+    re-hashed when its size or modification time moved (a fresh checkout,
+    an edit); the columns are re-parsed only if the checksum changed.
+    If the cache directory can't be written, the parsed columns are
+    returned in memory instead.
+    """
+    cache = cache_dir(path)
+    stat = os.stat(path)
+    manifest = _read_manifest(cache)
+    if not _valid(cache, manifest) or (manifest["size"], manifest["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+        with open(path, 'rb') as f:
+            raw = f.read()
+        checksum = hashlib.sha256(raw).hexdigest()
+        if _valid(cache, manifest) and manifest["sha256"] == checksum:
+            manifest = {**manifest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        else:
+            columns = parse_csv(raw)
+            manifest = {
+                "source": os.path.basename(path),
+                "sha256": checksum,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "rows": len(columns[COLUMNS[0]]),
+                "dtypes": {name: values.dtype.name for name, values in columns.items()},
+            }
+            try:
+                _store(cache, checksum, columns)
+            except OSError:
+                return columns
+        try:
+            _write_manifest(cache, manifest)
+            _remove_stale(cache, manifest["sha256"])
+        except OSError:
+            pass
+    entry = os.path.join(cache, manifest["sha256"])
+    return {name: np.load(os.path.join(entry, f"{name}.npy"), mmap_mode='r') for name in COLUMNS}
+
+
+def load_frame(path=DATA_PATH):
+    """Cleaned rows of the CSV as a frame (features plus the raw 0-4 diagnosis in 'target')"""
+    return pd.DataFrame(load_columns(path), columns=COLUMNS)
+
@@ -0,0 +1,77 @@
+import math
+import numpy as np
+from scoring import RISK_THRESHOLDS
+
+# Probability cutoffs whose side of the line a prediction must settle: the
+# 0.5 decision boundary and the risk-level thresholds
+DEFAULT_CUTOFFS = tuple(sorted({0.5, *RISK_THRESHOLDS}))
+
+
+def serfling_radius(k, n, tolerance):
+    """Hoeffding-Serfling bound on |mean of k of n values - mean of all n| for values in [0, 1].
+
+    Holds with probability at least 1 - tolerance when the k values are a
+    uniformly random subset drawn without replacement.
+    """
+    if tolerance <= 0 or k >= n:
+        return math.inf if k < n else 0.0
+    return math.sqrt((1 - (k - 1) / n) * math.log(2 / tolerance) / (2 * k))
+
+
+def early_exit_proba(forest, X, cutoffs=DEFAULT_CUTOFFS, tolerance=0.0, block_size=10):
+    """Disease probability, evaluating only as many trees as each row needs.
+
+    Trees are evaluated in blocks of block_size in the forest's fixed order
+    (its trees are bootstrap draws, so the order carries no information).
+    After each block a row's final probability is bounded two ways:
+    deterministically, since the remaining trees vote between 0 and 1, and
+    statistically with the Hoeffding-Serfling inequality at the given
+    tolerance (split across checkpoints). Once no cutoff lies inside the
+    bound the row's class and risk level can't change and it leaves the
+    active set. With tolerance=0 only the deterministic bound is used, so
+    buckets always match full evaluation.
+
+    Returns (probability, trees_evaluated). Settled rows get the running
+    mean of the trees evaluated so far, so their probability is an
+    estimate; unsettled rows see every tree and are exact.
+    """
+    if forest.n_classes_ != 2:
+        raise ValueError("Early exit supports binary forests only")
+    X = forest._validate(X)
+    n_trees = forest.n_estimators
+    cutoffs = np.asarray(cutoffs, dtype=np.float64)
+    checkpoints = range(block_size, n_trees, block_size)
+    per_check_tolerance = tolerance / max(len(checkpoints), 1)
+
+    totals = np.zeros(len(X))
+    probability = np.empty(len(X))
+    trees_evaluated = np.full(len(X), n_trees, dtype=np.intp)
+    active = np.arange(len(X))
+
+    for start in range(0, n_trees, block_size):
+        stop = min(start + block_size, n_trees)
+        for chunk_start in range(0, len(active), forest.CHUNK_ROWS):
+            rows = active[chunk_start:chunk_start + forest.CHUNK_ROWS]
+            leaves = forest._apply_chunk(X[rows], forest.roots[start:stop])
+            totals[rows] += forest._leaf_values(leaves)[:, :, 1].sum(axis=0)
+        if stop == n_trees:
+            break
+
+        mean = totals[active] / stop
+        remaining = (n_trees - stop) / n_trees
+        radius = serfling_radius(stop, n_trees, per_check_tolerance)
+        # The margin absorbs float rounding in the running sums
+        low = np.maximum(mean * stop / n_trees, mean - radius) - 1e-12
+        high = np.minimum(mean * stop / n_trees + remaining, mean + radius) + 1e-12
+        # Settled when every cutoff lies strictly outside [low, high]
+        settled = np.searchsorted(cutoffs, low, side='left') == np.searchsorted(cutoffs, high, side='right')
+
+        done = active[settled]
+        probability[done] = mean[settled]
+        trees_evaluated[done] = stop
+        active = active[~settled]
+        if not active.size:
+            break
+
+    probability[active] = totals[active] / n_trees
+    return probability, trees_evaluated
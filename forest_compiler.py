@@ -0,0 +1,513 @@
+import json
+import os
+import joblib
+import numpy as np
+import pandas as pd
+
+# First bytes of a flat forest bundle written by CompiledForest.save()
+BUNDLE_MAGIC = b"FORESTB1"
+# Alignment of the header and of every array inside a bundle
+BUNDLE_ALIGN = 64
+
+
+def _aligned(offset):
+    return -(-offset // BUNDLE_ALIGN) * BUNDLE_ALIGN
+
+
+def _bundle_class(header):
+    """Forest class that reads a bundle with this header"""
+    return CompactForest if header.get("kind") == CompactForest.BUNDLE_KIND else CompiledForest
+
+
+class CompiledForest:
+    """Array-backed RandomForest predictor compiled from a fitted sklearn forest.
+
+    Every tree is flattened into the same set of contiguous node arrays so a
+    batch of rows walks all trees at once with plain NumPy indexing. Leaves
+    point back at themselves, so (tree, row) pairs that finish early can be
+    dropped from the active set lazily instead of on every step.
+    """
+
+    # Rows scored per traversal pass; bounds the (n_trees, rows) index matrix
+    CHUNK_ROWS = 1024
+
+    # Bundle type tag and the node arrays it stores, in file order
+    BUNDLE_KIND = "compiled"
+    BUNDLE_ARRAYS = ("feature", "threshold", "children", "value", "roots", "feature_importances_", "is_leaf")
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth,
+                 classes, feature_importances, feature_names=None, is_leaf=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.feature_importances_ = feature_importances
+        self.feature_names_in_ = feature_names
+        self.n_estimators = len(roots)
+        self.n_features_in_ = len(feature_importances)
+        self.n_classes_ = len(classes)
+        self.is_leaf = children[:, 0] == np.arange(len(children)) if is_leaf is None else is_leaf
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flatten a fitted RandomForestClassifier into node arrays"""
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes)
+            is_leaf = tree.children_left == -1
+
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+            # Normalise exactly as DecisionTreeClassifier.predict_proba does
+            value = tree.value[:, 0, :model.n_classes_].astype(np.float64)
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            children.append(np.stack([left, right], axis=1))
+            values.append(value / normalizer)
+            roots.append(offset)
+
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        feature_names = getattr(model, "feature_names_in_", None)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            children=np.ascontiguousarray(np.concatenate(children), dtype=np.intp),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=np.asarray(model.classes_),
+            feature_importances=np.asarray(model.feature_importances_, dtype=np.float64),
+            feature_names=None if feature_names is None else np.asarray(feature_names, dtype=object),
+        )
+
+    # ------------------------------------------------------------------
+    # Flat bundle (memory-mappable artifact)
+    # ------------------------------------------------------------------
+    def bundle_layout(self):
+        """JSON header and little-endian arrays of the bundle format.
+
+        Array offsets in the header are relative to the start of the data
+        section and 64-byte aligned. Returns (header, arrays, data size).
+        """
+        arrays = {name: np.ascontiguousarray(getattr(self, name)) for name in self.BUNDLE_ARRAYS}
+        arrays = {name: a.astype(a.dtype.newbyteorder('<')) for name, a in arrays.items()}
+
+        header = {
+            "kind": self.BUNDLE_KIND,
+            "max_depth": self.max_depth,
+            "classes": self.classes_.tolist(),
+            "feature_names": None if self.feature_names_in_ is None else list(self.feature_names_in_),
+            **self._bundle_meta(),
+            "arrays": {},
+        }
+        offset = 0
+        for name, a in arrays.items():
+            header["arrays"][name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset}
+            offset = _aligned(offset + a.nbytes)
+        return header, arrays, offset
+
+    def save(self, path):
+        """Write the forest as a flat, memory-mappable bundle file.
+
+        Layout: magic, header length, JSON header, then every node array
+        as raw little-endian data at a 64-byte aligned offset after the
+        header. Written to a temporary file and renamed into place, so
+        readers never see a partial bundle.
+        """
+        header, arrays, data_size = self.bundle_layout()
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_start = _aligned(len(BUNDLE_MAGIC) + 8 + len(header_bytes))
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(BUNDLE_MAGIC)
+            f.write(len(header_bytes).to_bytes(8, "little"))
+            f.write(header_bytes)
+            for name, a in arrays.items():
+                f.seek(data_start + header["arrays"][name]["offset"])
+                f.write(a.tobytes())
+            f.truncate(data_start + data_size)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _bundle_meta(self):
+        """Extra header fields this forest type needs to rebuild itself"""
+        return {}
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load a bundle written by save() (plain or compact).
+
+        With mmap=True the node arrays are read-only memory maps of the
+        file, so every process that loads the same bundle shares one copy
+        in the page cache instead of holding its own.
+        """
+        with open(path, 'rb') as f:
+            if f.read(len(BUNDLE_MAGIC)) != BUNDLE_MAGIC:
+                raise ValueError(f"{path} is not a forest bundle")
+            header_length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_length))
+            data_start = _aligned(len(BUNDLE_MAGIC) + 8 + header_length)
+
+            arrays = {}
+            for name, spec in header["arrays"].items():
+                dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+                offset = data_start + spec["offset"]
+                if mmap:
+                    arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+                else:
+                    f.seek(offset)
+                    arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+        return _bundle_class(header)._from_bundle(header, arrays)
+
+    @classmethod
+    def from_buffer(cls, header, buffer):
+        """Rebuild a forest whose bundle arrays live in buffer (e.g. shared memory), without copying"""
+        arrays = {name: np.ndarray(tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]), buffer=buffer,
+                                   offset=spec["offset"])
+                  for name, spec in header["arrays"].items()}
+        return _bundle_class(header)._from_bundle(header, arrays)
+
+    @classmethod
+    def _from_bundle(cls, header, arrays):
+        feature_names = header["feature_names"]
+        return cls(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            children=arrays["children"],
+            value=arrays["value"],
+            roots=arrays["roots"],
+            max_depth=header["max_depth"],
+            classes=np.asarray(header["classes"]),
+            feature_importances=arrays["feature_importances_"],
+            feature_names=None if feature_names is None else np.asarray(feature_names, dtype=object),
+            is_leaf=arrays["is_leaf"],
+        )
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        """Memory held by the node arrays"""
+        return sum(getattr(self, name).nbytes for name in self.BUNDLE_ARRAYS)
+
+    # ------------------------------------------------------------------
+    # Inference
+    # ------------------------------------------------------------------
+    def _validate(self, X):
+        """Convert input to a C-contiguous float32 matrix like sklearn does"""
+        if isinstance(X, pd.DataFrame) and self.feature_names_in_ is not None:
+            if set(self.feature_names_in_).issubset(X.columns):
+                X = X[list(self.feature_names_in_)]
+        X = np.ascontiguousarray(X, dtype=np.float32)
+
+        if X.ndim != 2:
+            raise ValueError(f"Expected 2D array, got {X.ndim}D array instead")
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[1]} features, but CompiledForest is expecting "
+                f"{self.n_features_in_} features as input"
+            )
+        if not np.isfinite(X).all():
+            raise ValueError("Input X contains NaN or infinity")
+        return X
+
+    def _apply_chunk(self, X, roots=None):
+        """Return the leaf index reached in every tree, shape (n_trees, n_rows).
+
+        roots restricts the walk to a subset of the trees.
+        """
+        roots = self.roots if roots is None else roots
+        n_rows = X.shape[0]
+        flat_X = X.ravel()
+        flat_children = self.children.ravel()
+        # Narrow (compact) node ids are widened once per step rather than
+        # converted again by every gather that uses them
+        widen = flat_children.dtype != np.intp
+
+        # One (tree, row) pair per slot, tree-major
+        nodes = np.repeat(np.asarray(roots, dtype=np.intp), n_rows)
+        x_offsets = np.tile(np.arange(n_rows, dtype=np.intp) * self.n_features_in_, len(roots))
+        leaves = None
+        slots = None
+
+        while True:
+            go_right = flat_X[self.feature[nodes] + x_offsets] > self.threshold[nodes]
+            nodes = flat_children[2 * nodes + go_right]
+            if widen:
+                nodes = nodes.astype(np.intp)
+            active = np.flatnonzero(~self._leaf_mask(nodes))
+
+            # Leaves loop back on themselves, so finished pairs can keep
+            # walking for free; only compact once half of them are done.
+            if 2 * active.size > nodes.size:
+                continue
+
+            if leaves is None:
+                leaves = nodes.copy()
+                slots = active
+            else:
+                leaves[slots] = nodes
+                slots = slots[active]
+            if not active.size:
+                break
+            nodes = nodes[active]
+            x_offsets = x_offsets[active]
+
+        return leaves.reshape(len(roots), n_rows)
+
+    def apply(self, X):
+        """Leaf indices (into the flat node arrays) for every row and tree"""
+        X = self._validate(X)
+        return np.concatenate(
+            [self._apply_chunk(X[start:start + self.CHUNK_ROWS])
+             for start in range(0, max(len(X), 1), self.CHUNK_ROWS)],
+            axis=1,
+        )
+
+    def _leaf_mask(self, nodes):
+        return self.is_leaf[nodes]
+
+    def _leaf_values(self, leaves):
+        """Per-tree class probabilities (float64) for an array of leaf ids"""
+        return self.value[leaves]
+
+    def _proba_chunk(self, X, with_std=False):
+        tree_proba = self._leaf_values(self._apply_chunk(X))
+        # add.accumulate sums strictly in estimator order, which is what
+        # sklearn does tree by tree, so the result matches it bit for bit
+        proba = np.add.accumulate(tree_proba, axis=0)[-1]
+        proba /= self.n_estimators
+        if with_std:
+            return proba, tree_proba.std(axis=0)
+        return proba
+
+    def predict_proba(self, X):
+        """Class probabilities averaged over all trees"""
+        return self._predict(X, with_std=False)
+
+    def predict_proba_with_std(self, X):
+        """Class probabilities plus their standard deviation across trees.
+
+        Both come from the same traversal; the spread of the individual
+        tree votes is a cheap uncertainty estimate for each prediction.
+        """
+        return self._predict(X, with_std=True)
+
+    def _predict(self, X, with_std):
+        X = self._validate(X)
+        if len(X) <= self.CHUNK_ROWS:
+            return self._proba_chunk(X, with_std)
+
+        proba = np.empty((len(X), self.n_classes_), dtype=np.float64)
+        std = np.empty_like(proba) if with_std else None
+        for start in range(0, len(X), self.CHUNK_ROWS):
+            stop = start + self.CHUNK_ROWS
+            if with_std:
+                proba[start:stop], std[start:stop] = self._proba_chunk(X[start:stop], True)
+            else:
+                proba[start:stop] = self._proba_chunk(X[start:stop])
+        return (proba, std) if with_std else proba
+
+    def predict(self, X):
+        """Predicted class labels"""
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    # ------------------------------------------------------------------
+    # Memory access profile
+    # ------------------------------------------------------------------
+    def _path_nodes(self, X):
+        """(row, node) pairs visited when each row walks every tree, leaves included"""
+        X = self._validate(X)
+        nodes = np.repeat(np.asarray(self.roots, dtype=np.intp), len(X))
+        rows = np.tile(np.arange(len(X)), self.n_estimators)
+        visited_rows, visited_nodes = [rows], [nodes]
+        while True:
+            internal = ~self._leaf_mask(nodes)
+            if not internal.any():
+                break
+            nodes, rows = nodes[internal], rows[internal]
+            go_right = X[rows, self.feature[nodes]] > self.threshold[nodes]
+            nodes = np.asarray(self.children[nodes, go_right.astype(np.intp)], dtype=np.intp)
+            visited_rows.append(rows)
+            visited_nodes.append(nodes)
+        return np.concatenate(visited_rows), np.concatenate(visited_nodes)
+
+    def _memory_accesses(self, nodes):
+        """(array, element index, mask of visited nodes that read it) for each node array"""
+        leaf = np.asarray(self.is_leaf)[nodes]
+        return [(self.is_leaf, nodes, np.ones_like(leaf)), (self.feature, nodes, ~leaf),
+                (self.threshold, nodes, ~leaf), (self.children, nodes, ~leaf), (self.value, nodes, leaf)]
+
+    def cache_lines_per_row(self, X, line_size=64):
+        """Distinct cache lines each row's prediction reads from the node arrays.
+
+        An estimate of cold-cache misses per prediction, assuming every
+        array starts on a cache-line boundary (true for bundles).
+        """
+        rows, nodes = self._path_nodes(X)
+        keys = []
+        for i, (array, index, mask) in enumerate(self._memory_accesses(nodes)):
+            element_bytes = array.itemsize * int(np.prod(array.shape[1:]))
+            lines = index[mask] * element_bytes // line_size
+            keys.append((rows[mask].astype(np.int64) << 40) | (i << 32) | lines)
+        keys = np.sort(np.concatenate(keys))
+        distinct = keys[np.concatenate([[True], keys[1:] != keys[:-1]])]
+        return np.bincount(distinct >> 40, minlength=len(X))
+
+
+class CompactForest(CompiledForest):
+    """Narrow-typed copy of a CompiledForest for a smaller memory and cache footprint.
+
+    Nodes are renumbered so all split nodes come first and all leaves last:
+    a node is a leaf iff its id is >= n_internal, and class probabilities
+    are stored only for leaves. Feature ids are uint8, thresholds float32
+    and child/root ids int16 (int32 for very large forests). Each float32
+    threshold is the largest float32 not above the original float64 one,
+    which makes every split decide exactly as before for the float32
+    inputs sklearn compares, so only the narrower leaf probabilities can
+    change the output.
+    """
+
+    BUNDLE_KIND = "compact"
+    BUNDLE_ARRAYS = ("feature", "threshold", "children", "value", "roots", "feature_importances_")
+
+    def __init__(self, feature, threshold, children, value, roots, n_internal, max_depth,
+                 classes, feature_importances, feature_names=None):
+        self.n_internal = int(n_internal)
+        super().__init__(feature, threshold, children, value, roots, max_depth, classes,
+                         feature_importances, feature_names,
+                         is_leaf=np.arange(len(feature)) >= self.n_internal)
+
+    @classmethod
+    def from_compiled(cls, forest, value_dtype=np.float32):
+        """Rewrite a CompiledForest into the compact layout"""
+        if forest.n_features_in_ > 256:
+            raise ValueError("CompactForest supports at most 256 features")
+        n_nodes = forest.n_nodes
+        is_leaf = np.asarray(forest.is_leaf)
+        order = np.concatenate([np.flatnonzero(~is_leaf), np.flatnonzero(is_leaf)])
+        n_internal = int((~is_leaf).sum())
+        new_id = np.empty(n_nodes, dtype=np.intp)
+        new_id[order] = np.arange(n_nodes)
+
+        # Traversal computes 2 * node + 1, which must fit the index type
+        index_dtype = np.int16 if 2 * n_nodes < np.iinfo(np.int16).max else np.int32
+
+        threshold = np.asarray(forest.threshold)[order]
+        threshold32 = threshold.astype(np.float32)
+        rounded_up = threshold32 > threshold
+        threshold32[rounded_up] = np.nextafter(threshold32[rounded_up], np.float32(-np.inf))
+
+        return cls(
+            feature=np.asarray(forest.feature)[order].astype(np.uint8),
+            threshold=threshold32,
+            children=new_id[np.asarray(forest.children)[order]].astype(index_dtype),
+            value=np.ascontiguousarray(np.asarray(forest.value)[order[n_internal:]], dtype=value_dtype),
+            roots=new_id[np.asarray(forest.roots)].astype(index_dtype),
+            n_internal=n_internal,
+            max_depth=forest.max_depth,
+            classes=forest.classes_,
+            feature_importances=forest.feature_importances_,
+            feature_names=forest.feature_names_in_,
+        )
+
+    def _bundle_meta(self):
+        return {"n_internal": self.n_internal}
+
+    @classmethod
+    def _from_bundle(cls, header, arrays):
+        feature_names = header["feature_names"]
+        return cls(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            children=arrays["children"],
+            value=arrays["value"],
+            roots=arrays["roots"],
+            n_internal=header["n_internal"],
+            max_depth=header["max_depth"],
+            classes=np.asarray(header["classes"]),
+            feature_importances=arrays["feature_importances_"],
+            feature_names=None if feature_names is None else np.asarray(feature_names, dtype=object),
+        )
+
+    def _leaf_mask(self, nodes):
+        return nodes >= self.n_internal
+
+    def _memory_accesses(self, nodes):
+        leaf = nodes >= self.n_internal
+        return [(self.feature, nodes, ~leaf), (self.threshold, nodes, ~leaf),
+                (self.children, nodes, ~leaf), (self.value, nodes - self.n_internal, leaf)]
+
+    def _leaf_values(self, leaves):
+        return self.value[leaves - self.n_internal].astype(np.float64)
+
+
+def verification_report(forest, compact, X):
+    """Compare a compact forest against the forest it was built from on rows X"""
+    expected = forest.predict_proba(X)
+    actual = compact.predict_proba(X)
+    deviation = np.abs(actual - expected)
+    lines_before = forest.cache_lines_per_row(X)
+    lines_after = compact.cache_lines_per_row(X)
+    return {
+        "rows": len(expected),
+        "max_probability_deviation": float(deviation.max()),
+        "mean_probability_deviation": float(deviation.mean()),
+        "prediction_mismatches": int((np.argmax(actual, axis=1) != np.argmax(expected, axis=1)).sum()),
+        "bytes_before": int(forest.nbytes),
+        "bytes_after": int(compact.nbytes),
+        "bytes_per_node_before": forest.nbytes / forest.n_nodes,
+        "bytes_per_node_after": compact.nbytes / compact.n_nodes,
+        "cache_lines_per_prediction_before": float(lines_before.mean()),
+        "cache_lines_per_prediction_after": float(lines_after.mean()),
+    }
+
+
+def compact_forest(forest, value_dtype=np.float32):
+    """Compact a CompiledForest (or fitted sklearn forest) into a CompactForest"""
+    if isinstance(forest, CompactForest):
+        return forest
+    return CompactForest.from_compiled(compile_forest(forest), value_dtype)
+
+
+def compile_forest(model):
+    """Compile a fitted RandomForestClassifier into a CompiledForest"""
+    if isinstance(model, CompiledForest):
+        return model
+    return CompiledForest.from_sklearn(model)
+
+
+def is_bundle(path):
+    """True if path is a flat forest bundle rather than a pickle"""
+    with open(path, 'rb') as f:
+        return f.read(len(BUNDLE_MAGIC)) == BUNDLE_MAGIC
+
+
+def load_compiled(model_path='model.pkl'):
+    """Load a forest from disk: bundles are memory-mapped, pickles are compiled"""
+    if is_bundle(model_path):
+        return CompiledForest.load(model_path)
+    return compile_forest(joblib.load(model_path))
@@ -0,0 +1,416 @@
+"""Command-line tools for the heart disease model.
+
+Usage:
+    python -m heart score patients.csv scored.csv [--workers N] [--chunksize N] [--early-exit TOLERANCE]
+                                                   [--first-stage first_stage.json --band 0.1 0.9]
+    python -m heart serve [--port 8600] [--max-batch-size 64] [--max-wait-us 2000]
+    python -m heart serve-async [--port 8601] [--max-concurrency N] [--max-queue 64] [--deadline-ms 1000]
+    python -m heart loadgen [--url http://127.0.0.1:8600] [--concurrency 32] [--requests 2000]
+    python -m heart compact [--model model.pkl] [--output model.compact.bundle] [--value-dtype float32]
+    python -m heart models [--dir models] list | publish model.pkl | activate VERSION | rollback
+    python -m heart risk-table [--domain chol=200:240 ...] [--output risk_table.npz] [--max-cells 50000000]
+    python -m heart train-chunked big.csv [--output model.pkl] [--chunksize 100000] [--trees-per-chunk 10]
+                                          [--reservoir 10000] [--reservoir-lag 8] [--workers N] [--max-depth D]
+                                          [--min-samples-leaf 50]
+    python -m heart retrain [--dir models] [--mode add|replace] [--trees 20] [--reservoir 2000] [--no-compare]
+    python -m heart warmup [--check] [--url http://localhost:8501/_stcore/health]
+    python -m heart launch app_enhanced.py [streamlit options...]
+"""
+import argparse
+import os
+import sys
+import time
+
+
+def _score(args):
+    from batch_scoring import score_csv_file
+
+    start = time.perf_counter()
+    summary = score_csv_file(args.input, args.output, model_path=args.model, workers=args.workers,
+                             chunksize=args.chunksize, early_exit=args.early_exit,
+                             first_stage_path=args.first_stage, band=args.band,
+                             progress=lambda rows: print(f"\r💓 Scored {rows:,} patients", end="", file=sys.stderr))
+    elapsed = time.perf_counter() - start
+    print(file=sys.stderr)
+
+    print(f"✅ Scored {summary['rows']:,} patients in {elapsed:.1f}s "
+          f"({summary['rows'] / max(elapsed, 1e-9):,.0f} rows/s)")
+    print(f"   Valid: {summary['valid_rows']:,}  Invalid: {summary['invalid_rows']:,}  "
+          f"High risk: {summary['positive_cases']:,}")
+    for level, count in sorted(summary['risk_level_counts'].items(), key=lambda item: -item[1]):
+        print(f"   {level}: {count:,}")
+
+
+def _serve(args):
+    from inference_service import make_server
+
+    server = make_server(args.host, args.port, args.max_batch_size, args.max_wait_us)
+    print(f"❤️  Inference service listening on http://{args.host}:{args.port} "
+          f"(max batch {args.max_batch_size}, max wait {args.max_wait_us} us)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def _serve_async(args):
+    from async_inference import serve
+
+    def started(server):
+        print(f"❤️  Async inference service listening on http://{server.host}:{server.port} "
+              f"(max concurrency {server.predictor.max_concurrency}, max queue {args.max_queue}, "
+              f"deadline {args.deadline_ms} ms)")
+
+    try:
+        serve(args.host, args.port, args.max_concurrency, args.max_queue, args.deadline_ms / 1000,
+              args.processes, on_start=started)
+    except KeyboardInterrupt:
+        pass
+
+
+def _loadgen(args):
+    from inference_service import run_load
+
+    report = run_load(args.url, args.concurrency, args.requests)
+    server = report["server"]
+    print(f"📊 {report['requests']:,} requests, {report['concurrency']} concurrent clients: "
+          f"{report['throughput_rps']:,.0f} req/s")
+    print(f"   Client latency  p50 {report['p50_ms']:.2f} ms  p95 {report['p95_ms']:.2f} ms  "
+          f"p99 {report['p99_ms']:.2f} ms")
+    print(f"   Server latency  p50 {server['p50_ms']:.2f} ms  p95 {server['p95_ms']:.2f} ms  "
+          f"p99 {server['p99_ms']:.2f} ms")
+    print(f"   Avg batch size {server['avg_batch_size']:.1f}; histogram {server['batch_size_histogram']}")
+
+
+def _validation_rows(data_path, rows, seed=0):
+    """Training rows plus random patients spanning the training ranges, half of them on integer steps"""
+    import numpy as np
+    from dataset import FEATURES, load_frame
+
+    data = load_frame(data_path)[FEATURES]
+    rng = np.random.default_rng(seed)
+    low, high = data.min().to_numpy(), data.max().to_numpy()
+    sampled = rng.uniform(low, high, size=(rows, 13))
+    sampled[rows // 2:] = sampled[rows // 2:].round()
+    sampled[rows // 2:, 9] = rng.uniform(low[9], high[9], rows - rows // 2).round(1)  # oldpeak steps by 0.1
+    return np.vstack([data.to_numpy(dtype=float), sampled])
+
+
+def _compact(args):
+    import numpy as np
+    from forest_compiler import compact_forest, load_compiled, verification_report
+
+    forest = load_compiled(args.model)
+    compact = compact_forest(forest, value_dtype=np.dtype(args.value_dtype))
+    compact.save(args.output)
+
+    X = _validation_rows(args.data, args.rows)
+    report = verification_report(forest, compact, X)
+    x = X[:1]
+    latency = {}
+    for label, model in (("before", forest), ("after", compact)):
+        start = time.perf_counter()
+        for _ in range(1000):
+            model.predict_proba(x)
+        # 1000 calls, so total seconds equals milliseconds per call
+        latency[label] = time.perf_counter() - start
+    print(f"✅ Compact forest saved as '{args.output}'")
+    print(f"🔍 Verified on {report['rows']:,} rows")
+    print(f"   Max probability deviation  {report['max_probability_deviation']:.3g} "
+          f"(mean {report['mean_probability_deviation']:.3g}), class changes: {report['prediction_mismatches']}")
+    print(f"   Node arrays                {report['bytes_before']:,} -> {report['bytes_after']:,} bytes "
+          f"({report['bytes_per_node_before']:.1f} -> {report['bytes_per_node_after']:.1f} per node)")
+    print(f"   Cache lines / prediction   {report['cache_lines_per_prediction_before']:.0f} -> "
+          f"{report['cache_lines_per_prediction_after']:.0f}")
+    print(f"   Single-row latency         {latency['before']:.3f} -> {latency['after']:.3f} ms")
+
+
+def _risk_table(args):
+    import numpy as np
+    from forest_compiler import load_compiled
+    from risk_table import TableSizeError, build_risk_table, parse_domain, sample_subspace
+
+    forest = load_compiled(args.model)
+    try:
+        domain = parse_domain(args.domain)
+        table, report = build_risk_table(forest, domain, max_cells=args.max_cells)
+    except TableSizeError as e:
+        print(f"❌ {e}")
+        print("   Narrow the subspace with --domain feature=a,b,c or feature=low:high[:step]")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    table.save(args.output)
+
+    X = sample_subspace(domain, args.rows)
+    expected = forest.predict_proba(X)[:, 1]
+    start = time.perf_counter()
+    actual = table.predict_proba(X)[:, 1]
+    table_time = time.perf_counter() - start
+    start = time.perf_counter()
+    forest.predict_proba(X)
+    forest_time = time.perf_counter() - start
+
+    print(f"✅ Risk table saved as '{args.output}' ({os.path.getsize(args.output):,} bytes on disk)")
+    print(f"   Built in {report['build_time']:.1f}s: {report['full_cells']:,} bin combinations, "
+          f"{report['cells']:,} cells after merging equal bins")
+    print(f"   {report['distinct_probabilities']:,} distinct probabilities, {report['bytes']:,} bytes in memory")
+    print("   Bins per feature: " + ", ".join(f"{name}={report['bins_per_feature'][name]}->{merged}"
+                                               for name, merged in report['merged_bins_per_feature'].items()))
+    print(f"🔍 Verified on {len(X):,} rows: max deviation {np.abs(actual - expected).max():.3g}, "
+          f"mismatches {int((actual != expected).sum())}")
+    print(f"   Lookup {table_time * 1000:.1f} ms vs forest {forest_time * 1000:.1f} ms")
+
+
+def _models(args):
+    from datetime import datetime
+    from model_store import ModelStore
+
+    store = ModelStore(args.dir)
+    if args.action in ("publish", "activate") and not args.target:
+        print(f"❌ '{args.action}' needs an artifact path or version")
+        sys.exit(1)
+    try:
+        if args.action == "publish":
+            version = store.publish(args.target, activate=not args.no_activate)
+            print(f"✅ Published '{args.target}' as version {version}")
+        elif args.action == "activate":
+            store.activate(args.target)
+            print(f"✅ Activated version {args.target}")
+        elif args.action == "rollback":
+            print(f"⏪ Rolled back to version {store.rollback()}")
+    except (ValueError, FileNotFoundError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    active = store.active_version()
+    versions = store.versions()
+    print(f"📦 {len(versions)} version(s) in '{args.dir}'")
+    for version in versions:
+        metadata = store.metadata(version)
+        accuracy = metadata.get("accuracy")
+        created = datetime.fromisoformat(metadata["created_at"]).strftime("%Y-%m-%d %H:%M:%S UTC")
+        print(f"   {'▶' if version == active else ' '} {version}  {created}  "
+              f"accuracy {'-' if accuracy is None else f'{accuracy:.2%}'}")
+
+
+def _train_chunked(args):
+    import resource
+    import joblib
+    from chunked_training import train_chunked
+    from training import save_metrics
+
+    params = {"max_depth": args.max_depth, "min_samples_leaf": args.min_samples_leaf}
+    forest, metrics = train_chunked(args.input, args.chunksize, args.trees_per_chunk, params, args.workers,
+                                    args.reservoir, args.reservoir_lag,
+                                    progress=lambda rows: print(f"\r💪 Trained on {rows:,} rows", end="",
+                                                                file=sys.stderr))
+    print(file=sys.stderr)
+    joblib.dump(forest, f"{args.output}.tmp")
+    os.replace(f"{args.output}.tmp", args.output)
+    metrics["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    if args.metrics:
+        save_metrics(metrics, args.metrics)
+
+    print(f"✅ Trained {metrics['n_estimators']} trees on {metrics['rows']:,} rows in {metrics['chunks']} chunk(s) "
+          f"({metrics['wall_seconds']:.1f}s, peak RSS {metrics['peak_rss_mb']:.0f} MB in this process)")
+    if metrics["skipped_chunks"]:
+        print(f"   ⚠️  {metrics['skipped_chunks']} chunk(s) had a single class and added no trees")
+    auc = "-" if metrics["auc"] is None else f"{metrics['auc']:.3f}"
+    print(f"   Held-back rows: {metrics['test_rows']:,}  Accuracy: {metrics['accuracy']:.2%}  AUC: {auc}")
+    print(f"💾 Saved '{args.output}'" + (f" and '{args.metrics}'" if args.metrics else ""))
+
+
+def _retrain(args):
+    from model_store import ModelStore
+    from prediction_logger import PredictionLogger
+    from retraining import retrain
+
+    try:
+        report = retrain(ModelStore(args.dir), PredictionLogger(args.log_dir, args.backend, async_writes=False),
+                         args.mode, args.trees, args.reservoir, not args.no_compare, not args.no_activate)
+    except (ValueError, FileNotFoundError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    accuracy = report["accuracy"]
+
+    def percent(value):
+        return "-" if value is None else f"{value:.2%}"
+
+    print(f"✅ Published version {report['version']}{'' if args.no_activate else ' (active)'}: "
+          f"{report['n_estimators']} trees, {report['labeled_total']} labeled predictions used so far")
+    print(f"   Retrain time: {report['fit_seconds']:.2f}s", end="")
+    if "full_retrain_seconds" in report:
+        print(f"   Full retrain: {report['full_retrain_seconds']:.2f}s ({report['speedup']:.1f}x slower)", end="")
+    print()
+    print(f"   Holdout accuracy: before {percent(accuracy['base_holdout'])}, after {percent(accuracy['updated_holdout'])}"
+          f" (drift {accuracy['holdout_drift']:+.2%})"
+          + (f", full retrain {percent(accuracy['full_retrain_holdout'])}" if "full_retrain_holdout" in accuracy else ""))
+    print(f"   Previous model on the new labels: {percent(accuracy['base_on_new_labels'])}")
+
+
+def _warmup(args):
+    import warmup
+
+    if not args.check:
+        warmup.warm_up(args.data, args.readiness_file)
+        return
+    if not warmup.is_ready(args.readiness_file):
+        print(f"❌ Not warmed up ({args.readiness_file})")
+        sys.exit(1)
+    if args.url:
+        import urllib.request
+        try:
+            urllib.request.urlopen(args.url, timeout=5).close()
+        except OSError as e:
+            print(f"❌ {args.url}: {e}")
+            sys.exit(1)
+    print("✅ Ready")
+
+
+def _launch(args):
+    import atexit
+    import warmup
+    from streamlit.web import cli
+
+    # Warm up in this process so the app script reuses the loaded modules, then hand over to Streamlit
+    warmup.warm_up(args.data, args.readiness_file)
+    atexit.register(warmup.clear_readiness, args.readiness_file)
+    sys.argv = ["streamlit", "run", args.app, *args.streamlit_args]
+    cli.main()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m heart", description="❤️ Heart disease prediction tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    score_parser = subparsers.add_parser("score", help="Score a CSV of patients")
+    score_parser.add_argument("input", help="Input CSV with one patient per row")
+    score_parser.add_argument("output", help="Where to write the scored CSV")
+    score_parser.add_argument("--model", default="model.pkl", help="Model artifact (default: model.pkl)")
+    score_parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    score_parser.add_argument("--chunksize", type=int, default=50_000, help="Rows per chunk (default: 50000)")
+    score_parser.add_argument("--early-exit", type=float, default=None, metavar="TOLERANCE",
+                              help="stop evaluating trees once a row's class and risk level are settled "
+                                   "with this error probability (0 = exact buckets)")
+    score_parser.add_argument("--first-stage", default=None, metavar="PATH",
+                              help="cascade: score with this first-stage model (e.g. first_stage.json) "
+                                   "and send only its uncertain band to the forest")
+    score_parser.add_argument("--band", nargs=2, type=float, default=None, metavar=("LOW", "HIGH"),
+                              help="first-stage probability band sent to the forest (default: 0.1 0.9)")
+    score_parser.set_defaults(func=_score)
+
+    serve_parser = subparsers.add_parser("serve", help="Run the micro-batching HTTP inference service")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8600)
+    serve_parser.add_argument("--max-batch-size", type=int, default=64)
+    serve_parser.add_argument("--max-wait-us", type=int, default=2000)
+    serve_parser.set_defaults(func=_serve)
+
+    async_parser = subparsers.add_parser("serve-async", help="Run the asyncio HTTP inference service "
+                                                             "with admission control")
+    async_parser.add_argument("--host", default="127.0.0.1")
+    async_parser.add_argument("--port", type=int, default=8601)
+    async_parser.add_argument("--max-concurrency", type=int, default=None,
+                              help="Scoring calls run at once (default: all cores)")
+    async_parser.add_argument("--max-queue", type=int, default=64,
+                              help="Requests allowed to wait for a slot before new ones get 503")
+    async_parser.add_argument("--deadline-ms", type=float, default=1000,
+                              help="Default per-request deadline; late requests get 504")
+    async_parser.add_argument("--processes", action="store_true",
+                              help="Score in worker processes instead of threads")
+    async_parser.set_defaults(func=_serve_async)
+
+    loadgen_parser = subparsers.add_parser("loadgen", help="Send concurrent requests to the inference service")
+    loadgen_parser.add_argument("--url", default="http://127.0.0.1:8600")
+    loadgen_parser.add_argument("--concurrency", type=int, default=32)
+    loadgen_parser.add_argument("--requests", type=int, default=2000)
+    loadgen_parser.set_defaults(func=_loadgen)
+
+    compact_parser = subparsers.add_parser("compact", help="Export a compact quantized forest and verify it")
+    compact_parser.add_argument("--model", default="model.pkl", help="Model artifact (default: model.pkl)")
+    compact_parser.add_argument("--output", default="model.compact.bundle", help="Compact bundle to write")
+    compact_parser.add_argument("--value-dtype", choices=["float32", "float64"], default="float32",
+                                help="Leaf probability precision (float64 keeps results bit-identical)")
+    compact_parser.add_argument("--data", default="data/heart.csv", help="Training data used to draw check rows")
+    compact_parser.add_argument("--rows", type=int, default=20_000, help="Random rows to verify on")
+    compact_parser.set_defaults(func=_compact)
+
+    models_parser = subparsers.add_parser("models", help="List, publish, activate or roll back model versions")
+    models_parser.add_argument("action", nargs="?", default="list", choices=["list", "publish", "activate", "rollback"])
+    models_parser.add_argument("target", nargs="?", help="artifact to publish or version to activate")
+    models_parser.add_argument("--dir", default=os.environ.get("MODEL_DIR", "models"),
+                               help="Versioned model directory (default: $MODEL_DIR or models)")
+    models_parser.add_argument("--no-activate", action="store_true", help="publish without activating")
+    models_parser.set_defaults(func=_models)
+
+    table_parser = subparsers.add_parser("risk-table", help="Precompute an exact risk lookup table over a subspace")
+    table_parser.add_argument("--model", default="model.pkl", help="Model artifact (default: model.pkl)")
+    table_parser.add_argument("--output", default="risk_table.npz", help="Table file to write")
+    table_parser.add_argument("--domain", nargs="*", default=[], metavar="FEATURE=SPEC",
+                              help="values to cover per feature, as a,b,c or low:high[:step] "
+                                   "(other features cover the app's input range)")
+    table_parser.add_argument("--max-cells", type=int, default=50_000_000,
+                              help="refuse subspaces with more bin combinations (default: 50000000)")
+    table_parser.add_argument("--rows", type=int, default=100_000, help="Random rows to verify on")
+    table_parser.set_defaults(func=_risk_table)
+
+    chunked_parser = subparsers.add_parser("train-chunked", help="Train a forest on a CSV too large for memory")
+    chunked_parser.add_argument("input", help="Headerless training CSV in data/heart.csv's column order")
+    chunked_parser.add_argument("--output", default="model.pkl", help="Model artifact to write (default: model.pkl)")
+    chunked_parser.add_argument("--metrics", default="model_metrics.json",
+                                help="Metrics JSON to write ('' to skip; default: model_metrics.json)")
+    chunked_parser.add_argument("--chunksize", type=int, default=100_000, help="Rows per chunk (default: 100000)")
+    chunked_parser.add_argument("--trees-per-chunk", type=int, default=10, help="Trees fitted per chunk (default: 10)")
+    chunked_parser.add_argument("--reservoir", type=int, default=10_000,
+                                help="Rows of earlier chunks mixed into each chunk, stratified (0 to disable)")
+    chunked_parser.add_argument("--reservoir-lag", type=int, default=8,
+                                help="chunk i is mixed with chunks before i - LAG, so the model doesn't depend on "
+                                     "--workers; at most LAG + 1 chunks are in flight (default: 8)")
+    chunked_parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    chunked_parser.add_argument("--max-depth", type=int, default=None)
+    chunked_parser.add_argument("--min-samples-leaf", type=int, default=50,
+                                help="smallest leaf; bounds each tree's size by the chunk size (default: 50)")
+    chunked_parser.set_defaults(func=_train_chunked)
+
+    retrain_parser = subparsers.add_parser("retrain", help="Add trees trained on newly labeled predictions "
+                                                           "and publish a new model version")
+    retrain_parser.add_argument("--dir", default=os.environ.get("MODEL_DIR", "models"),
+                                help="Versioned model directory (default: $MODEL_DIR or models)")
+    retrain_parser.add_argument("--log-dir", default=os.environ.get("LOG_DIR", "prediction_logs"))
+    retrain_parser.add_argument("--backend", choices=["jsonl", "sqlite"], default=os.environ.get("LOG_BACKEND", "jsonl"))
+    retrain_parser.add_argument("--mode", choices=["add", "replace"], default="add",
+                                help="add trees (warm start) or replace the oldest ones (rolling window)")
+    retrain_parser.add_argument("--trees", type=int, default=20, help="Trees added or replaced (default: 20)")
+    retrain_parser.add_argument("--reservoir", type=int, default=2000,
+                                help="Rows of older data mixed into each round (default: 2000)")
+    retrain_parser.add_argument("--no-compare", action="store_true", help="skip the full-retrain comparison")
+    retrain_parser.add_argument("--no-activate", action="store_true", help="publish without activating")
+    retrain_parser.set_defaults(func=_retrain)
+
+    warmup_parser = subparsers.add_parser("warmup", help="Warm up the model and PDF reports, or check readiness")
+    warmup_parser.add_argument("--check", action="store_true",
+                               help="exit 0 only if a running process has finished warming up (for healthchecks)")
+    warmup_parser.add_argument("--url", default=None,
+                               help="with --check, also require this URL to answer (e.g. Streamlit's health endpoint)")
+    warmup_parser.add_argument("--data", default="data/heart.csv", help="Patients used for warm-up inferences")
+    warmup_parser.add_argument("--readiness-file", default=os.environ.get("READINESS_FILE", "/tmp/heart-disease-ready"))
+    warmup_parser.set_defaults(func=_warmup)
+
+    launch_parser = subparsers.add_parser("launch", help="Warm up, then run a Streamlit app in the same process")
+    launch_parser.add_argument("app", help="Streamlit script, e.g. app_enhanced.py")
+    launch_parser.add_argument("streamlit_args", nargs=argparse.REMAINDER, help="options passed to streamlit run")
+    launch_parser.add_argument("--data", default="data/heart.csv", help="Patients used for warm-up inferences")
+    launch_parser.add_argument("--readiness-file", default=os.environ.get("READINESS_FILE", "/tmp/heart-disease-ready"))
+    launch_parser.set_defaults(func=_launch)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
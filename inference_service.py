@@ -0,0 +1,243 @@
+import json
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from async_inference import DeadlineExceeded, OverloadedError
+from model_registry import registry
+from scoring import FEATURES
+
+
+class MicroBatcher:
+    """Gathers concurrent single-row requests into one model call.
+
+    Requests are queued with submit(); a single batching thread waits for
+    the first request, keeps collecting until max_batch_size rows are
+    queued or max_wait_us microseconds have passed, then scores them all
+    with one predict_proba_with_std call and resolves each request's
+    future with that row's (probabilities, std across trees).
+    """
+
+    def __init__(self, model_provider=registry.get_model, max_batch_size=64, max_wait_us=2000,
+                 latency_window=10000):
+        self.model_provider = model_provider
+        self.max_batch_size = max_batch_size
+        self.max_wait_us = max_wait_us
+        self._queue = queue.Queue()
+        self._latencies = deque(maxlen=latency_window)
+        self._batch_sizes = Counter()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, features):
+        """Queue one row of 13 features; the future resolves to (probabilities, std)"""
+        row = np.asarray(features, dtype=np.float64).reshape(-1)
+        if row.shape[0] != len(FEATURES):
+            raise ValueError(f"Expected {len(FEATURES)} features, got {row.shape[0]}")
+        future = Future()
+        self._queue.put((row, future, time.perf_counter()))
+        return future
+
+    def predict_proba(self, features, timeout=None):
+        """Blocking convenience wrapper around submit()"""
+        return self.submit(features).result(timeout)[0]
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or the wait expires"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_us / 1e6
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                model = self.model_provider()
+                proba, std = model.predict_proba_with_std(np.stack([features for features, _, _ in batch]))
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            done = time.perf_counter()
+            for (_, future, _), row, row_std in zip(batch, proba, std):
+                future.set_result((row, row_std))
+            with self._lock:
+                self._batch_sizes[len(batch)] += 1
+                self._latencies.extend(done - submitted for _, _, submitted in batch)
+
+    def stats(self):
+        """Latency percentiles (ms) over recent requests and the batch-size histogram"""
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            histogram = dict(sorted(self._batch_sizes.items()))
+        requests = sum(size * count for size, count in histogram.items())
+        batches = sum(histogram.values())
+        stats = {
+            "requests": requests,
+            "batches": batches,
+            "avg_batch_size": requests / batches if batches else 0.0,
+            "batch_size_histogram": histogram,
+            "queue_depth": self._queue.qsize(),
+        }
+        for p in (50, 95, 99):
+            stats[f"p{p}_ms"] = float(np.percentile(latencies, p)) if len(latencies) else None
+        return stats
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """JSON endpoints: POST /predict, GET /metrics, GET /health"""
+
+    batcher = None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send_json(200, self.batcher.stats())
+        elif self.path == "/health":
+            self._send_json(200, {"status": "ok", "model_version": registry.version})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            instances = payload["instances"] if "instances" in payload else [payload["features"]]
+            futures = [self.batcher.submit(features) for features in instances]
+            results = [future.result() for future in futures]
+        except (KeyError, ValueError, TypeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        self._send_json(200, {"probabilities": [proba.tolist() for proba, _ in results],
+                              "std": [std.tolist() for _, std in results],
+                              "model_version": registry.version})
+
+    def log_message(self, format, *args):
+        # Keep the console quiet under load
+        pass
+
+
+class InferenceServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for bursts of concurrent connections from many app sessions
+    request_queue_size = 256
+
+
+def make_server(host="127.0.0.1", port=8600, max_batch_size=64, max_wait_us=2000, model_provider=registry.get_model):
+    """Build the HTTP inference server (call serve_forever() to run it)"""
+    # Load the model up front so the first requests don't pay for it
+    model_provider()
+    if registry.store:
+        registry.start_watcher()
+    handler = type("InferenceHandler", (_Handler,), {
+        "batcher": MicroBatcher(model_provider, max_batch_size, max_wait_us)
+    })
+    return InferenceServer((host, port), handler)
+
+
+class InferenceClient:
+    """Model-like client for the inference service.
+
+    Exposes predict_proba/predict_proba_with_std/predict and classes_ so the apps can use it in
+    place of the in-process model by setting INFERENCE_URL.
+    """
+
+    classes_ = np.array([0, 1])
+
+    def __init__(self, url, timeout=10.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path, payload=None):
+        data = None if payload is None else json.dumps(payload).encode("utf-8")
+        request = urllib.request.Request(self.url + path, data=data,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            # Load shedding by the asyncio server surfaces as the same errors as in-process
+            if e.code == 503:
+                raise OverloadedError(json.loads(e.read()).get("error", "Server overloaded")) from None
+            if e.code == 504:
+                raise DeadlineExceeded(json.loads(e.read()).get("error", "Deadline exceeded")) from None
+            raise
+
+    def predict_proba_with_std(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        response = self._request("/predict", {"instances": X.tolist()})
+        return np.asarray(response["probabilities"]), np.asarray(response["std"])
+
+    def predict_proba(self, X):
+        return self.predict_proba_with_std(X)[0]
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def metrics(self):
+        return self._request("/metrics")
+
+
+def connect_model():
+    """Model used by the apps: the inference service if INFERENCE_URL is set, else the in-process model"""
+    url = os.environ.get("INFERENCE_URL")
+    if url:
+        return InferenceClient(url)
+    if registry.store:
+        # Pick up newly published versions in the background
+        registry.start_watcher()
+    return registry.get_model()
+
+
+def run_load(url, concurrency=32, requests=2000, seed=0):
+    """Fire single-row requests from concurrent clients and report client-side latency"""
+    rng = np.random.default_rng(seed)
+    low = [29, 0, 0, 94, 126, 0, 0, 71, 0, 0, 0, 0, 0]
+    high = [77, 1, 3, 200, 564, 1, 2, 202, 1, 6.2, 2, 3, 3]
+    rows = rng.uniform(low, high, size=(requests, 13)).round(1)
+    client = InferenceClient(url)
+
+    def one(row):
+        start = time.perf_counter()
+        client.predict_proba([row])
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.array(list(pool.map(one, rows))) * 1000
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "throughput_rps": requests / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "server": client.metrics(),
+    }
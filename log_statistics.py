@@ -0,0 +1,90 @@
+import json
+import math
+import os
+
+
+class RunningStatistics:
+    """Aggregates over the prediction log, updated one entry at a time.
+
+    Holds everything get_statistics reports (counts, probability sum and
+    sum of squares, first/last timestamp, per-risk-level counts) plus the
+    log position the aggregates cover, so a snapshot loaded from disk can
+    be brought up to date by replaying only the entries written after it.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.positives = 0
+        self.probability_sum = 0.0
+        self.probability_sumsq = 0.0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.risk_levels = {}
+        self.position = None
+
+    def add(self, entry):
+        """Fold a single log entry into the aggregates"""
+        probability = float(entry["probability"])
+        self.count += 1
+        self.positives += int(entry["prediction"])
+        self.probability_sum += probability
+        self.probability_sumsq += probability * probability
+        self.first_timestamp = self.first_timestamp or entry["timestamp"]
+        self.last_timestamp = entry["timestamp"]
+        risk_level = entry.get("risk_level")
+        self.risk_levels[risk_level] = self.risk_levels.get(risk_level, 0) + 1
+
+    def summary(self):
+        """Statistics in the format returned by PredictionLogger.get_statistics"""
+        if not self.count:
+            return None
+
+        mean = self.probability_sum / self.count
+        variance = max(0.0, self.probability_sumsq / self.count - mean * mean)
+        return {
+            "total_predictions": self.count,
+            "positive_cases": self.positives,
+            "negative_cases": self.count - self.positives,
+            "avg_probability": mean,
+            "std_probability": math.sqrt(variance),
+            "risk_level_counts": dict(self.risk_levels),
+            "first_prediction": self.first_timestamp,
+            "last_prediction": self.last_timestamp
+        }
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "positives": self.positives,
+            "probability_sum": self.probability_sum,
+            "probability_sumsq": self.probability_sumsq,
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+            "risk_levels": self.risk_levels,
+            "position": self.position
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for key, value in data.items():
+            setattr(stats, key, value)
+        if stats.position is not None:
+            stats.position = tuple(stats.position)
+        return stats
+
+    def save(self, path):
+        """Atomically write the snapshot sidecar"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a snapshot, or return None if it is missing or unreadable"""
+        try:
+            with open(path, 'r') as f:
+                return cls.from_dict(json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
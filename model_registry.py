@@ -0,0 +1,194 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from forest_compiler import load_compiled
+
+
+def file_sha256(path, block_size=1 << 20):
+    """Content hash of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """Process-wide cache of the prediction model.
+
+    Streamlit re-executes the app script on every widget interaction, but
+    imported modules survive between reruns, so a registry living here loads
+    model.pkl once per process and hands the same object to every session
+    and thread. The artifact is re-checked cheaply with os.stat on each
+    access and only re-hashed (and reloaded if its content changed) when
+    its size or modification time moves.
+
+    With model_dir (or MODEL_DIR) set, the model comes from a versioned
+    ModelStore instead: the registry follows the store's ACTIVE pointer
+    and keeps the last keep_versions versions in memory, so switching back
+    to one of them (a rollback) is a pointer swap with no disk load.
+    Requests that already hold the previous model finish with it; while a
+    new version loads, other callers keep getting the current one.
+    """
+
+    def __init__(self, model_path=None, loader=load_compiled, model_dir=None, keep_versions=2):
+        self.model_path = model_path or os.environ.get('MODEL_PATH', 'model.pkl')
+        self.model_dir = model_dir if model_dir is not None else os.environ.get('MODEL_DIR')
+        self.store = None
+        if self.model_dir:
+            from model_store import ModelStore
+            self.store = ModelStore(self.model_dir)
+        self.loader = loader
+        self.keep_versions = keep_versions
+        self._lock = threading.Lock()
+        self._model = None
+        # (model, content hash) swapped in as one object so readers never see a mismatched pair
+        self._loaded = (None, None)
+        self._stat = None
+        # version name -> (model, content hash), least recently active first
+        self._versions = OrderedDict()
+        self._watcher = None
+        self._stop_watching = threading.Event()
+        self.content_hash = None
+        self.active_version = None
+        self.load_time = None
+        self.loaded_at = None
+        self.load_count = 0
+        self.swap_count = 0
+
+    def _artifact_stat(self):
+        st = os.stat(self.store.active_path if self.store else self.model_path)
+        return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def _swap(self, model, content_hash, version=None):
+        self.content_hash = content_hash
+        self.active_version = version
+        self._model = model
+        self._loaded = (model, content_hash)
+        self.swap_count += 1
+
+    def _load(self, path):
+        start = time.perf_counter()
+        model = self.loader(path)
+        self.load_time = time.perf_counter() - start
+        self.loaded_at = time.time()
+        self.load_count += 1
+        return model
+
+    def _load_active_version(self):
+        version = self.store.active_version()
+        if version is None:
+            raise FileNotFoundError(f"No active model version in {self.model_dir}")
+        if version == self.active_version:
+            return
+        if version in self._versions:
+            self._versions.move_to_end(version)
+            model, content_hash = self._versions[version]
+        else:
+            path = self.store.artifact_path(version)
+            content_hash = self.store.metadata(version)["content_hash"]
+            if file_sha256(path) != content_hash:
+                raise ValueError(f"Model version {version} does not match its content hash")
+            model = self._load(path)
+            self._versions[version] = (model, content_hash)
+            while len(self._versions) > self.keep_versions:
+                self._versions.popitem(last=False)
+        self._swap(model, content_hash, version)
+
+    def get_model(self):
+        """Return the shared model, reloading only if the artifact changed"""
+        current = self._artifact_stat()
+        if self._model is not None and current == self._stat:
+            return self._model
+
+        # If another thread is already loading the new model, keep serving the current one
+        if not self._lock.acquire(blocking=self._model is None):
+            return self._model
+        try:
+            # Another thread may have reloaded while we waited for the lock
+            current = self._artifact_stat()
+            if self._model is not None and current == self._stat:
+                return self._model
+
+            if self.store:
+                self._load_active_version()
+            else:
+                content_hash = file_sha256(self.model_path)
+                if self._model is None or content_hash != self.content_hash:
+                    self._swap(self._load(self.model_path), content_hash)
+
+            self._stat = current
+            return self._model
+        finally:
+            self._lock.release()
+
+    def rollback(self):
+        """Re-activate the previous store version and return it (from memory if still held)"""
+        if not self.store:
+            raise ValueError("Rollback needs a versioned model directory (MODEL_DIR)")
+        self.store.rollback()
+        return self.get_model()
+
+    def start_watcher(self, interval=2.0):
+        """Poll for a new active model in the background so requests never wait for a load"""
+        if self._watcher is not None:
+            return
+
+        def watch():
+            while not self._stop_watching.wait(interval):
+                try:
+                    self.get_model()
+                except Exception as e:
+                    # Keep serving the current model; a broken publish must not stop the watcher
+                    print(f"⚠️  Model reload failed: {e}")
+
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        if self._watcher is not None:
+            self._stop_watching.set()
+            self._watcher.join()
+            self._watcher = None
+
+    def version_of(self, model):
+        """Content hash of model if it is the one currently loaded, else None"""
+        loaded_model, content_hash = self._loaded
+        return content_hash if model is not None and model is loaded_model else None
+
+    @property
+    def memory_size(self):
+        """Bytes held by the loaded model's arrays (0 if nothing is loaded)"""
+        return getattr(self._model, 'nbytes', 0) if self._model is not None else 0
+
+    @property
+    def version(self):
+        """Short content hash identifying the loaded model"""
+        return self.content_hash[:12] if self.content_hash else None
+
+    def info(self):
+        """Summary of the loaded model for display and monitoring"""
+        return {
+            "model_path": self.model_path,
+            "model_dir": self.model_dir,
+            "active_version": self.active_version,
+            "versions_in_memory": list(self._versions),
+            "swap_count": self.swap_count,
+            "content_hash": self.content_hash,
+            "load_time": self.load_time,
+            "loaded_at": self.loaded_at,
+            "load_count": self.load_count,
+            "memory_size": self.memory_size,
+        }
+
+
+# Global registry instance
+registry = ModelRegistry()
+
+
+def get_model():
+    """Shortcut for the global registry's model"""
+    return registry.get_model()
@@ -0,0 +1,145 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+from model_registry import file_sha256
+
+# File inside the store naming the active version; replaced atomically
+ACTIVE_FILE = "ACTIVE"
+# Append-only log of activations, used for rollback
+HISTORY_FILE = "history.jsonl"
+METADATA_FILE = "metadata.json"
+
+
+class ModelStore:
+    """Versioned model directory with atomic publish and rollback.
+
+    Layout:
+        <root>/versions/<version>/model.pkl (or model.bundle)
+        <root>/versions/<version>/metadata.json
+        <root>/ACTIVE          name of the active version
+        <root>/history.jsonl   one line per activation
+
+    A version is written to a hidden temporary directory and renamed into
+    place, and ACTIVE is replaced with os.replace, so readers only ever see
+    complete versions and a complete pointer. Version names start with a
+    UTC timestamp and end with the artifact's content hash, so they sort in
+    publish order and identical artifacts are only stored once.
+    """
+
+    def __init__(self, root):
+        self.root = str(root)
+        self.versions_dir = os.path.join(self.root, "versions")
+        self.active_path = os.path.join(self.root, ACTIVE_FILE)
+        self.history_path = os.path.join(self.root, HISTORY_FILE)
+
+    def _write_atomic(self, path, text):
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def versions(self):
+        """Published version names, oldest first"""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(name for name in os.listdir(self.versions_dir)
+                      if not name.startswith(".") and os.path.isfile(os.path.join(self.versions_dir, name, METADATA_FILE)))
+
+    def metadata(self, version):
+        with open(os.path.join(self.versions_dir, version, METADATA_FILE), 'r') as f:
+            return json.load(f)
+
+    def artifact_path(self, version):
+        return os.path.join(self.versions_dir, version, self.metadata(version)["artifact"])
+
+    def find(self, content_hash):
+        """Version holding an artifact with this content hash, or None"""
+        for version in self.versions():
+            if version.endswith(content_hash[:12]) and self.metadata(version)["content_hash"] == content_hash:
+                return version
+        return None
+
+    def publish(self, artifact_path, metadata=None, activate=True):
+        """Copy a model artifact into a new version and (by default) make it active.
+
+        metadata is stored alongside it (e.g. accuracy, feature names);
+        content hash, timestamp and artifact name are added automatically.
+        Publishing an artifact that is already stored re-uses that version.
+        Returns the version name.
+        """
+        content_hash = file_sha256(artifact_path)
+        version = self.find(content_hash)
+        if version is None:
+            created = datetime.now(timezone.utc)
+            version = f"{created.strftime('%Y%m%dT%H%M%S%fZ')}-{content_hash[:12]}"
+            os.makedirs(self.versions_dir, exist_ok=True)
+            staging = os.path.join(self.versions_dir, f".{version}.{uuid.uuid4().hex}")
+            os.makedirs(staging)
+            try:
+                artifact = os.path.basename(artifact_path)
+                shutil.copyfile(artifact_path, os.path.join(staging, artifact))
+                with open(os.path.join(staging, METADATA_FILE), 'w') as f:
+                    json.dump({
+                        **(metadata or {}),
+                        "version": version,
+                        "content_hash": content_hash,
+                        "artifact": artifact,
+                        "created_at": created.isoformat(),
+                    }, f, indent=2)
+                os.rename(staging, os.path.join(self.versions_dir, version))
+            except BaseException:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+        if activate:
+            self.activate(version)
+        return version
+
+    def active_version(self):
+        """Name of the active version, or None if nothing has been activated"""
+        try:
+            with open(self.active_path, 'r') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def activate(self, version, action="activate"):
+        """Point ACTIVE at an existing version"""
+        if version not in self.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        self._write_atomic(self.active_path, version + "\n")
+        with open(self.history_path, 'a') as f:
+            f.write(json.dumps({"version": version, "action": action, "at": time.time()}) + "\n")
+
+    def history(self):
+        """Activations, oldest first"""
+        try:
+            with open(self.history_path, 'r') as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def rollback(self):
+        """Re-activate the version that was active before the current one.
+
+        Activations form a stack and each rollback pops one entry, so
+        repeated rollbacks walk back through earlier versions rather than
+        toggling between the last two.
+        """
+        stack = []
+        for entry in self.history():
+            if entry["action"] == "rollback" and len(stack) > 1:
+                stack.pop()
+            else:
+                stack.append(entry["version"])
+        active = self.active_version()
+        while len(stack) > 1:
+            stack.pop()
+            if stack[-1] != active:
+                self.activate(stack[-1], action="rollback")
+                return stack[-1]
+        raise ValueError("No earlier model version to roll back to")
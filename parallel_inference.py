@@ -0,0 +1,133 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from forest_compiler import CompiledForest, load_compiled
+
+# Smallest row range handed to a worker; below this the task overhead dominates
+MIN_ROWS_PER_TASK = 4096
+# Row ranges per worker, so a worker that finishes early picks up more work
+TASKS_PER_WORKER = 4
+
+
+def share_forest(forest):
+    """Copy a forest's node arrays into one shared memory block.
+
+    Returns (block, header); the header is the bundle header describing
+    where each array sits, so any process can rebuild the forest from the
+    block name and header with CompiledForest.from_buffer.
+    """
+    header, arrays, size = forest.bundle_layout()
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for name, a in arrays.items():
+        spec = header["arrays"][name]
+        np.ndarray(a.shape, dtype=a.dtype, buffer=block.buf, offset=spec["offset"])[...] = a
+    return block, header
+
+
+# ----------------------------------------------------------------------
+# Worker side
+# ----------------------------------------------------------------------
+_worker_block = None
+_worker_forest = None
+
+
+def _init_worker(block_name, header):
+    """Attach to the shared forest once per worker process"""
+    global _worker_block, _worker_forest
+    _worker_block = shared_memory.SharedMemory(name=block_name)
+    _worker_forest = CompiledForest.from_buffer(header, _worker_block.buf)
+
+
+def _score_range(input_name, output_name, shape, n_classes, start, stop):
+    """Score rows [start, stop) of the shared input straight into the shared output"""
+    input_block = shared_memory.SharedMemory(name=input_name)
+    output_block = shared_memory.SharedMemory(name=output_name)
+    try:
+        X = np.ndarray(shape, dtype=np.float32, buffer=input_block.buf)
+        out = np.ndarray((shape[0], n_classes), dtype=np.float64, buffer=output_block.buf)
+        out[start:stop] = _worker_forest.predict_proba(X[start:stop])
+        # Views must be gone before the blocks can be closed
+        del X, out
+    finally:
+        input_block.close()
+        output_block.close()
+    return stop - start
+
+
+class ParallelScorer:
+    """Score large matrices on a pool of processes sharing one copy of the forest.
+
+    The forest's node arrays are placed in shared memory once; every
+    worker maps them instead of unpickling the model. Each predict_proba
+    call copies the input into a shared block, hands workers row ranges
+    (just offsets, nothing is pickled but the block names) and lets them
+    write probabilities directly into a shared output block.
+    """
+
+    def __init__(self, forest, workers=None):
+        self.forest = forest
+        self.workers = workers or os.cpu_count() or 1
+        self._block, header = share_forest(forest)
+        try:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(self._block.name, header))
+        except Exception:
+            self._release(self._block)
+            raise
+        self.classes_ = forest.classes_
+        self.n_features_in_ = forest.n_features_in_
+        self.feature_names_in_ = forest.feature_names_in_
+
+    @classmethod
+    def from_path(cls, model_path='model.pkl', workers=None):
+        return cls(load_compiled(model_path), workers)
+
+    @staticmethod
+    def _release(block):
+        block.close()
+        block.unlink()
+
+    def _ranges(self, n_rows):
+        n_tasks = max(1, min(self.workers * TASKS_PER_WORKER, n_rows // MIN_ROWS_PER_TASK))
+        bounds = np.linspace(0, n_rows, n_tasks + 1).astype(int)
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def predict_proba(self, X):
+        X = self.forest._validate(X)
+        n_rows, n_classes = len(X), self.forest.n_classes_
+        input_block = shared_memory.SharedMemory(create=True, size=max(X.nbytes, 1))
+        try:
+            output_block = shared_memory.SharedMemory(create=True, size=max(n_rows * n_classes * 8, 1))
+        except Exception:
+            self._release(input_block)
+            raise
+        try:
+            shared_X = np.ndarray(X.shape, dtype=np.float32, buffer=input_block.buf)
+            shared_X[...] = X
+            del shared_X
+            futures = [self._pool.submit(_score_range, input_block.name, output_block.name, X.shape,
+                                         n_classes, int(start), int(stop))
+                       for start, stop in self._ranges(n_rows)]
+            for future in futures:
+                future.result()
+            return np.ndarray((n_rows, n_classes), dtype=np.float64, buffer=output_block.buf).copy()
+        finally:
+            self._release(input_block)
+            self._release(output_block)
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def close(self):
+        """Stop the workers and free the shared forest"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._release(self._block)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from model_registry import registry
+from scoring import score_patient
+
+
+class PredictionCache:
+    """Process-wide LRU cache of single-patient scores.
+
+    The app's widgets produce a small, discrete set of feature vectors and
+    Streamlit reruns score the same one again and again, so results are
+    kept per (model version, features) key. Features are canonicalised to
+    the float32 values the forest actually compares, so a cached result is
+    always identical to a fresh one. Entries expire after ttl seconds, the
+    least recently used entry is evicted once max_size is reached, and the
+    whole cache is dropped when the registry loads a different model.
+    """
+
+    def __init__(self, max_size=4096, ttl=3600.0, model_registry=registry, scorer=score_patient):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.registry = model_registry
+        self.scorer = scorer
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(features):
+        """Canonical cache key for one row of 13 feature values"""
+        return tuple(np.asarray(features, dtype=np.float32).ravel().tolist())
+
+    def _check_version(self, version):
+        """Drop every entry if the model changed (call with the lock held)"""
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def score(self, model, features):
+        """score_patient(model, features), served from the cache when possible.
+
+        Only the registry's current model is cached; any other model (for
+        example the inference service client) is scored directly, since its
+        version can't be tracked here.
+        """
+        version = self.registry.version_of(model)
+        if version is None or self.max_size <= 0:
+            return self.scorer(model, features)
+
+        key = self.key(features)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                result, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(result)
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+
+        result = self.scorer(model, features)
+
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (dict(result), now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Hit/miss/eviction counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "model_version": self._version[:12] if self._version else None,
+            }
+
+
+# Global cache instance
+prediction_cache = PredictionCache(
+    max_size=int(os.environ.get('PREDICTION_CACHE_SIZE', 4096)),
+    ttl=float(os.environ.get('PREDICTION_CACHE_TTL', 3600)),
+)
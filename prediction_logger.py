@@ -1,27 +1,74 @@
+import argparse
+import atexit
 import json
 import csv
 import os
+import queue
+import threading
+import time
+import uuid
 from datetime import datetime
 from pathlib import Path
+from prediction_store import create_store
+
+# Sentinel telling the writer thread to exit after draining the queue
+_STOP = object()
 
 class PredictionLogger:
-    """Logs predictions to JSON and CSV files for analytics"""
+    """Logs predictions to a prediction store and a CSV file for analytics.
+    
+    The store is selected with backend: "jsonl" (segmented JSON Lines files,
+    the default) or "sqlite" (an indexed SQLite database with query helpers).
+    
+    log_prediction only enqueues the entry; a single background writer
+    thread drains the queue in batches, writes JSON and CSV in one pass and
+    fsyncs at most every fsync_interval seconds, so predictions never wait
+    on disk. Written data is fsynced within fsync_interval even if no more
+    predictions arrive. The queue is bounded, and a full queue makes callers
+    wait for the writer rather than growing without limit. Pending entries
+    are flushed and fsynced on close() and at interpreter exit.
+    """
     
-    def __init__(self, log_dir="prediction_logs"):
+    CSV_FIELDS = ["timestamp", "prediction", "probability", "risk_level", "age", "gender"]
+    # Confirmed diagnoses, one JSON line per outcome, joined to predictions by id
+    OUTCOMES_FILE = "outcomes.jsonl"
+    
+    def __init__(self, log_dir="prediction_logs", backend="jsonl", async_writes=True,
+                 queue_size=10000, batch_size=256, fsync_interval=1.0, **store_options):
         self.log_dir = log_dir
+        # Legacy single-file JSON log, migrated into the store on first start
         self.json_file = os.path.join(log_dir, "predictions.json")
         self.csv_file = os.path.join(log_dir, "predictions.csv")
+        self.outcomes_file = os.path.join(log_dir, self.OUTCOMES_FILE)
         self._ensure_log_dir()
+        self.store = create_store(backend, log_dir, **store_options)
+        if os.path.exists(self.json_file) and len(self.store) == 0:
+            migrate_json_log(self.json_file, self.store)
+        
+        # Background writer
+        self.async_writes = async_writes
+        self.batch_size = batch_size
+        self.fsync_interval = fsync_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.RLock()
+        self._writer = None
+        self._last_fsync = time.monotonic()
+        # Entries written since the last fsync
+        self._unsynced = False
+        self._metrics = {"entries_written": 0, "batches_written": 0, "write_errors": 0,
+                         "last_flush_latency": 0.0, "max_flush_latency": 0.0, "total_flush_latency": 0.0}
+        atexit.register(self.close)
         
     def _ensure_log_dir(self):
         """Create log directory if it doesn't exist"""
         Path(self.log_dir).mkdir(exist_ok=True)
     
     def log_prediction(self, patient_data, prediction, probability, risk_level):
-        """Log a prediction to both JSON and CSV"""
+        """Queue a prediction for logging to both JSON and CSV"""
         timestamp = datetime.now().isoformat()
         
         log_entry = {
+            "id": uuid.uuid4().hex,
             "timestamp": timestamp,
             "patient_data": patient_data,
             "prediction": int(prediction),
@@ -29,81 +76,292 @@ class PredictionLogger:
             "risk_level": risk_level
         }
         
-        # Log to JSON
-        self._append_json(log_entry)
-        
-        # Log to CSV
-        self._append_csv(log_entry)
+        if self.async_writes:
+            self._ensure_writer()
+            self._queue.put(log_entry)
+        else:
+            self._write_batch([log_entry])
         
         return log_entry
     
-    def _append_json(self, entry):
-        """Append entry to JSON log file"""
-        try:
-            if os.path.exists(self.json_file):
-                with open(self.json_file, 'r') as f:
-                    data = json.load(f)
-            else:
-                data = []
+    # ------------------------------------------------------------------
+    # Background writer
+    # ------------------------------------------------------------------
+    def _ensure_writer(self):
+        """Start the writer thread on first use"""
+        if self._writer is None or not self._writer.is_alive():
+            with self._lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(target=self._writer_loop, name="prediction-log-writer",
+                                                    daemon=True)
+                    self._writer.start()
+    
+    def _writer_loop(self):
+        """Drain the queue in batches until the stop sentinel arrives"""
+        while True:
+            # With unsynced data, wake up when its fsync is due even if nothing else arrives
+            timeout = None
+            if self._unsynced:
+                timeout = max(0.0, self.fsync_interval - (time.monotonic() - self._last_fsync))
+            try:
+                batch = [self._queue.get(timeout=timeout)]
+            except queue.Empty:
+                self._sync()
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stop = _STOP in batch
+            entries = [entry for entry in batch if entry is not _STOP]
+            try:
+                self._write_batch(entries)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+    
+    def _write_batch(self, entries):
+        """Write a batch of entries to JSON and CSV in one pass"""
+        if not entries:
+            return
+        start = time.perf_counter()
+        with self._lock:
+            fsync = time.monotonic() - self._last_fsync >= self.fsync_interval
+            
+            # Log to the prediction store
+            self._append_store(entries, fsync)
             
-            data.append(entry)
+            # Log to CSV
+            self._append_csv(entries, fsync)
             
-            with open(self.json_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            if fsync:
+                self._last_fsync = time.monotonic()
+            self._unsynced = not fsync
+            
+            latency = time.perf_counter() - start
+            self._metrics["entries_written"] += len(entries)
+            self._metrics["batches_written"] += 1
+            self._metrics["last_flush_latency"] = latency
+            self._metrics["max_flush_latency"] = max(self._metrics["max_flush_latency"], latency)
+            self._metrics["total_flush_latency"] += latency
+    
+    def _sync(self):
+        """fsync everything written so far to the store and the CSV file"""
+        with self._lock:
+            if not self._unsynced:
+                return
+            try:
+                self.store.sync()
+                if os.path.exists(self.csv_file):
+                    with open(self.csv_file, 'a') as f:
+                        os.fsync(f.fileno())
+            except Exception as e:
+                self._metrics["write_errors"] += 1
+                print(f"Error syncing prediction logs: {e}")
+            self._last_fsync = time.monotonic()
+            self._unsynced = False
+    
+    def flush(self):
+        """Block until every queued entry has been written"""
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.join()
+    
+    def metrics(self):
+        """Writer queue depth, throughput and flush latency"""
+        with self._lock:
+            metrics = dict(self._metrics)
+        batches = max(1, metrics["batches_written"])
+        metrics["queue_depth"] = self._queue.qsize()
+        metrics["avg_flush_latency"] = metrics.pop("total_flush_latency") / batches
+        metrics["avg_batch_size"] = metrics["entries_written"] / batches
+        return metrics
+    
+    def _append_store(self, entries, fsync=False):
+        """Write entries to the prediction store"""
+        try:
+            self.store.write_batch(entries, fsync=fsync)
         except Exception as e:
-            print(f"Error logging to JSON: {e}")
+            self._metrics["write_errors"] += 1
+            print(f"Error logging to {self.store.backend}: {e}")
     
-    def _append_csv(self, entry):
-        """Append entry to CSV log file"""
+    def _append_csv(self, entries, fsync=False):
+        """Append entries to CSV log file"""
         try:
-            fieldnames = ["timestamp", "prediction", "probability", "risk_level", "age", "gender"]
-            
             file_exists = os.path.exists(self.csv_file)
             
             with open(self.csv_file, 'a', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
+                writer = csv.DictWriter(f, fieldnames=self.CSV_FIELDS)
                 
                 if not file_exists:
                     writer.writeheader()
                 
-                row = {
+                writer.writerows({
                     "timestamp": entry["timestamp"],
                     "prediction": entry["prediction"],
                     "probability": entry["probability"],
                     "risk_level": entry["risk_level"],
                     "age": entry["patient_data"].get("age", ""),
                     "gender": entry["patient_data"].get("gender", "")
-                }
-                writer.writerow(row)
+                } for entry in entries)
+                
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
         except Exception as e:
+            self._metrics["write_errors"] += 1
             print(f"Error logging to CSV: {e}")
     
+    # ------------------------------------------------------------------
+    # Confirmed outcomes
+    # ------------------------------------------------------------------
+    def record_outcome(self, prediction_id, outcome):
+        """Record the confirmed diagnosis (0 or 1) for a logged prediction; a later record replaces an earlier one"""
+        outcome = int(outcome)
+        if outcome not in (0, 1):
+            raise ValueError(f"Outcome must be 0 or 1, got {outcome}")
+        record = {"id": str(prediction_id), "outcome": outcome, "timestamp": datetime.now().isoformat()}
+        with self._lock:
+            with open(self.outcomes_file, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        return record
+    
+    def outcomes(self):
+        """Latest confirmed outcome per prediction id"""
+        outcomes = {}
+        try:
+            with open(self.outcomes_file, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn final line from a crash
+                        continue
+                    outcomes[record["id"]] = record["outcome"]
+        except FileNotFoundError:
+            pass
+        return outcomes
+    
+    def labeled_entries(self):
+        """Logged predictions that have a confirmed outcome, in write order, with an "outcome" key added"""
+        self.flush()
+        outcomes = self.outcomes()
+        if not outcomes:
+            return
+        for entry in self.store.iter_entries():
+            if entry.get("id") in outcomes:
+                yield dict(entry, outcome=outcomes[entry["id"]])
+    
+    # ------------------------------------------------------------------
+    # Statistics
+    # ------------------------------------------------------------------
+    def rebuild_statistics(self):
+        """Recompute the statistics from the full log"""
+        with self._lock:
+            return self.store.rebuild_statistics()
+    
     def get_statistics(self):
-        """Get prediction statistics"""
+        """Get prediction statistics (entries still queued are not yet counted)"""
         try:
-            if not os.path.exists(self.json_file):
-                return None
-            
-            with open(self.json_file, 'r') as f:
-                data = json.load(f)
-            
-            if not data:
-                return None
-            
-            predictions = [entry["prediction"] for entry in data]
-            probabilities = [entry["probability"] for entry in data]
-            
-            return {
-                "total_predictions": len(data),
-                "positive_cases": sum(predictions),
-                "negative_cases": len(predictions) - sum(predictions),
-                "avg_probability": sum(probabilities) / len(probabilities),
-                "first_prediction": data[0]["timestamp"],
-                "last_prediction": data[-1]["timestamp"]
-            }
+            with self._lock:
+                return self.store.statistics()
         except Exception as e:
             print(f"Error getting statistics: {e}")
             return None
+    
+    def close(self):
+        """Flush queued entries, fsync them and close the prediction store"""
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        with self._lock:
+            self._sync()
+            self.store.close()
+
 
-# Global logger instance
-logger = PredictionLogger()
+def migrate_json_log(json_file, store):
+    """Copy entries from a legacy predictions.json array into a prediction store.
+    
+    The source file is renamed to <name>.migrated afterwards so it is not
+    imported twice. Returns the number of migrated entries, or None if
+    only <name>.migrated exists (the file was already migrated).
+    """
+    if not os.path.exists(json_file) and os.path.exists(json_file + ".migrated"):
+        store.close()
+        return None
+    with open(json_file, 'r') as f:
+        entries = json.load(f)
+    
+    batch_size = 1000
+    for start in range(0, len(entries), batch_size):
+        store.write_batch(entries[start:start + batch_size])
+    store.close()
+    
+    os.replace(json_file, json_file + ".migrated")
+    return len(entries)
+
+# Global logger instance, configured from the environment and created on first access
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def __getattr__(name):
+    """Create the global `logger` lazily, so the maintenance CLI never opens (or auto-migrates) the default store"""
+    global _logger
+    if name != "logger":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _logger_lock:
+        if _logger is None:
+            _logger = PredictionLogger(
+                log_dir=os.environ.get("LOG_DIR", "prediction_logs"),
+                backend=os.environ.get("LOG_BACKEND", "jsonl")
+            )
+    return _logger
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prediction log maintenance")
+    parser.add_argument("--log-dir", default=os.environ.get("LOG_DIR", "prediction_logs"))
+    parser.add_argument("--backend", choices=["jsonl", "sqlite"], default=os.environ.get("LOG_BACKEND", "jsonl"))
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    migrate_parser = subparsers.add_parser("migrate", help="Import a legacy predictions.json into the selected backend")
+    migrate_parser.add_argument("json_file", nargs="?", help="default: <log-dir>/predictions.json")
+    
+    subparsers.add_parser("rebuild-stats", help="Recompute the statistics from the log")
+    
+    outcome_parser = subparsers.add_parser("outcome", help="Record confirmed diagnoses for logged predictions")
+    outcome_parser.add_argument("prediction_id", nargs="?", help="id shown with the prediction")
+    outcome_parser.add_argument("outcome", nargs="?", type=int, choices=[0, 1], help="1 = heart disease confirmed")
+    outcome_parser.add_argument("--file", help="CSV with id and outcome columns, for many outcomes at once")
+    
+    args = parser.parse_args()
+    
+    if args.command == "migrate":
+        json_file = args.json_file or os.path.join(args.log_dir, "predictions.json")
+        Path(args.log_dir).mkdir(exist_ok=True)
+        count = migrate_json_log(json_file, create_store(args.backend, args.log_dir))
+        if count is None:
+            print(f"✅ {json_file} was already migrated ({json_file}.migrated)")
+        else:
+            print(f"✅ Migrated {count} predictions into {args.log_dir} ({args.backend})")
+    elif args.command == "rebuild-stats":
+        stats = create_store(args.backend, args.log_dir).rebuild_statistics()
+        print(f"✅ Rebuilt statistics over {stats['total_predictions'] if stats else 0} predictions")
+    elif args.command == "outcome":
+        target = PredictionLogger(args.log_dir, args.backend, async_writes=False)
+        if args.file:
+            with open(args.file, 'r', newline='') as f:
+                rows = [(row["id"], row["outcome"]) for row in csv.DictReader(f)]
+        elif args.prediction_id and args.outcome is not None:
+            rows = [(args.prediction_id, args.outcome)]
+        else:
+            parser.error("give a prediction id and outcome, or --file")
+        for prediction_id, outcome in rows:
+            target.record_outcome(prediction_id, outcome)
+        print(f"✅ Recorded {len(rows)} outcome(s); {len(target.outcomes())} predictions now labeled")
@@ -0,0 +1,342 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from segmented_log import SegmentedLog
+from log_statistics import RunningStatistics
+
+# Patient fields stored as columns, in the order the app collects them
+PATIENT_FIELDS = ["age", "gender", "cp", "trtbps", "chol", "fbs", "restecg",
+                  "thalachh", "exng", "oldpeak", "slp", "caa", "thall"]
+
+
+class JSONLinesStore:
+    """Prediction store backed by segmented JSON Lines files.
+
+    Statistics are running aggregates kept in memory and snapshotted to a
+    sidecar file together with the log position they cover, so they are
+    brought up to date by replaying only what was written after the
+    snapshot.
+    """
+
+    backend = "jsonl"
+
+    def __init__(self, log_dir, max_segment_bytes=16 * 1024 * 1024, max_segment_age=24 * 60 * 60,
+                 snapshot_interval=100):
+        self.log_dir = log_dir
+        self.stats_file = os.path.join(log_dir, "predictions.stats.json")
+        self.log = SegmentedLog(log_dir, "predictions", max_segment_bytes, max_segment_age)
+        self.snapshot_interval = snapshot_interval
+        self._unsaved = 0
+        self.stats = RunningStatistics.load(self.stats_file) or RunningStatistics()
+        self._catch_up()
+
+    def __len__(self):
+        return len(self.log)
+
+    def write_batch(self, entries, fsync=False):
+        """Append entries to the log and fold them into the running statistics"""
+        caught_up = self.log.is_end(self.stats.position)
+        position = self.log.append_many(entries, fsync=fsync)
+        if caught_up:
+            for entry in entries:
+                self.stats.add(entry)
+            self.stats.position = position
+            self._unsaved += len(entries)
+            if self._unsaved >= self.snapshot_interval:
+                self.save_statistics()
+
+    def sync(self):
+        """Make every written entry durable"""
+        self.log.sync()
+
+    def _catch_up(self):
+        """Replay log entries written after the statistics snapshot"""
+        if self.log.is_end(self.stats.position):
+            return
+        try:
+            for entry, position in self.log.iter_from(self.stats.position):
+                self.stats.add(entry)
+                self.stats.position = position
+                self._unsaved += 1
+        except KeyError:
+            # Snapshot points at a segment that no longer exists
+            self.rebuild_statistics()
+            return
+        self.save_statistics()
+
+    def save_statistics(self):
+        """Persist the running statistics snapshot"""
+        self.stats.save(self.stats_file)
+        self._unsaved = 0
+
+    def rebuild_statistics(self):
+        """Recompute the statistics snapshot from the full log"""
+        self.stats = RunningStatistics()
+        for entry, position in self.log.iter_from(None):
+            self.stats.add(entry)
+            self.stats.position = position
+        self.save_statistics()
+        return self.stats.summary()
+
+    def statistics(self):
+        self._catch_up()
+        return self.stats.summary()
+
+    def iter_entries(self, start=None, end=None):
+        return self.log.iter_entries(start, end)
+
+    def close(self):
+        if self._unsaved:
+            self.save_statistics()
+        self.log.close()
+
+
+class SQLiteStore:
+    """Prediction store backed by a SQLite database in WAL mode.
+
+    Every patient field gets its own column, with indexes on timestamp,
+    risk_level, prediction and age so analytics queries don't scan the
+    whole table. Aggregates for get_statistics are kept in summary tables
+    maintained by insert triggers, so reading them costs the same at any
+    table size. Connections come from a small pool shared by all threads
+    (Streamlit runs every rerun on a new thread, so per-thread connections
+    would pile up); WAL lets readers proceed while the writer thread
+    inserts.
+    """
+
+    backend = "sqlite"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS predictions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            prediction_id TEXT,
+            timestamp TEXT NOT NULL,
+            prediction INTEGER NOT NULL,
+            probability REAL NOT NULL,
+            risk_level TEXT,
+            {patient_columns},
+            patient_data TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_predictions_timestamp ON predictions (timestamp);
+        CREATE INDEX IF NOT EXISTS idx_predictions_risk_level ON predictions (risk_level, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_predictions_prediction ON predictions (prediction, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_predictions_age ON predictions (age);
+
+        CREATE TABLE IF NOT EXISTS prediction_summary (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            count INTEGER NOT NULL DEFAULT 0,
+            positives INTEGER NOT NULL DEFAULT 0,
+            probability_sum REAL NOT NULL DEFAULT 0,
+            probability_sumsq REAL NOT NULL DEFAULT 0,
+            first_timestamp TEXT,
+            last_timestamp TEXT
+        );
+        INSERT OR IGNORE INTO prediction_summary (id) VALUES (1);
+        CREATE TABLE IF NOT EXISTS risk_level_summary (
+            risk_level TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TRIGGER IF NOT EXISTS predictions_summary_insert AFTER INSERT ON predictions
+        BEGIN
+            UPDATE prediction_summary SET
+                count = count + 1,
+                positives = positives + NEW.prediction,
+                probability_sum = probability_sum + NEW.probability,
+                probability_sumsq = probability_sumsq + NEW.probability * NEW.probability,
+                first_timestamp = COALESCE(first_timestamp, NEW.timestamp),
+                last_timestamp = NEW.timestamp
+            WHERE id = 1;
+            INSERT INTO risk_level_summary (risk_level, count) VALUES (NEW.risk_level, 1)
+                ON CONFLICT (risk_level) DO UPDATE SET count = count + 1;
+        END;
+    """
+
+    def __init__(self, db_path, pool_size=4):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        patient_columns = ",\n            ".join(f"{field} REAL" for field in PATIENT_FIELDS)
+        with self._connected() as connection:
+            connection.executescript(self.SCHEMA.format(patient_columns=patient_columns))
+            # Databases created before predictions had ids
+            if "prediction_id" not in {row["name"] for row in connection.execute("PRAGMA table_info(predictions)")}:
+                connection.execute("ALTER TABLE predictions ADD COLUMN prediction_id TEXT")
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @contextmanager
+    def _connected(self):
+        """Borrow a pooled connection; at most pool_size are ever open, and callers wait when all are busy"""
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = None
+            with self._connections_lock:
+                if len(self._connections) < self.pool_size:
+                    connection = self._connect()
+                    self._connections.append(connection)
+            if connection is None:
+                connection = self._idle.get()
+        try:
+            yield connection
+        finally:
+            with self._connections_lock:
+                # Connections closed by close() while borrowed are dropped
+                if any(connection is open_connection for open_connection in self._connections):
+                    self._idle.put(connection)
+
+    def __len__(self):
+        with self._connected() as connection:
+            return connection.execute("SELECT count FROM prediction_summary").fetchone()[0]
+
+    @staticmethod
+    def _row(entry):
+        patient_data = entry.get("patient_data") or {}
+        return ([entry.get("id"), entry["timestamp"], int(entry["prediction"]), float(entry["probability"]),
+                 entry.get("risk_level")]
+                + [patient_data.get(field) for field in PATIENT_FIELDS]
+                + [json.dumps(patient_data)])
+
+    def write_batch(self, entries, fsync=False):
+        """Insert entries in a single transaction"""
+        columns = (["prediction_id", "timestamp", "prediction", "probability", "risk_level"] + PATIENT_FIELDS
+                   + ["patient_data"])
+        sql = f"INSERT INTO predictions ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        with self._connected() as connection:
+            with connection:
+                connection.executemany(sql, [self._row(entry) for entry in entries])
+            if fsync:
+                # Fold the WAL into the main database file so it is durable on its own
+                connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def sync(self):
+        """Make every written entry durable"""
+        with self._connected() as connection:
+            connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def statistics(self):
+        with self._connected() as connection:
+            summary = connection.execute("SELECT * FROM prediction_summary").fetchone()
+            risk_levels = {row["risk_level"]: row["count"] for row in
+                           connection.execute("SELECT risk_level, count FROM risk_level_summary")}
+        stats = RunningStatistics()
+        stats.count = summary["count"]
+        stats.positives = summary["positives"]
+        stats.probability_sum = summary["probability_sum"]
+        stats.probability_sumsq = summary["probability_sumsq"]
+        stats.first_timestamp = summary["first_timestamp"]
+        stats.last_timestamp = summary["last_timestamp"]
+        stats.risk_levels = risk_levels
+        return stats.summary()
+
+    def rebuild_statistics(self):
+        """Recompute the summary tables from the predictions table"""
+        with self._connected() as connection, connection:
+            connection.execute("""
+                UPDATE prediction_summary SET
+                    count = (SELECT COUNT(*) FROM predictions),
+                    positives = (SELECT COALESCE(SUM(prediction), 0) FROM predictions),
+                    probability_sum = (SELECT COALESCE(SUM(probability), 0) FROM predictions),
+                    probability_sumsq = (SELECT COALESCE(SUM(probability * probability), 0) FROM predictions),
+                    first_timestamp = (SELECT timestamp FROM predictions ORDER BY id LIMIT 1),
+                    last_timestamp = (SELECT timestamp FROM predictions ORDER BY id DESC LIMIT 1)
+                WHERE id = 1
+            """)
+            connection.execute("DELETE FROM risk_level_summary")
+            connection.execute("""
+                INSERT INTO risk_level_summary (risk_level, count)
+                SELECT risk_level, COUNT(*) FROM predictions GROUP BY risk_level
+            """)
+        return self.statistics()
+
+    # ------------------------------------------------------------------
+    # Query helpers for the Analytics tab
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _filters(start=None, end=None, risk_levels=None, prediction=None, min_age=None, max_age=None):
+        clauses, params = [], []
+        if start:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            clauses.append("timestamp <= ?")
+            params.append(end)
+        if risk_levels:
+            clauses.append(f"risk_level IN ({', '.join('?' * len(risk_levels))})")
+            params.extend(risk_levels)
+        if prediction is not None:
+            clauses.append("prediction = ?")
+            params.append(int(prediction))
+        if min_age is not None:
+            clauses.append("age >= ?")
+            params.append(min_age)
+        if max_age is not None:
+            clauses.append("age <= ?")
+            params.append(max_age)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def query(self, start=None, end=None, risk_levels=None, prediction=None, min_age=None, max_age=None,
+              limit=1000):
+        """Predictions matching the filters, newest first"""
+        where, params = self._filters(start, end, risk_levels, prediction, min_age, max_age)
+        columns = ["timestamp", "prediction", "probability", "risk_level"] + PATIENT_FIELDS
+        sql = f"SELECT {', '.join(columns)} FROM predictions {where} ORDER BY timestamp DESC LIMIT ?"
+        with self._connected() as connection:
+            return [dict(row) for row in connection.execute(sql, params + [limit])]
+
+    def count(self, start=None, end=None, risk_levels=None, prediction=None, min_age=None, max_age=None):
+        """Number of predictions matching the filters"""
+        where, params = self._filters(start, end, risk_levels, prediction, min_age, max_age)
+        with self._connected() as connection:
+            return connection.execute(f"SELECT COUNT(*) FROM predictions {where}", params).fetchone()[0]
+
+    def daily_counts(self, start=None, end=None):
+        """Predictions and positive cases per day"""
+        where, params = self._filters(start, end)
+        sql = f"""
+            SELECT substr(timestamp, 1, 10) AS day, COUNT(*) AS predictions, SUM(prediction) AS positive_cases
+            FROM predictions {where} GROUP BY day ORDER BY day
+        """
+        with self._connected() as connection:
+            return [dict(row) for row in connection.execute(sql, params)]
+
+    def iter_entries(self, start=None, end=None):
+        where, params = self._filters(start, end)
+        sql = (f"SELECT prediction_id, timestamp, prediction, probability, risk_level, patient_data "
+               f"FROM predictions {where} ORDER BY id")
+        with self._connected() as connection:
+            for row in connection.execute(sql, params):
+                entry = dict(row)
+                prediction_id = entry.pop("prediction_id")
+                if prediction_id is not None:
+                    entry["id"] = prediction_id
+                entry["patient_data"] = json.loads(entry["patient_data"] or "{}")
+                yield entry
+
+    def close(self):
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+            self._idle = queue.LifoQueue()
+
+
+def create_store(backend, log_dir, **options):
+    """Build the prediction store selected by backend ('jsonl' or 'sqlite')"""
+    if backend == "jsonl":
+        return JSONLinesStore(log_dir, **options)
+    if backend == "sqlite":
+        return SQLiteStore(os.path.join(log_dir, "predictions.db"), **options)
+    raise ValueError(f"Unknown prediction log backend: {backend!r}")
@@ -0,0 +1,217 @@
+import json
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from scoring import FEATURES
+from training import DEFAULT_PARAMS, holdout_split, load_dataset
+
+# Labeled rows kept as a uniform sample of everything the model has been trained on
+RESERVOIR_SIZE = 2000
+# Trees added (or replaced) per retraining round
+RETRAIN_TREES = 20
+# Per-version retraining state inside the model store
+STATE_DIR = "retraining"
+MODES = ("add", "replace")
+
+
+class Reservoir:
+    """Fixed-size uniform sample of every labeled row added so far (reservoir sampling).
+
+    After n rows have been added each one is in the sample with
+    probability capacity / n, so the old data a retraining round mixes
+    in stays representative however long the model has been running.
+    The random draws are seeded by the number of rows seen, so replaying
+    the same additions gives the same sample.
+    """
+
+    def __init__(self, capacity=RESERVOIR_SIZE, X=None, y=None, seen=0, seed=0):
+        self.capacity = capacity
+        self.X = np.empty((0, len(FEATURES))) if X is None else np.asarray(X, dtype=np.float64)
+        self.y = np.empty(0, dtype=int) if y is None else np.asarray(y, dtype=int)
+        self.seen = seen
+        self.seed = seed
+
+    def __len__(self):
+        return len(self.y)
+
+    def add(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=int)
+        rng = np.random.default_rng([self.seed, self.seen])
+        fill = max(0, min(self.capacity - len(self), len(y)))
+        self.X = np.concatenate([self.X, X[:fill]])
+        self.y = np.concatenate([self.y, y[:fill]])
+        for i in range(fill, len(y)):
+            slot = rng.integers(0, self.seen + i + 1)
+            if slot < self.capacity:
+                self.X[slot] = X[i]
+                self.y[slot] = y[i]
+        self.seen += len(y)
+
+    def to_dict(self):
+        return {"capacity": self.capacity, "seen": self.seen, "seed": self.seed,
+                "X": self.X.tolist(), "y": self.y.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["capacity"], data["X"], data["y"], data["seen"], data["seed"])
+
+
+def labeled_records(logger):
+    """(ids, X, y) of logged predictions with a confirmed outcome and all 13 features"""
+    ids, rows, outcomes = [], [], []
+    for entry in logger.labeled_entries():
+        patient = entry.get("patient_data") or {}
+        try:
+            row = [float(patient[feature]) for feature in FEATURES]
+        except (KeyError, TypeError, ValueError):
+            continue
+        ids.append(entry["id"])
+        rows.append(row)
+        outcomes.append(int(entry["outcome"]))
+    return ids, np.array(rows, dtype=np.float64).reshape(-1, len(FEATURES)), np.array(outcomes, dtype=int)
+
+
+def _state_path(store, version):
+    return os.path.join(store.root, STATE_DIR, f"{version}.json")
+
+
+def load_state(store, version, reservoir_size=RESERVOIR_SIZE, data_path='data/heart.csv'):
+    """Retraining state (reservoir, ids already trained on, rounds) of a model version.
+
+    A version that was never retrained (e.g. trained by model.py) starts
+    with an empty id list and a reservoir seeded from the original
+    training split. State is kept per version, so after a rollback the
+    next round continues from the rolled-back model's own state.
+    """
+    if version is not None:
+        try:
+            with open(_state_path(store, version), 'r') as f:
+                state = json.load(f)
+            return Reservoir.from_dict(state["reservoir"]), set(state["used_ids"]), state["rounds"]
+        except FileNotFoundError:
+            pass
+    X_train, _, y_train, _ = holdout_split(*load_dataset(data_path))
+    reservoir = Reservoir(reservoir_size)
+    reservoir.add(X_train.to_numpy(dtype=np.float64), y_train.to_numpy())
+    return reservoir, set(), 0
+
+
+def save_state(store, version, reservoir, used_ids, rounds):
+    path = _state_path(store, version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"reservoir": reservoir.to_dict(), "used_ids": sorted(used_ids), "rounds": rounds}, f)
+    os.replace(tmp_path, path)
+
+
+def _frame(model, X):
+    """Rows as a frame with the model's training column names, so fitting keeps feature_names_in_"""
+    names = getattr(model, "feature_names_in_", None)
+    return X if names is None else pd.DataFrame(X, columns=names)
+
+
+def _accuracy(model, X, y):
+    return float(np.mean(model.predict(_frame(model, X)) == y)) if len(y) else None
+
+
+def retrain(store, logger, mode="add", trees=RETRAIN_TREES, reservoir_size=RESERVOIR_SIZE, compare_full=True,
+            activate=True, base_path='model.pkl', data_path='data/heart.csv', log=print):
+    """Fold newly labeled predictions into the active model and publish the result as a new version.
+
+    Only new trees are trained, on the labeled predictions not yet used
+    plus the reservoir sample of older data. mode="add" grows the forest
+    by `trees` (warm_start); mode="replace" first drops the `trees`
+    oldest trees, so the forest stays the same size and forgets the
+    oldest data as a rolling window. With compare_full a forest is also
+    trained from scratch on all data for the wall-time and accuracy
+    comparison. Returns a report dict (version, timings, accuracy drift).
+    """
+    import joblib
+
+    if mode not in MODES:
+        raise ValueError(f"Unknown retraining mode: {mode!r} (expected one of {MODES})")
+    base_version = store.active_version()
+    artifact = store.artifact_path(base_version) if base_version else base_path
+    model = joblib.load(artifact)
+    if not hasattr(model, "estimators_"):
+        raise ValueError(f"{artifact} is not a scikit-learn forest; retraining needs the pickled model")
+    if mode == "replace" and trees >= len(model.estimators_):
+        raise ValueError(f"Can't replace {trees} of {len(model.estimators_)} trees")
+
+    reservoir, used_ids, rounds = load_state(store, base_version, reservoir_size, data_path)
+    ids, X_labeled, y_labeled = labeled_records(logger)
+    new = np.array([prediction_id not in used_ids for prediction_id in ids], dtype=bool)
+    if not new.any():
+        raise ValueError("No newly labeled predictions to train on")
+    X_new, y_new = X_labeled[new], y_labeled[new]
+    X_fit = np.concatenate([X_new, reservoir.X])
+    y_fit = np.concatenate([y_new, reservoir.y])
+    if len(np.unique(y_fit)) < 2:
+        raise ValueError("Retraining data has a single class")
+    log(f"🔁 Retraining on {len(y_new)} new labeled prediction(s) + {len(reservoir)} reservoir rows ({mode} "
+        f"{trees} trees)...")
+
+    _, X_test, _, y_test = holdout_split(*load_dataset(data_path))
+    X_test, y_test = X_test.to_numpy(dtype=np.float64), y_test.to_numpy()
+    # The base model has never seen the new labels, so this is its live accuracy
+    base_live = _accuracy(model, X_new, y_new)
+    base_holdout = _accuracy(model, X_test, y_test)
+
+    start = time.perf_counter()
+    if mode == "replace":
+        del model.estimators_[:trees]
+    else:
+        model.set_params(n_estimators=len(model.estimators_) + trees)
+    seed = DEFAULT_PARAMS["random_state"] + rounds + 1
+    model.set_params(warm_start=True, random_state=seed, n_jobs=-1)
+    model.fit(_frame(model, X_fit), y_fit)
+    model.set_params(warm_start=False, n_jobs=None)
+    fit_seconds = time.perf_counter() - start
+    updated_holdout = _accuracy(model, X_test, y_test)
+
+    report = {
+        "mode": mode,
+        "base_version": base_version,
+        "new_records": int(len(y_new)),
+        "labeled_total": int(len(used_ids) + len(y_new)),
+        "reservoir_rows": len(reservoir),
+        "n_estimators": len(model.estimators_),
+        "fit_seconds": fit_seconds,
+        "accuracy": {"base_holdout": base_holdout, "updated_holdout": updated_holdout,
+                     "base_on_new_labels": base_live},
+    }
+    if compare_full:
+        from sklearn.ensemble import RandomForestClassifier
+
+        X_train, _, y_train, _ = holdout_split(*load_dataset(data_path))
+        X_all = np.concatenate([X_train.to_numpy(dtype=np.float64), X_labeled])
+        y_all = np.concatenate([y_train.to_numpy(), y_labeled])
+        start = time.perf_counter()
+        full = RandomForestClassifier(**{**DEFAULT_PARAMS, "n_estimators": len(model.estimators_)}, n_jobs=-1)
+        full.fit(_frame(model, X_all), y_all)
+        report["full_retrain_seconds"] = time.perf_counter() - start
+        report["speedup"] = report["full_retrain_seconds"] / fit_seconds
+        report["accuracy"]["full_retrain_holdout"] = _accuracy(full, X_test, y_test)
+    # Positive when the new model scores better on the original holdout than the one it replaces
+    report["accuracy"]["holdout_drift"] = updated_holdout - base_holdout
+
+    reservoir.add(X_new, y_new)
+    used_ids.update(prediction_id for prediction_id, is_new in zip(ids, new) if is_new)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "model.pkl")
+        joblib.dump(model, path)
+        version = store.publish(path, {
+            "accuracy": updated_holdout,
+            "n_estimators": len(model.estimators_),
+            "test_rows": len(y_test),
+            "training_columns": list(getattr(model, "feature_names_in_", FEATURES)),
+            "feature_schema": FEATURES,
+            "retraining": report,
+        }, activate=activate)
+    save_state(store, version, reservoir, used_ids, rounds + 1)
+    report["version"] = version
+    return report
@@ -0,0 +1,256 @@
+import time
+import numpy as np
+from scoring import FEATURES
+
+# Values each input can take in app_enhanced.py, in model feature order
+APP_DOMAIN = {
+    "age": np.arange(18, 121),
+    "gender": [0, 1],
+    "cp": [0, 1, 2, 3],
+    "trtbps": np.arange(80, 251),
+    "chol": np.arange(0, 601),
+    "fbs": [0, 1],
+    "restecg": [0, 1, 2],
+    "thalachh": np.arange(40, 221),
+    "exng": [0, 1],
+    "oldpeak": np.round(np.arange(0, 101) / 10, 1),
+    "slp": [0, 1, 2],
+    "caa": [0, 1, 2, 3, 4],
+    "thall": [0, 1, 2, 3],
+}
+
+
+class TableSizeError(ValueError):
+    """Raised when the requested subspace has more cells than allowed"""
+
+
+def feature_thresholds(forest):
+    """Sorted distinct split thresholds used on each feature"""
+    internal = ~np.asarray(forest.is_leaf)
+    feature = np.asarray(forest.feature)
+    threshold = np.asarray(forest.threshold, dtype=np.float64)
+    return [np.unique(threshold[internal & (feature == f)]) for f in range(forest.n_features_in_)]
+
+
+def threshold_bins(thresholds, values):
+    """Bin of each value: the number of thresholds strictly below it.
+
+    Values are compared as float32, like the forest does, so two inputs in
+    the same bin on every feature take the same path through every tree.
+    """
+    return np.searchsorted(thresholds, np.asarray(values, dtype=np.float32).astype(np.float64), side='left')
+
+
+def parse_domain(specs):
+    """Domain overrides from 'feature=a,b,c' or 'feature=low:high[:step]' strings"""
+    domain = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in APP_DOMAIN or not values:
+            raise ValueError(f"Invalid domain '{spec}': expected feature=a,b,c or feature=low:high[:step] "
+                             f"with feature one of {', '.join(FEATURES)}")
+        if ":" in values:
+            low, high, *step = (float(v) for v in values.split(":"))
+            step = step[0] if step else 1.0
+            domain[name] = np.round(np.arange(low, high + step / 2, step), 6)
+        else:
+            domain[name] = [float(v) for v in values.split(",")]
+    return domain
+
+
+def sample_subspace(domain, rows, seed=0):
+    """Random patients drawn from the domain values (APP_DOMAIN where not given)"""
+    domain = {**APP_DOMAIN, **(domain or {})}
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.choice(np.asarray(domain[name], dtype=np.float64), rows) for name in FEATURES])
+
+
+class RiskLookupTable:
+    """Precomputed forest probabilities over a discretized input subspace.
+
+    Every feature is mapped to its threshold bin; the table holds the
+    disease probability for every combination of reachable bins, with
+    neighbouring bins that never change the result merged together.
+    Class probabilities are dictionary-encoded (uint8/uint16 codes into
+    the distinct probability rows), so a lookup is a few searchsorted
+    calls and one gather and returns exactly what the forest would. Inputs whose bins
+    fall outside the subspace are scored by the fallback model if given.
+    """
+
+    def __init__(self, thresholds, positions, codes, values, classes, fallback=None):
+        self.thresholds = thresholds
+        self.positions = positions
+        self.codes = codes
+        self.values = values
+        self.classes_ = np.asarray(classes)
+        self.fallback = fallback
+        self.n_features_in_ = len(thresholds)
+        self.strides = np.array([int(np.prod(codes.shape[i + 1:])) for i in range(codes.ndim)], dtype=np.int64)
+
+    @property
+    def n_cells(self):
+        return self.codes.size
+
+    @property
+    def nbytes(self):
+        return (self.codes.nbytes + self.values.nbytes + sum(p.nbytes for p in self.positions)
+                + sum(t.nbytes for t in self.thresholds))
+
+    def _cells(self, X):
+        """Flat table index of each row, -1 where the row is outside the subspace"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected a 2D array with {self.n_features_in_} features, got shape {X.shape}")
+        index = np.zeros(len(X), dtype=np.int64)
+        inside = np.ones(len(X), dtype=bool)
+        for f in range(self.n_features_in_):
+            position = self.positions[f][threshold_bins(self.thresholds[f], X[:, f])]
+            inside &= position >= 0
+            index += position * self.strides[f]
+        return np.where(inside, index, -1)
+
+    def covers(self, X):
+        """True for rows that can be answered from the table"""
+        return self._cells(X) >= 0
+
+    def predict_proba(self, X):
+        cells = self._cells(X)
+        inside = cells >= 0
+        proba = np.empty((len(cells), self.values.shape[1]))
+        proba[inside] = self.values[self.codes.ravel()[cells[inside]]]
+        if not inside.all():
+            if self.fallback is None:
+                raise ValueError(f"{int((~inside).sum())} rows fall outside the lookup table's subspace")
+            proba[~inside] = self.fallback.predict_proba(np.asarray(X, dtype=np.float64)[~inside])
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def save(self, path):
+        """Write the table as a compressed .npz file"""
+        arrays = {"codes": self.codes, "values": self.values, "classes": self.classes_}
+        for f in range(self.n_features_in_):
+            arrays[f"thresholds_{f}"] = self.thresholds[f]
+            arrays[f"positions_{f}"] = self.positions[f]
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+
+    @classmethod
+    def load(cls, path, fallback=None):
+        with np.load(path) as data:
+            n_features = sum(1 for name in data.files if name.startswith("thresholds_"))
+            return cls([data[f"thresholds_{f}"] for f in range(n_features)],
+                       [data[f"positions_{f}"] for f in range(n_features)],
+                       data["codes"], data["values"], data["classes"], fallback)
+
+
+def _leaf_boxes(forest, tree, thresholds, axes):
+    """Yield (per-feature axis slices, leaf id) for every leaf of one tree reachable in the subspace"""
+    children = np.asarray(forest.children)
+    feature = np.asarray(forest.feature)
+    threshold = np.asarray(forest.threshold, dtype=np.float64)
+    is_leaf = np.asarray(forest.is_leaf)
+
+    # Box bounds are kept as half-open ranges of axis positions per feature
+    stack = [(int(forest.roots[tree]), [(0, len(axis)) for axis in axes])]
+    while stack:
+        node, box = stack.pop()
+        if is_leaf[node]:
+            yield tuple(slice(lo, hi) for lo, hi in box), node
+            continue
+        f = feature[node]
+        # Bins up to and including the threshold's own index go left
+        split = int(np.searchsorted(axes[f], np.searchsorted(thresholds[f], threshold[node]) + 1))
+        lo, hi = box[f]
+        if lo < min(hi, split):
+            stack.append((int(children[node, 0]), box[:f] + [(lo, min(hi, split))] + box[f + 1:]))
+        if max(lo, split) < hi:
+            stack.append((int(children[node, 1]), box[:f] + [(max(lo, split), hi)] + box[f + 1:]))
+
+
+def _tabulate(forest, thresholds, axes, value):
+    """Forest average of one class over every cell of the subspace.
+
+    Each tree's leaf values are added over the boxes its leaves cover,
+    tree by tree, so every cell sums in the same order the forest does.
+    """
+    table = np.zeros([len(axis) for axis in axes])
+    for tree in range(forest.n_estimators):
+        for box, leaf in _leaf_boxes(forest, tree, thresholds, axes):
+            table[box] += value[leaf]
+    table /= forest.n_estimators
+    return table
+
+
+def _encode(table):
+    """Dictionary-encode an array: (smallest unsigned codes, sorted distinct values)"""
+    flat = np.sort(table.ravel())
+    values = flat[np.concatenate([[True], flat[1:] != flat[:-1]])]
+    code_dtype = np.uint8 if len(values) <= 256 else np.uint16 if len(values) <= 65536 else np.uint32
+    return np.searchsorted(values, table).astype(code_dtype), values
+
+
+def _merge_equal_bins(table):
+    """Collapse neighbouring bins along each axis whose slices are identical"""
+    groups = []
+    for f in range(table.ndim):
+        moved = np.moveaxis(table, f, 0).reshape(table.shape[f], -1)
+        keep = np.ones(table.shape[f], dtype=bool)
+        keep[1:] = np.any(moved[1:] != moved[:-1], axis=1)
+        table = np.compress(keep, table, axis=f)
+        groups.append(np.cumsum(keep) - 1)
+    return table, groups
+
+
+def build_risk_table(forest, domain=None, max_cells=50_000_000, fallback=None):
+    """Precompute the forest's class probabilities over a discretized subspace.
+
+    domain maps feature names to the values to cover and defaults to
+    APP_DOMAIN for any feature not given. Only the threshold bins those
+    values reach become table axes. Raises TableSizeError if the full
+    combination of bins exceeds max_cells. Returns (table, build report).
+    """
+    start = time.perf_counter()
+    domain = {**APP_DOMAIN, **(domain or {})}
+    thresholds = feature_thresholds(forest)
+    axes = [np.unique(threshold_bins(thresholds[f], domain[name])) for f, name in enumerate(FEATURES)]
+
+    n_cells = int(np.prod([len(axis) for axis in axes], dtype=object))
+    if n_cells > max_cells:
+        sizes = ", ".join(f"{name}={len(axis)}" for name, axis in zip(FEATURES, axes))
+        raise TableSizeError(f"Subspace has {n_cells:,} cells (limit {max_cells:,}); bins per feature: {sizes}")
+
+    # One pass per class keeps a single float table in memory at a time;
+    # the classes are then dictionary-encoded together as probability rows
+    leaves = np.flatnonzero(forest.is_leaf)
+    leaf_values = forest._leaf_values(leaves)
+    codes, values = None, []
+    for column in range(forest.n_classes_):
+        value = np.zeros(forest.n_nodes)
+        value[leaves] = leaf_values[:, column]
+        column_codes, column_values = _encode(_tabulate(forest, thresholds, axes, value))
+        codes = column_codes if codes is None else codes.astype(np.int64) * len(column_values) + column_codes
+        values.append(column_values)
+    codes, pairs = _encode(codes)
+    values = np.column_stack([column_values[index] for column_values, index in
+                              zip(values, np.unravel_index(pairs, [len(v) for v in values]))])
+
+    codes, groups = _merge_equal_bins(codes)
+    positions = []
+    for f, axis in enumerate(axes):
+        position = np.full(len(thresholds[f]) + 1, -1, dtype=np.int32)
+        position[axis] = groups[f]
+        positions.append(position)
+
+    risk_table = RiskLookupTable(thresholds, positions, codes, values, forest.classes_, fallback)
+    report = {
+        "build_time": time.perf_counter() - start,
+        "full_cells": n_cells,
+        "cells": risk_table.n_cells,
+        "distinct_probabilities": len(values),
+        "bytes": risk_table.nbytes,
+        "bins_per_feature": {name: len(axis) for name, axis in zip(FEATURES, axes)},
+        "merged_bins_per_feature": dict(zip(FEATURES, codes.shape)),
+    }
+    return risk_table, report
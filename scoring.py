@@ -0,0 +1,78 @@
+import numpy as np
+
+# Model input features in the order the forest expects them, using the
+# field names collected by app_enhanced.py
+FEATURES = ["age", "gender", "cp", "trtbps", "chol", "fbs", "restecg",
+            "thalachh", "exng", "oldpeak", "slp", "caa", "thall"]
+
+# Training-data (and app.py) names for the same features
+FEATURE_ALIASES = {
+    "sex": "gender", "trestbps": "trtbps", "thalach": "thalachh", "exang": "exng",
+    "slope": "slp", "ca": "caa", "thal": "thall",
+}
+
+# (feature, minimum, maximum, message) checks applied to every input
+VALIDATION_RULES = [
+    ("age", 18, 120, "Age must be between 18 and 120 years"),
+    ("trtbps", 80, 250, "Blood Pressure must be between 80-250 mmHg"),
+    ("chol", 0, 600, "Cholesterol must be between 0-600 mg/dL"),
+    ("thalachh", 40, 220, "Max Heart Rate must be between 40-220 bpm"),
+    ("oldpeak", 0, 10, "ST Depression must be between 0-10"),
+    ("caa", 0, 4, "Major Vessels must be between 0-4"),
+]
+
+# Lower probability bound of each risk level above LOW
+RISK_THRESHOLDS = [0.4, 0.6, 0.8]
+RISK_LEVELS = ["🟢 LOW", "🟡 MODERATE", "🟠 HIGH", "🔴 CRITICAL"]
+
+
+def risk_level(probability):
+    """Risk level label for a single disease probability"""
+    return RISK_LEVELS[int(np.searchsorted(RISK_THRESHOLDS, probability, side='right'))]
+
+
+def risk_levels(probabilities):
+    """Vectorized risk level labels for an array of disease probabilities"""
+    return np.asarray(RISK_LEVELS, dtype=object)[np.searchsorted(RISK_THRESHOLDS, probabilities, side='right')]
+
+
+def health_scores(predictions, probabilities):
+    """Health score (0-100) shown alongside each prediction"""
+    return np.maximum(0, 100 - np.asarray(predictions) * 50 - np.asarray(probabilities) * 50)
+
+
+def score_patients(model, X):
+    """Score a batch of patients with a single model pass.
+
+    Returns a dict of arrays: predicted class, disease probability, risk
+    level, health score and the standard deviation of the individual tree
+    votes for the disease class (NaN if the model can't provide it).
+    """
+    if hasattr(model, "predict_proba_with_std"):
+        proba, std = model.predict_proba_with_std(X)
+        uncertainty = std[:, 1]
+    else:
+        proba = model.predict_proba(X)
+        uncertainty = np.full(len(proba), np.nan)
+
+    predictions = np.asarray(model.classes_).take(np.argmax(proba, axis=1))
+    return {
+        "prediction": predictions,
+        "probabilities": proba,
+        "probability": proba[:, 1],
+        "risk_level": risk_levels(proba[:, 1]),
+        "health_score": health_scores(predictions, proba[:, 1]),
+        "uncertainty": uncertainty,
+    }
+
+
+def score_patient(model, features):
+    """Score one patient (a row of 13 feature values); returns a dict of scalars"""
+    scores = score_patients(model, np.asarray(features, dtype=np.float64).reshape(1, -1))
+    return {key: value[0] for key, value in scores.items()}
+
+
+def validation_errors(values):
+    """Validation messages for one patient given as a dict of feature values"""
+    return [message for feature, low, high, message in VALIDATION_RULES
+            if values[feature] < low or values[feature] > high]
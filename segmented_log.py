@@ -0,0 +1,235 @@
+import glob
+import json
+import os
+import time
+from pathlib import Path
+
+
+class SegmentedLog:
+    """Append-only JSON Lines log split into rotating segment files.
+
+    Entries are appended one JSON object per line to the active segment, so
+    the cost of a write does not depend on how much history is on disk. A
+    segment is closed and a new one started once it reaches
+    max_segment_bytes or max_segment_age seconds. A small index file records
+    each segment's boundaries (entry count, size, first/last timestamp) so
+    readers can skip whole segments without opening them.
+    """
+
+    def __init__(self, directory, prefix="predictions", max_segment_bytes=16 * 1024 * 1024,
+                 max_segment_age=24 * 60 * 60):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.index_file = os.path.join(directory, f"{prefix}.index.json")
+        self._handle = None
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self.segments = self._load_index()
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+    def _segment_path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _load_index(self):
+        """Read the segment index, rebuilding it from disk if it is missing or stale"""
+        on_disk = sorted(os.path.basename(p) for p in glob.glob(
+            os.path.join(self.directory, f"{self.prefix}-*.jsonl")))
+        try:
+            with open(self.index_file, 'r') as f:
+                segments = json.load(f)["segments"]
+        except (OSError, ValueError, KeyError):
+            segments = []
+
+        if [s["name"] for s in segments] != on_disk:
+            known = {s["name"]: s for s in segments}
+            segments = [known.get(name) or self._describe_segment(name) for name in on_disk]
+            for segment in segments[:-1]:
+                segment["closed"] = True
+
+        if segments and not segments[-1].get("closed"):
+            self._repair_tail(segments[-1])
+        return segments
+
+    def _describe_segment(self, name):
+        """Build an index record by scanning a segment file"""
+        record = {"name": name, "entries": 0, "bytes": 0, "first_timestamp": None,
+                  "last_timestamp": None, "opened_at": os.path.getmtime(self._segment_path(name)),
+                  "closed": False}
+        for entry in self._read_segment(name):
+            record["entries"] += 1
+            record["first_timestamp"] = record["first_timestamp"] or entry.get("timestamp")
+            record["last_timestamp"] = entry.get("timestamp")
+        record["bytes"] = os.path.getsize(self._segment_path(name))
+        return record
+
+    def _repair_tail(self, segment):
+        """Drop a torn final line left behind by a crash mid-write"""
+        path = self._segment_path(segment["name"])
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+        refreshed = self._describe_segment(segment["name"])
+        refreshed["opened_at"] = segment.get("opened_at", refreshed["opened_at"])
+        segment.update(refreshed)
+
+    def _write_index(self):
+        """Atomically replace the index file"""
+        tmp_file = self.index_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({"segments": self.segments}, f, indent=2)
+        os.replace(tmp_file, self.index_file)
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+    def _new_segment(self):
+        number = int(self.segments[-1]["name"][len(self.prefix) + 1:-len(".jsonl")]) + 1 if self.segments else 1
+        self.segments.append({"name": f"{self.prefix}-{number:06d}.jsonl", "entries": 0, "bytes": 0,
+                              "first_timestamp": None, "last_timestamp": None,
+                              "opened_at": time.time(), "closed": False})
+        self._write_index()
+
+    def _active_segment(self):
+        """Return the segment to append to, rotating if it is full or too old"""
+        if not self.segments or self.segments[-1].get("closed"):
+            self._new_segment()
+
+        active = self.segments[-1]
+        too_big = active["bytes"] >= self.max_segment_bytes
+        too_old = time.time() - active["opened_at"] >= self.max_segment_age
+        if active["entries"] and (too_big or too_old):
+            self.rotate()
+            active = self.segments[-1]
+        return active
+
+    def rotate(self):
+        """Close the active segment and start a new one"""
+        self.sync()
+        self.close()
+        if self.segments and not self.segments[-1].get("closed"):
+            self.segments[-1]["closed"] = True
+        self._new_segment()
+
+    def append(self, entry):
+        """Append a single entry"""
+        self.append_many([entry])
+
+    def append_many(self, entries, fsync=False):
+        """Append entries to the active segment in one write.
+
+        Returns the log position just past the written entries.
+        """
+        if not entries:
+            return self.end_position()
+        active = self._active_segment()
+        payload = "".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries)
+        data = payload.encode("utf-8")
+
+        if self._handle is None:
+            self._handle = open(self._segment_path(active["name"]), 'ab')
+        self._handle.write(data)
+        self._handle.flush()
+        if fsync:
+            os.fsync(self._handle.fileno())
+
+        active["entries"] += len(entries)
+        active["bytes"] += len(data)
+        active["first_timestamp"] = active["first_timestamp"] or entries[0].get("timestamp")
+        active["last_timestamp"] = entries[-1].get("timestamp")
+        return self.end_position()
+
+    def sync(self):
+        """fsync everything appended to the active segment so far"""
+        if self._handle is not None:
+            os.fsync(self._handle.fileno())
+
+    def close(self):
+        """Close the active segment's file handle"""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+    def _read_segment(self, name):
+        try:
+            with open(self._segment_path(name), 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # Torn or partial line from an interrupted write
+                        continue
+        except FileNotFoundError:
+            return
+
+    def iter_entries(self, start=None, end=None):
+        """Yield entries in write order, optionally restricted to a timestamp range"""
+        for segment in self.segments:
+            if start and segment["last_timestamp"] and segment.get("closed") and segment["last_timestamp"] < start:
+                continue
+            if end and segment["first_timestamp"] and segment["first_timestamp"] > end:
+                continue
+            for entry in self._read_segment(segment["name"]):
+                timestamp = entry.get("timestamp", "")
+                if (start and timestamp < start) or (end and timestamp > end):
+                    continue
+                yield entry
+
+    def end_position(self):
+        """Position just past the last written entry, as (segment name, byte offset)"""
+        if not self.segments:
+            return None
+        return (self.segments[-1]["name"], self.segments[-1]["bytes"])
+
+    def is_end(self, position):
+        """True if nothing has been written after position"""
+        if position is None:
+            return len(self) == 0
+        names = [segment["name"] for segment in self.segments]
+        if position[0] not in names:
+            return False
+        i = names.index(position[0])
+        return (position[1] == self.segments[i]["bytes"]
+                and all(segment["bytes"] == 0 for segment in self.segments[i + 1:]))
+
+    def iter_from(self, position):
+        """Yield (entry, position after entry) for everything written after position.
+
+        Raises KeyError if position refers to a segment that no longer exists.
+        """
+        names = [segment["name"] for segment in self.segments]
+        if position is None:
+            start_index, offset = 0, 0
+        else:
+            start_index, offset = names.index(position[0]) if position[0] in names else None, position[1]
+            if start_index is None:
+                raise KeyError(position[0])
+
+        for name in names[start_index:]:
+            try:
+                with open(self._segment_path(name), 'rb') as f:
+                    f.seek(offset)
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            # Incomplete line still being written
+                            return
+                        offset += len(line)
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue
+                        yield entry, (name, offset)
+            except FileNotFoundError:
+                pass
+            offset = 0
+
+    def __len__(self):
+        return sum(segment["entries"] for segment in self.segments)
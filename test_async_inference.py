@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+import urllib.error
+import numpy as np
+import pytest
+from async_inference import AsyncInferenceServer, AsyncPredictor, DeadlineExceeded, OverloadedError
+from forest_compiler import load_compiled
+from inference_service import InferenceClient
+
+model = load_compiled('model.pkl')
+
+ROW = [63, 1, 3, 145, 233, 1, 0, 150, 0, 2.3, 0, 0, 1]
+
+class SlowModel:
+    """Model stand-in whose scoring takes a fixed time"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def predict_proba_with_std(self, X):
+        time.sleep(self.seconds)
+        return model.predict_proba_with_std(X)
+
+def test_results_match_model_and_count():
+    predictor = AsyncPredictor(lambda: model, max_concurrency=2)
+    rows = np.random.default_rng(0).uniform(0, 200, size=(50, 13)).round(1)
+
+    async def run():
+        return await asyncio.gather(*(predictor.predict_proba(row) for row in rows))
+
+    np.testing.assert_array_equal(np.vstack(asyncio.run(run())), model.predict_proba(rows))
+    stats = predictor.stats()
+    assert stats["admitted"] == stats["completed"] == 50
+    assert stats["rejected"] == stats["timed_out"] == 0
+    predictor.close()
+
+def test_full_queue_rejects_immediately():
+    predictor = AsyncPredictor(lambda: SlowModel(0.1), max_concurrency=1, max_queue=1, deadline=5)
+
+    async def run():
+        return await asyncio.gather(*(predictor.predict_proba(ROW) for _ in range(5)), return_exceptions=True)
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    assert sum(isinstance(r, OverloadedError) for r in results) == 3
+    assert time.perf_counter() - start < 0.5
+    assert predictor.stats()["rejected"] == 3 and predictor.stats()["completed"] == 2
+    predictor.close()
+
+def test_deadline_and_slot_held_until_work_finishes():
+    predictor = AsyncPredictor(lambda: SlowModel(0.2), max_concurrency=1, max_queue=4)
+
+    async def run():
+        with pytest.raises(DeadlineExceeded):
+            await predictor.predict_proba(ROW, deadline=0.05)
+        # The abandoned call still occupies the only slot
+        with pytest.raises(DeadlineExceeded):
+            await predictor.predict_proba(ROW, deadline=0.05)
+        await asyncio.sleep(0.2)
+        return await predictor.predict_proba(ROW, deadline=1)
+
+    np.testing.assert_array_equal(asyncio.run(run()), model.predict_proba([ROW])[0:1])
+    assert predictor.stats()["timed_out"] == 2
+    predictor.close()
+
+def test_http_overload_maps_to_errors():
+    predictor = AsyncPredictor(lambda: SlowModel(0.3), max_concurrency=1, max_queue=0)
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(AsyncInferenceServer(predictor, port=0).start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    try:
+        client = InferenceClient(f"http://127.0.0.1:{server.port}")
+        busy = threading.Thread(target=client.predict_proba, args=([ROW],))
+        busy.start()
+        time.sleep(0.1)
+        with pytest.raises(OverloadedError):
+            client.predict_proba([ROW])
+        busy.join()
+        np.testing.assert_allclose(client.predict_proba([ROW]), model.predict_proba([ROW]))
+        assert client.metrics()["rejected"] == 1
+    finally:
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        predictor.close()
+
+def test_http_model_failure_answers_500():
+    def failing_model():
+        raise RuntimeError("model store unavailable")
+
+    predictor = AsyncPredictor(failing_model, max_concurrency=1)
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(AsyncInferenceServer(predictor, port=0).start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    try:
+        client = InferenceClient(f"http://127.0.0.1:{server.port}")
+        with pytest.raises(urllib.error.HTTPError) as error:
+            client.predict_proba([ROW])
+        assert error.value.code == 500 and "model store unavailable" in error.value.read().decode()
+        metrics = client.metrics()
+        assert metrics["internal_errors"] == 1 and metrics["failed"] == 1
+    finally:
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        predictor.close()
@@ -0,0 +1,111 @@
+import io
+import os
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from forest_compiler import load_compiled
+from batch_scoring import BatchLimitError, new_output_file, output_dir, score_csv, score_csv_file, score_frame, validate_frame
+from scoring import FEATURES, risk_level, risk_levels, score_patient, validation_errors
+
+model = load_compiled('model.pkl')
+
+def make_patients(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'age': rng.integers(10, 130, n), 'gender': rng.integers(0, 2, n), 'cp': rng.integers(0, 4, n),
+        'trtbps': rng.integers(70, 260, n), 'chol': rng.integers(0, 650, n), 'fbs': rng.integers(0, 2, n),
+        'restecg': rng.integers(0, 3, n), 'thalachh': rng.integers(30, 230, n), 'exng': rng.integers(0, 2, n),
+        'oldpeak': rng.integers(0, 110, n) / 10, 'slp': rng.integers(0, 3, n), 'caa': rng.integers(0, 5, n),
+        'thall': rng.integers(0, 4, n),
+    })
+
+def test_vectorized_validation_matches_single_row_checks():
+    """validate_frame flags exactly the rows validate_input would reject"""
+    patients = make_patients(2000)
+    _, errors = validate_frame(patients)
+    for (_, row), error in zip(patients.iterrows(), errors):
+        assert error == "; ".join(validation_errors(row))
+
+def test_vectorized_risk_levels_match_scalar():
+    """Risk buckets agree with the single-prediction thresholds, including boundaries"""
+    probabilities = np.array([0.0, 0.39, 0.4, 0.59, 0.6, 0.79, 0.8, 1.0])
+    assert list(risk_levels(probabilities)) == [risk_level(p) for p in probabilities]
+    assert risk_level(0.8) == "🔴 CRITICAL"
+
+def test_score_patient_uses_a_single_model_pass():
+    """One traversal yields the same class, probability, risk level and health score as separate calls"""
+    calls = []
+
+    class CountingModel:
+        classes_ = model.classes_
+
+        def predict_proba_with_std(self, X):
+            calls.append(len(X))
+            return model.predict_proba_with_std(X)
+
+    x = np.array([63, 1, 3, 145, 233, 1, 0, 150, 0, 2.3, 0, 0, 1])
+    result = score_patient(CountingModel(), x)
+    proba = model.predict_proba(x.reshape(1, -1))[0]
+    assert calls == [1]
+    assert result['prediction'] == model.predict(x.reshape(1, -1))[0]
+    assert result['probability'] == proba[1]
+    assert result['risk_level'] == risk_level(proba[1])
+    assert result['health_score'] == max(0, 100 - result['prediction'] * 50 - proba[1] * 50)
+    assert 0 <= result['uncertainty'] <= 0.5
+
+def test_score_frame_matches_model():
+    """Valid rows get the model's probability; invalid rows are left unscored"""
+    patients = make_patients(1000, seed=1)
+    scored = score_frame(model, patients)
+    valid = scored["errors"] == ""
+    expected = model.predict_proba(patients.loc[valid, FEATURES].to_numpy(dtype=float))[:, 1]
+    assert np.array_equal(scored.loc[valid, "probability"].to_numpy(), expected)
+    assert scored.loc[~valid, "prediction"].isna().all()
+
+def test_score_csv_streams_chunks_and_enforces_limits():
+    """Chunked scoring covers every row once and respects the row ceiling"""
+    patients = make_patients(2500, seed=2).rename(columns={'gender': 'sex', 'thalachh': 'thalach'})
+    source = io.StringIO(patients.to_csv(index=False))
+    output = io.StringIO()
+    progress = []
+    summary = score_csv(model, source, output, chunksize=1000, progress=progress.append)
+
+    assert progress == [1000, 2000, 2500]
+    assert summary["rows"] == 2500
+    assert len(pd.read_csv(io.StringIO(output.getvalue()))) == 2500
+
+    source.seek(0)
+    with pytest.raises(BatchLimitError):
+        score_csv(model, source, io.StringIO(), chunksize=1000, max_rows=1500)
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_score_csv_file_preserves_order(tmp_path, workers):
+    """Multi-process file scoring writes rows in input order and matches in-process scoring"""
+    patients = make_patients(5000, seed=3)
+    source = tmp_path / "patients.csv"
+    patients.to_csv(source, index=False)
+
+    summary = score_csv_file(str(source), str(tmp_path / "scored.csv"), workers=workers, chunksize=700)
+    scored = pd.read_csv(tmp_path / "scored.csv")
+    expected = score_frame(model, patients)
+
+    assert summary["rows"] == 5000
+    assert np.array_equal(scored["age"], patients["age"])
+    assert np.allclose(scored["probability"], expected["probability"], equal_nan=True)
+
+def test_abandoned_output_files_expire():
+    """Creating a scored file removes ones nobody has written for longer than the TTL"""
+    fd, stale = new_output_file(ttl=60)
+    os.close(fd)
+    fd, fresh = new_output_file(ttl=60)
+    os.close(fd)
+    an_hour_ago = time.time() - 3600
+    os.utime(stale, (an_hour_ago, an_hour_ago))
+
+    fd, latest = new_output_file(ttl=60)
+    os.close(fd)
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh) and os.path.dirname(latest) == output_dir()
+    for path in (fresh, latest):
+        os.remove(path)
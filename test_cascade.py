@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+from cascade import CascadeModel, LinearStage, cascade_report, load_cascade
+from forest_compiler import load_compiled
+
+forest = load_compiled('model.pkl')
+first_stage = LinearStage.load('first_stage.json')
+
+data = pd.read_csv('data/heart.csv', header=None).replace('?', np.nan).dropna().astype(float)
+X = data.iloc[:, :13].to_numpy()
+y = (data.iloc[:, 13] != 0).astype(int).to_numpy()
+
+def test_linear_stage_round_trip_and_calibration(tmp_path):
+    """Folded weights reproduce the fitted model and probabilities are sensible"""
+    stage = LinearStage.fit(X, y)
+    path = tmp_path / "stage.json"
+    stage.save(str(path))
+    loaded = LinearStage.load(str(path))
+    assert np.array_equal(loaded.predict_proba(X), stage.predict_proba(X))
+    proba = stage.predict_proba(X)[:, 1]
+    assert (stage.predict(X) == y).mean() > 0.8
+    # Calibrated: mean predicted probability close to the base rate
+    assert abs(proba.mean() - y.mean()) < 0.05
+
+def test_cascade_routes_only_the_uncertain_band_to_the_forest():
+    cascade = CascadeModel(first_stage, forest, band=(0.2, 0.8))
+    proba = cascade.predict_proba(X)
+    first = first_stage.predict_proba(X)
+    uncertain = (first[:, 1] >= 0.2) & (first[:, 1] <= 0.8)
+    assert np.array_equal(proba[uncertain], forest.predict_proba(X[uncertain]))
+    assert np.array_equal(proba[~uncertain], first[~uncertain])
+    stats = cascade.stats()
+    assert stats["forest_rows"] == uncertain.sum()
+    assert stats["first_stage_rows"] == (~uncertain).sum()
+
+def test_full_band_is_the_forest_alone():
+    cascade = load_cascade('first_stage.json', 'model.pkl', band=(0.0, 1.0))
+    assert np.array_equal(cascade.predict_proba(X), forest.predict_proba(X))
+    report = cascade_report(cascade, X, y)
+    assert report["forest_fraction"] == 1.0
+    assert report["cascade_accuracy"] == report["forest_accuracy"]
+
+def test_invalid_band_rejected():
+    with pytest.raises(ValueError):
+        CascadeModel(first_stage, forest, band=(0.9, 0.1))
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from chunked_training import merge_forests, train_chunked
+from forest_compiler import compile_forest
+from training import load_dataset
+
+X, y = load_dataset()
+
+
+def test_chunked_forest_merges_every_chunk():
+    forest, metrics = train_chunked("data/heart.csv", chunksize=60, trees_per_chunk=4, workers=1)
+    assert metrics["chunks"] == 6 and metrics["rows"] == len(y)  # 303 raw lines, 6 with missing values
+    assert forest.n_estimators == len(forest.estimators_) == 4 * (metrics["chunks"] - metrics["skipped_chunks"])
+    assert list(forest.feature_names_in_) == list(X.columns)
+    assert metrics["accuracy"] > 0.6
+    # The merged forest compiles and scores like any trained model
+    assert np.allclose(compile_forest(forest).predict_proba(X.to_numpy()), forest.predict_proba(X))
+
+
+@pytest.mark.parametrize("reservoir_rows", [0, 100])
+def test_parallel_chunks_match_serial(reservoir_rows):
+    """The worker count doesn't change the model, with or without the reservoir"""
+    serial, _ = train_chunked("data/heart.csv", chunksize=40, trees_per_chunk=3, workers=1,
+                              reservoir_rows=reservoir_rows, reservoir_lag=1)
+    parallel, _ = train_chunked("data/heart.csv", chunksize=40, trees_per_chunk=3, workers=3,
+                                reservoir_rows=reservoir_rows, reservoir_lag=1)
+    assert np.array_equal(serial.predict_proba(X), parallel.predict_proba(X))
+
+
+def test_single_class_chunks_add_no_trees(tmp_path):
+    path = tmp_path / "sorted.csv"
+    rows = X.assign(target=y).sort_values("target")
+    rows.to_csv(path, header=False, index=False)
+    # Without the reservoir the pure chunks can't be trained on; with it they see both classes
+    _, alone = train_chunked(str(path), chunksize=50, trees_per_chunk=2, workers=1, reservoir_rows=0)
+    forest, mixed = train_chunked(str(path), chunksize=50, trees_per_chunk=2, workers=1, reservoir_rows=100,
+                                  reservoir_lag=0)
+    assert alone["skipped_chunks"] > mixed["skipped_chunks"]
+    assert forest.n_estimators == 2 * (mixed["chunks"] - mixed["skipped_chunks"])
+    with pytest.raises(ValueError):
+        merge_forests([forest, type(forest)().fit(X.iloc[:20, :5], y.iloc[:20])])
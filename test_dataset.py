@@ -0,0 +1,56 @@
+import os
+import shutil
+import numpy as np
+import pytest
+import dataset
+from dataset import cache_dir, load_columns, load_frame, parse_csv
+
+
+@pytest.fixture
+def csv(tmp_path):
+    path = tmp_path / "heart.csv"
+    shutil.copy("data/heart.csv", path)
+    return path
+
+
+def test_columns_are_parsed_once_then_memory_mapped(csv, monkeypatch):
+    columns = load_columns(csv)
+    assert sorted(os.listdir(cache_dir(csv))) == sorted([dataset._read_manifest(cache_dir(csv))["sha256"],
+                                                         "manifest.json"])
+    assert columns["age"].dtype == np.int8 and columns["oldpeak"].dtype == np.float64
+    assert len(columns["target"]) == 297  # rows with '?' dropped
+
+    def parse(source):
+        raise AssertionError("cache wasn't used")
+
+    monkeypatch.setattr(dataset, "parse_csv", parse)
+    cached = load_columns(csv)
+    assert isinstance(cached["age"], np.memmap)
+    assert all(np.array_equal(cached[name], columns[name]) for name in dataset.COLUMNS)
+    # A new modification time with the same content is re-hashed, not re-parsed
+    os.utime(csv, ns=(0, 0))
+    assert np.array_equal(load_columns(csv)["chol"], columns["chol"])
+
+
+def test_editing_the_csv_rebuilds_the_cache(csv):
+    before = load_frame(csv)
+    with open(csv, "a") as f:
+        f.write("50.0,1.0,4.0,130.0,250.0,0.0,2.0,150.0,1.0,1.5,2.0,0.0,7.0,2\n")
+    after = load_frame(csv)
+    assert len(after) == len(before) + 1 and after["target"].iloc[-1] == 2
+    # Only the current content's columns are kept
+    assert len([entry for entry in os.listdir(cache_dir(csv)) if entry != "manifest.json"]) == 1
+    assert np.array_equal(after.to_numpy(float), np.column_stack(list(parse_csv(str(csv)).values())))
+
+
+def test_explainer_loads_data_lazily(monkeypatch):
+    import ai_model_explainer
+
+    def fail(path):
+        raise AssertionError("dataset loaded at construction")
+
+    monkeypatch.setattr(ai_model_explainer, "load_frame", fail)
+    explainer = ai_model_explainer.AIHeartModelExplainer()
+    assert explainer.feature_names == dataset.FEATURES
+    monkeypatch.setattr(ai_model_explainer, "load_frame", load_frame)
+    assert set(explainer.y.unique()) == {0, 1} and len(explainer.X) == len(explainer.data) == 297
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from batch_scoring import score_frame
+from early_exit import DEFAULT_CUTOFFS, early_exit_proba, serfling_radius
+from forest_compiler import compile_forest, load_compiled
+
+model = load_compiled('model.pkl')
+
+LOW = [29, 0, 0, 94, 126, 0, 0, 71, 0, 0, 0, 0, 0]
+HIGH = [77, 1, 3, 200, 564, 1, 2, 202, 1, 6.2, 2, 3, 3]
+
+def buckets(probability):
+    return np.searchsorted(DEFAULT_CUTOFFS, probability, side='left')
+
+def test_exact_mode_never_changes_bucket():
+    """With zero tolerance only the deterministic bound is used"""
+    X = np.random.default_rng(0).uniform(LOW, HIGH, size=(20_000, 13)).round(1)
+    expected = model.predict_proba(X)[:, 1]
+    estimate, trees = early_exit_proba(model, X)
+    assert np.array_equal(buckets(estimate), buckets(expected))
+    assert trees.min() < model.n_estimators
+    # Rows that needed every tree get the exact probability
+    full = trees == model.n_estimators
+    assert np.array_equal(estimate[full], expected[full])
+
+def test_tolerance_trades_trees_for_rare_bucket_changes():
+    X = np.random.default_rng(1).uniform(LOW, HIGH, size=(20_000, 13)).round(1)
+    expected = buckets(model.predict_proba(X)[:, 1])
+    _, exact_trees = early_exit_proba(model, X, tolerance=0.0)
+    estimate, trees = early_exit_proba(model, X, tolerance=0.05)
+    assert trees.mean() < exact_trees.mean()
+    assert (buckets(estimate) != expected).mean() < 0.05
+
+def test_serfling_radius_shrinks_to_zero():
+    assert serfling_radius(10, 100, 0.0) == float('inf')
+    assert serfling_radius(10, 100, 0.01) > serfling_radius(50, 100, 0.01) > 0
+    assert serfling_radius(100, 100, 0.01) == 0.0
+
+def test_multiclass_forest_rejected():
+    rng = np.random.default_rng(2)
+    forest = RandomForestClassifier(n_estimators=5, random_state=0).fit(rng.normal(size=(60, 3)), rng.integers(0, 3, 60))
+    with pytest.raises(ValueError):
+        early_exit_proba(compile_forest(forest), rng.normal(size=(5, 3)))
+
+def test_batch_scoring_early_exit_keeps_classes_and_risk_levels():
+    from test_batch_scoring import make_patients
+    patients = make_patients(2000, seed=3)
+    exact = score_frame(model, patients)
+    early = score_frame(model, patients, early_exit=0.0)
+    assert early["prediction"].equals(exact["prediction"])
+    assert early["risk_level"].equals(exact["risk_level"])
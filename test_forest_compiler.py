@@ -0,0 +1,112 @@
+import pytest
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from forest_compiler import CompactForest, CompiledForest, compact_forest, compile_forest, load_compiled, verification_report
+
+# Bounds of the 13 input features used to draw random patients
+LOW = [0, 0, 0, 80, 0, 0, 0, 40, 0, 0, 0, 0, 0]
+HIGH = [120, 1, 4, 250, 600, 1, 2, 220, 1, 10, 3, 4, 7]
+
+sklearn_model = joblib.load('model.pkl')
+compiled = compile_forest(sklearn_model)
+
+def test_compiled_matches_sklearn_on_random_inputs():
+    """Compiled probabilities are bit-for-bit equal to sklearn's"""
+    rng = np.random.default_rng(0)
+    X = rng.uniform(LOW, HIGH, size=(100_000, 13))
+    assert np.array_equal(compiled.predict_proba(X), sklearn_model.predict_proba(X))
+    assert np.array_equal(compiled.predict(X), sklearn_model.predict(X))
+
+def test_compiled_matches_sklearn_on_integer_inputs():
+    """Integer inputs land exactly on split thresholds just like sklearn"""
+    rng = np.random.default_rng(1)
+    X = rng.integers(LOW, np.array(HIGH) + 1, size=(50_000, 13))
+    assert np.array_equal(compiled.predict_proba(X), sklearn_model.predict_proba(X))
+
+def test_compiled_single_row():
+    """Single-row scoring matches sklearn"""
+    x = np.array([[63, 1, 3, 145, 233, 1, 0, 150, 0, 2.3, 0, 0, 1]])
+    assert np.array_equal(compiled.predict_proba(x), sklearn_model.predict_proba(x))
+
+def test_predict_proba_with_std_matches_per_tree_votes():
+    """Probabilities from the single pass are unchanged and the spread matches the individual trees"""
+    rng = np.random.default_rng(3)
+    X = rng.uniform(LOW, HIGH, size=(3000, 13))
+    proba, std = compiled.predict_proba_with_std(X)
+    assert np.array_equal(proba, sklearn_model.predict_proba(X))
+    per_tree = np.stack([tree.predict_proba(X.astype(np.float32)) for tree in sklearn_model.estimators_])
+    np.testing.assert_allclose(std, per_tree.std(axis=0), atol=1e-12)
+
+def test_compiled_multiclass_forest():
+    """Forests with more than two classes and deep trees compile correctly"""
+    rng = np.random.default_rng(2)
+    X = rng.normal(size=(500, 6))
+    y = rng.integers(0, 3, size=500)
+    forest = RandomForestClassifier(n_estimators=25, random_state=0).fit(X, y)
+    X_test = rng.normal(size=(20_000, 6))
+    assert np.array_equal(CompiledForest.from_sklearn(forest).predict_proba(X_test), forest.predict_proba(X_test))
+
+def test_compiled_rejects_bad_input():
+    """Wrong feature counts and non-finite values raise ValueError"""
+    with pytest.raises(ValueError):
+        compiled.predict(np.array([[50, 1, 0]]))
+    with pytest.raises(ValueError):
+        compiled.predict(np.full((1, 13), np.nan))
+
+def test_compiled_exposes_model_attributes():
+    """Compiled model carries the attributes the apps and explainer use"""
+    assert compiled.n_estimators == len(sklearn_model.estimators_)
+    assert np.array_equal(compiled.feature_importances_, sklearn_model.feature_importances_)
+    assert list(compiled.classes_) == [0, 1]
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_bundle_round_trip(tmp_path, mmap):
+    """A saved bundle loads (memory-mapped or copied) and predicts exactly like the pickle"""
+    path = tmp_path / "model.bundle"
+    compiled.save(str(path))
+    loaded = CompiledForest.load(str(path), mmap=mmap)
+    assert isinstance(loaded.children, np.memmap) == mmap
+    assert list(loaded.feature_names_in_) == list(compiled.feature_names_in_)
+    assert loaded.max_depth == compiled.max_depth
+
+    rng = np.random.default_rng(4)
+    X = rng.uniform(LOW, HIGH, size=(20_000, 13))
+    assert np.array_equal(loaded.predict_proba(X), sklearn_model.predict_proba(X))
+
+def test_load_compiled_detects_bundles(tmp_path):
+    path = tmp_path / "model.bundle"
+    compiled.save(str(path))
+    assert isinstance(load_compiled(str(path)).threshold, np.memmap)
+    with pytest.raises(ValueError):
+        CompiledForest.load('model.pkl')
+
+def test_compact_forest_with_float64_leaves_is_exact():
+    """float32 thresholds and renumbered narrow nodes decide every split exactly as before"""
+    rng = np.random.default_rng(5)
+    compact = compact_forest(compiled, value_dtype=np.float64)
+    assert compact.children.dtype == np.int16 and compact.feature.dtype == np.uint8
+    for X in (rng.uniform(LOW, HIGH, size=(50_000, 13)), rng.integers(LOW, np.array(HIGH) + 1, size=(50_000, 13))):
+        assert np.array_equal(compact.predict_proba(X), sklearn_model.predict_proba(X))
+
+def test_compact_forest_float32_leaves_on_impure_forest(tmp_path):
+    """Only the float32 leaf tables can move the output, by at most float32 rounding"""
+    rng = np.random.default_rng(6)
+    X = rng.normal(size=(2000, 6))
+    y = rng.integers(0, 3, size=2000)
+    forest = RandomForestClassifier(n_estimators=30, min_samples_leaf=7, random_state=0).fit(X, y)
+    compact = compact_forest(forest)
+    X_test = rng.normal(size=(10_000, 6))
+    report = verification_report(compile_forest(forest), compact, X_test)
+    assert 0 < report["max_probability_deviation"] < 1e-6
+    assert report["bytes_after"] < report["bytes_before"] / 2
+    assert report["cache_lines_per_prediction_after"] < report["cache_lines_per_prediction_before"]
+
+    path = tmp_path / "compact.bundle"
+    compact.save(str(path))
+    loaded = load_compiled(str(path))
+    assert isinstance(loaded, CompactForest)
+    assert np.array_equal(loaded.predict_proba(X_test), compact.predict_proba(X_test))
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,55 @@
+import threading
+import numpy as np
+import pytest
+from forest_compiler import load_compiled
+from inference_service import InferenceClient, MicroBatcher, make_server
+
+model = load_compiled('model.pkl')
+
+def make_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    low = [29, 0, 0, 94, 126, 0, 0, 71, 0, 0, 0, 0, 0]
+    high = [77, 1, 3, 200, 564, 1, 2, 202, 1, 6.2, 2, 3, 3]
+    return rng.uniform(low, high, size=(n, 13)).round(1)
+
+def test_micro_batched_results_match_direct_predictions():
+    """Concurrent submissions are batched together and each gets its own row's probabilities"""
+    rows = make_rows(400)
+    batcher = MicroBatcher(lambda: model, max_batch_size=32, max_wait_us=5000)
+    results = [None] * len(rows)
+
+    def worker(start):
+        for i in range(start, len(rows), 8):
+            results[i] = batcher.predict_proba(rows[i], timeout=10)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    np.testing.assert_array_equal(np.array(results), model.predict_proba(rows))
+    stats = batcher.stats()
+    assert stats["requests"] == len(rows)
+    assert stats["avg_batch_size"] > 1
+    assert max(stats["batch_size_histogram"]) <= 32
+
+def test_wrong_feature_count_is_rejected():
+    batcher = MicroBatcher(lambda: model)
+    with pytest.raises(ValueError):
+        batcher.submit([1, 2, 3])
+
+def test_http_round_trip():
+    """The client behaves like the in-process model over HTTP"""
+    server = make_server(port=0, model_provider=lambda: model)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = InferenceClient(f"http://127.0.0.1:{server.server_address[1]}")
+        rows = make_rows(20, seed=1)
+        np.testing.assert_allclose(client.predict_proba(rows), model.predict_proba(rows))
+        np.testing.assert_array_equal(client.predict(rows), model.predict(rows))
+        np.testing.assert_allclose(client.predict_proba_with_std(rows)[1], model.predict_proba_with_std(rows)[1])
+        assert client.metrics()["requests"] == 60
+    finally:
+        server.shutdown()
+        server.server_close()
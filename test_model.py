@@ -5,9 +5,10 @@ import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.datasets import load_breast_cancer
 from sklearn.ensemble import RandomForestClassifier
+from forest_compiler import load_compiled
 
 # Load the trained model
-model = joblib.load('heart_disease_model.pkl')
+model = load_compiled('model.pkl')
 
 def test_model_loaded():
     """Test if model is loaded correctly"""
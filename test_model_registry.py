@@ -0,0 +1,119 @@
+import shutil
+import threading
+import time
+import pytest
+from forest_compiler import load_compiled
+from model_registry import ModelRegistry, file_sha256
+from model_store import ModelStore
+from training import load_metrics
+
+@pytest.fixture
+def artifact(tmp_path):
+    path = tmp_path / "model.pkl"
+    shutil.copy("model.pkl", path)
+    return path
+
+def test_registry_loads_once(artifact):
+    """Repeated lookups reuse the same model object"""
+    registry = ModelRegistry(str(artifact))
+    first = registry.get_model()
+    assert registry.get_model() is first
+    assert registry.load_count == 1
+    assert registry.load_time > 0
+    assert registry.memory_size > 0
+
+def test_registry_shared_across_threads(artifact):
+    """Concurrent first access loads the artifact only once"""
+    registry = ModelRegistry(str(artifact))
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(registry.get_model())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert registry.load_count == 1
+    assert all(m is models[0] for m in models)
+
+def test_registry_reloads_only_on_content_change(artifact):
+    """Touching the file does not reload; changing its content does"""
+    registry = ModelRegistry(str(artifact))
+    first = registry.get_model()
+
+    artifact.touch()
+    artifact.write_bytes(artifact.read_bytes())
+    assert registry.get_model() is first
+    assert registry.load_count == 1
+
+    artifact.write_bytes(artifact.read_bytes() + b"\n")
+    assert registry.get_model() is not first
+    assert registry.load_count == 2
+
+@pytest.fixture
+def artifacts(tmp_path):
+    """Two different loadable model artifacts"""
+    first = tmp_path / "model.pkl"
+    shutil.copy("model.pkl", first)
+    second = tmp_path / "model.bundle"
+    load_compiled(str(first)).save(second)
+    return first, second
+
+def test_store_publish_records_metadata(artifacts, tmp_path):
+    store = ModelStore(tmp_path / "models")
+    version = store.publish(str(artifacts[0]), {"accuracy": 0.88})
+    metadata = store.metadata(version)
+    assert store.active_version() == version
+    assert metadata["accuracy"] == 0.88
+    assert metadata["content_hash"] == file_sha256(str(artifacts[0]))
+    assert version.endswith(metadata["content_hash"][:12])
+    # Same content publishes to the same version; staging directories are never listed
+    assert store.publish(str(artifacts[0])) == version
+    (tmp_path / "models" / "versions" / ".partial").mkdir()
+    assert store.versions() == [version]
+
+def test_registry_swaps_versions_and_rolls_back_from_memory(artifacts, tmp_path):
+    store = ModelStore(tmp_path / "models")
+    first_version = store.publish(str(artifacts[0]))
+    registry = ModelRegistry(model_dir=str(tmp_path / "models"))
+    first = registry.get_model()
+
+    second_version = store.publish(str(artifacts[1]))
+    second = registry.get_model()
+    assert second is not first and registry.active_version == second_version
+    # A request still holding the old model can finish with it
+    assert first.predict([[63, 1, 3, 145, 233, 1, 0, 150, 0, 2.3, 0, 0, 1]]).shape == (1,)
+
+    assert registry.rollback() is first
+    assert registry.active_version == first_version
+    assert registry.load_count == 2
+
+def test_watcher_picks_up_new_version(artifacts, tmp_path):
+    store = ModelStore(tmp_path / "models")
+    store.publish(str(artifacts[0]))
+    registry = ModelRegistry(model_dir=str(tmp_path / "models"))
+    registry.get_model()
+    registry.start_watcher(interval=0.01)
+    try:
+        version = store.publish(str(artifacts[1]))
+        for _ in range(200):
+            if registry.active_version == version:
+                break
+            time.sleep(0.01)
+        assert registry.active_version == version
+    finally:
+        registry.stop_watcher()
+
+def test_metrics_follow_the_served_version(artifacts, tmp_path):
+    """With a model store the apps show the active version's figures, not model_metrics.json"""
+    store = ModelStore(tmp_path / "models")
+    first_version = store.publish(str(artifacts[0]), {"accuracy": 0.8, "train_rows": 237, "test_rows": 60})
+    registry = ModelRegistry(model_dir=str(tmp_path / "models"))
+    registry.get_model()
+    assert load_metrics(registry=registry)["accuracy"] == 0.8
+
+    store.publish(str(artifacts[1]), {"accuracy": 0.9})
+    registry.get_model()
+    assert load_metrics(registry=registry)["accuracy"] == 0.9
+    registry.rollback()
+    assert registry.active_version == first_version
+    assert load_metrics(registry=registry)["train_rows"] == 237
+    assert load_metrics(registry=ModelRegistry(model_dir=str(tmp_path / "empty"))) is None
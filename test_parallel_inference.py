@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from multiprocessing import shared_memory
+from forest_compiler import CompiledForest, compact_forest, load_compiled
+from parallel_inference import ParallelScorer, share_forest
+
+model = load_compiled('model.pkl')
+
+LOW = [29, 0, 0, 94, 126, 0, 0, 71, 0, 0, 0, 0, 0]
+HIGH = [77, 1, 3, 200, 564, 1, 2, 202, 1, 6.2, 2, 3, 3]
+
+def test_shared_forest_rebuilds_without_copying():
+    block, header = share_forest(model)
+    try:
+        shared = CompiledForest.from_buffer(header, block.buf)
+        X = np.random.default_rng(0).uniform(LOW, HIGH, size=(500, 13)).round(1)
+        assert np.array_equal(shared.predict_proba(X), model.predict_proba(X))
+        assert not shared.threshold.flags.owndata
+        del shared
+    finally:
+        block.close()
+        block.unlink()
+
+def test_pool_matches_single_process():
+    X = np.random.default_rng(1).uniform(LOW, HIGH, size=(20_000, 13)).round(1)
+    compact = compact_forest(model)
+    with ParallelScorer(model, workers=2) as scorer, ParallelScorer(compact, workers=2) as compact_scorer:
+        assert len(scorer._ranges(len(X))) > 1
+        assert np.array_equal(scorer.predict_proba(X), model.predict_proba(X))
+        assert np.array_equal(scorer.predict(X[:10]), model.predict(X[:10]))
+        assert np.array_equal(compact_scorer.predict_proba(X), compact.predict_proba(X))
+        assert scorer.predict_proba(X[:0]).shape == (0, 2)
+        block_name = scorer._block.name
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=block_name)
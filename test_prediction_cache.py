@@ -0,0 +1,86 @@
+import shutil
+import threading
+import numpy as np
+import pytest
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache
+from scoring import score_patient
+
+PATIENT = [63, 1, 3, 145, 233, 1, 0, 150, 0, 2.3, 0, 0, 1]
+
+@pytest.fixture
+def registry(tmp_path):
+    path = tmp_path / "model.pkl"
+    shutil.copy("model.pkl", path)
+    return ModelRegistry(str(path))
+
+def test_cache_hits_return_the_same_scores(registry):
+    """Repeated and equivalent feature vectors are served from the cache"""
+    cache = PredictionCache(model_registry=registry)
+    model = registry.get_model()
+    first = cache.score(model, PATIENT)
+    # Same patient as floats / a numpy row maps to the same key
+    second = cache.score(model, np.array([PATIENT], dtype=float))
+    assert cache.hits == 1 and cache.misses == 1
+    fresh = score_patient(model, PATIENT)
+    for result in (first, second):
+        assert result["probability"] == fresh["probability"]
+        assert result["risk_level"] == fresh["risk_level"]
+        assert result["uncertainty"] == fresh["uncertainty"]
+
+def test_lru_eviction_and_ttl(registry):
+    cache = PredictionCache(max_size=2, ttl=3600, model_registry=registry)
+    model = registry.get_model()
+    rows = [[age] + PATIENT[1:] for age in (40, 50, 60, 70)]
+    cache.score(model, rows[0])
+    cache.score(model, rows[1])
+    cache.score(model, rows[0])          # rows[0] becomes most recently used
+    cache.score(model, rows[2])          # evicts rows[1]
+    assert cache.evictions == 1 and len(cache) == 2
+    cache.score(model, rows[1])
+    assert cache.misses == 4
+
+    cache.ttl = -1
+    cache.score(model, rows[3])          # stored already expired
+    cache.score(model, rows[3])
+    assert cache.expirations == 1
+
+def test_cache_invalidated_when_model_changes(registry):
+    cache = PredictionCache(model_registry=registry)
+    model = registry.get_model()
+    cache.score(model, PATIENT)
+
+    path = registry.model_path
+    with open(path, 'ab') as f:
+        f.write(b"\n")
+    new_model = registry.get_model()
+    assert new_model is not model
+
+    # The stale model is no longer cacheable; the new one starts from empty
+    cache.score(model, PATIENT)
+    assert cache.hits == 0
+    cache.score(new_model, PATIENT)
+    assert cache.invalidations == 1 and len(cache) == 1 and cache.hits == 0
+
+def test_cache_is_thread_safe(registry):
+    cache = PredictionCache(max_size=50, model_registry=registry)
+    model = registry.get_model()
+    rng = np.random.default_rng(0)
+    rows = [[int(age)] + PATIENT[1:] for age in rng.integers(30, 130, 400)]
+    results = {}
+
+    def worker(chunk):
+        for row in chunk:
+            results[tuple(row)] = cache.score(model, row)
+
+    threads = [threading.Thread(target=worker, args=(rows[i::8],)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert stats["hits"] + stats["misses"] == 400
+    assert stats["size"] <= 50
+    for row, result in results.items():
+        assert result["probability"] == score_patient(model, list(row))["probability"]
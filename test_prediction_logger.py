@@ -0,0 +1,226 @@
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+import pytest
+from prediction_logger import PredictionLogger, migrate_json_log
+from prediction_store import create_store
+from segmented_log import SegmentedLog
+
+PATIENT = {'age': 55, 'gender': 1, 'cp': 0, 'trtbps': 130, 'chol': 240, 'fbs': 0, 'restecg': 1,
+           'thalachh': 150, 'exng': 0, 'oldpeak': 1.2, 'slp': 1, 'caa': 0, 'thall': 2}
+
+def test_log_prediction_appends_lines(tmp_path):
+    """Each prediction becomes one JSON line and one CSV row"""
+    logger = PredictionLogger(str(tmp_path))
+    logger.log_prediction(PATIENT, 1, 0.82, "🔴 CRITICAL")
+    logger.log_prediction(PATIENT, 0, 0.12, "🟢 LOW")
+    logger.flush()
+
+    entries = list(logger.store.iter_entries())
+    assert [e["prediction"] for e in entries] == [1, 0]
+    with open(logger.csv_file) as f:
+        assert len(f.readlines()) == 3
+
+    stats = logger.get_statistics()
+    assert stats["total_predictions"] == 2
+    assert stats["positive_cases"] == 1
+    assert stats["avg_probability"] == pytest.approx(0.47)
+
+def test_segments_rotate_by_size(tmp_path):
+    """Full segments are closed and recorded in the index"""
+    log = SegmentedLog(str(tmp_path), max_segment_bytes=500)
+    for i in range(50):
+        log.append({"timestamp": f"2024-01-01T00:00:{i:02d}", "n": i})
+    log.close()
+
+    assert len(log.segments) > 1
+    assert all(s["closed"] for s in log.segments[:-1])
+    reopened = SegmentedLog(str(tmp_path), max_segment_bytes=500)
+    assert [e["n"] for e in reopened.iter_entries()] == list(range(50))
+    assert len(reopened) == 50
+    assert [e["n"] for e in reopened.iter_entries(start="2024-01-01T00:00:45")] == list(range(45, 50))
+
+def test_torn_line_is_repaired(tmp_path):
+    """A partial final line from a crash is dropped on reopen"""
+    log = SegmentedLog(str(tmp_path))
+    log.append({"timestamp": "t1", "n": 1})
+    log.close()
+    with open(os.path.join(str(tmp_path), log.segments[-1]["name"]), 'a') as f:
+        f.write('{"timestamp": "t2", "n"')
+
+    reopened = SegmentedLog(str(tmp_path))
+    reopened.append({"timestamp": "t3", "n": 3})
+    assert [e["n"] for e in reopened.iter_entries()] == [1, 3]
+
+def test_migrate_legacy_json(tmp_path):
+    """Legacy predictions.json files are converted on first start"""
+    legacy = [{"timestamp": f"2024-01-0{i}T00:00:00", "patient_data": PATIENT, "prediction": i % 2,
+               "probability": 0.5, "risk_level": "🟡 MODERATE"} for i in range(1, 6)]
+    with open(tmp_path / "predictions.json", 'w') as f:
+        json.dump(legacy, f, indent=2)
+
+    logger = PredictionLogger(str(tmp_path))
+    assert list(logger.store.iter_entries()) == legacy
+    assert not (tmp_path / "predictions.json").exists()
+    assert (tmp_path / "predictions.json.migrated").exists()
+
+def _run_cli(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["prediction_logger.py", *argv])
+    runpy.run_module("prediction_logger", run_name="__main__")
+
+@pytest.mark.parametrize("backend", ["jsonl", "sqlite"])
+def test_migrate_command(tmp_path, monkeypatch, capsys, backend):
+    """`prediction_logger.py migrate` imports the default legacy log once into the chosen backend only"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("LOG_DIR", raising=False)
+    monkeypatch.delenv("LOG_BACKEND", raising=False)
+    legacy = [{"timestamp": f"2024-01-0{i}T00:00:00", "patient_data": PATIENT, "prediction": i % 2,
+               "probability": 0.5, "risk_level": "🟡 MODERATE"} for i in range(1, 4)]
+    (tmp_path / "prediction_logs").mkdir()
+    with open(tmp_path / "prediction_logs" / "predictions.json", 'w') as f:
+        json.dump(legacy, f)
+
+    _run_cli(monkeypatch, "--backend", backend, "migrate")
+    assert "Migrated 3 predictions" in capsys.readouterr().out
+    _run_cli(monkeypatch, "--backend", backend, "migrate")
+    assert "already migrated" in capsys.readouterr().out
+    _run_cli(monkeypatch, "--backend", backend, "rebuild-stats")
+    assert "over 3 predictions" in capsys.readouterr().out
+    assert set(os.listdir("prediction_logs")) & {"predictions.db", "predictions-000001.jsonl"} == (
+        {"predictions.db"} if backend == "sqlite" else {"predictions-000001.jsonl"})
+
+    logger = PredictionLogger("prediction_logs", backend=backend)
+    assert [entry["timestamp"] for entry in logger.store.iter_entries()] == [entry["timestamp"] for entry in legacy]
+    assert migrate_json_log(os.path.join("prediction_logs", "predictions.json"), logger.store) is None
+    logger.close()
+
+def test_create_store_rejects_unknown_options(tmp_path):
+    """Options are passed to the selected store, so ones it doesn't take fail loudly"""
+    with pytest.raises(TypeError):
+        create_store("sqlite", str(tmp_path), max_segment_bytes=1024)
+    assert create_store("jsonl", str(tmp_path), max_segment_bytes=1024).log.max_segment_bytes == 1024
+
+def test_statistics_survive_restart(tmp_path):
+    """Snapshot plus tail replay gives the same statistics as a full rebuild"""
+    logger = PredictionLogger(str(tmp_path), max_segment_bytes=2000, snapshot_interval=7)
+    for i in range(40):
+        logger.log_prediction(PATIENT, i % 3 == 0, i / 40, ["🟢 LOW", "🟠 HIGH"][i % 2])
+    logger.flush()
+    logger.store.log.close()  # simulate a crash: the last snapshot is stale
+
+    reopened = PredictionLogger(str(tmp_path), max_segment_bytes=2000)
+    stats = reopened.get_statistics()
+    assert stats["total_predictions"] == 40
+    assert stats["positive_cases"] == 14
+    assert stats["risk_level_counts"] == {"🟢 LOW": 20, "🟠 HIGH": 20}
+    assert stats["avg_probability"] == pytest.approx(sum(i / 40 for i in range(40)) / 40)
+
+    rebuilt = reopened.rebuild_statistics()
+    assert rebuilt["total_predictions"] == 40
+    assert rebuilt["std_probability"] == pytest.approx(stats["std_probability"])
+
+def test_background_writer_is_thread_safe(tmp_path):
+    """Concurrent sessions logging through one logger lose no entries"""
+    logger = PredictionLogger(str(tmp_path), max_segment_bytes=4000, batch_size=16)
+
+    def session(n):
+        for i in range(200):
+            logger.log_prediction(PATIENT, (n + i) % 2, 0.5, "🟡 MODERATE")
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    logger.close()
+
+    metrics = logger.metrics()
+    assert metrics["entries_written"] == 1600
+    assert metrics["queue_depth"] == 0
+    assert metrics["avg_batch_size"] >= 1
+    assert PredictionLogger(str(tmp_path)).get_statistics()["total_predictions"] == 1600
+    with open(logger.csv_file) as f:
+        assert len(f.readlines()) == 1601
+
+@pytest.mark.parametrize("backend", ["jsonl", "sqlite"])
+def test_idle_writes_are_fsynced_within_interval(tmp_path, backend):
+    """A lone prediction is fsynced once fsync_interval passes, and close() fsyncs the last batch"""
+    logger = PredictionLogger(str(tmp_path), backend=backend, fsync_interval=0.5)
+    syncs = []
+    store_sync = logger.store.sync
+    logger.store.sync = lambda: (syncs.append(time.monotonic()), store_sync())
+
+    logged_at = time.monotonic()
+    logger.log_prediction(PATIENT, 1, 0.82, "🔴 CRITICAL")
+    deadline = logged_at + 5
+    while not syncs and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert syncs and syncs[0] - logged_at < 2
+    assert logger.metrics()["write_errors"] == 0
+
+    # Written just after that fsync, so only close() makes it durable
+    logger.log_prediction(PATIENT, 0, 0.12, "🟢 LOW")
+    logger.flush()
+    logger.close()
+    assert len(syncs) == 2
+
+def test_sqlite_backend(tmp_path):
+    """SQLite backend keeps the same API and answers filtered queries"""
+    logger = PredictionLogger(str(tmp_path), backend="sqlite")
+    for age in (45, 62, 70):
+        logger.log_prediction(dict(PATIENT, age=age), 1, 0.85, "🔴 CRITICAL")
+    logger.log_prediction(dict(PATIENT, age=66), 0, 0.2, "🟢 LOW")
+    logger.flush()
+
+    stats = logger.get_statistics()
+    assert stats["total_predictions"] == 4
+    assert stats["positive_cases"] == 3
+    assert stats["risk_level_counts"] == {"🔴 CRITICAL": 3, "🟢 LOW": 1}
+
+    rows = logger.store.query(risk_levels=["🔴 CRITICAL"], min_age=60)
+    assert sorted(row["age"] for row in rows) == [62, 70]
+    assert rows[0]["thall"] == PATIENT["thall"]
+    assert logger.store.count(prediction=0) == 1
+    assert logger.store.rebuild_statistics() == stats
+    logger.close()
+
+def test_sqlite_connections_stay_bounded(tmp_path):
+    """Queries from many short-lived threads (one per Streamlit rerun) share a bounded pool of connections"""
+    logger = PredictionLogger(str(tmp_path), backend="sqlite", pool_size=3)
+    logger.log_prediction(PATIENT, 1, 0.85, "🔴 CRITICAL")
+    logger.flush()
+    counts = []
+
+    def rerun():
+        counts.append((logger.store.count(), len(logger.store.query()), len(logger.store.daily_counts())))
+
+    for _ in range(10):
+        threads = [threading.Thread(target=rerun) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert counts == [(1, 1, 1)] * 50
+    assert len(logger.store._connections) <= 3
+    logger.close()
+
+@pytest.mark.parametrize("backend", ["jsonl", "sqlite"])
+def test_outcomes_join_logged_predictions(tmp_path, backend):
+    """Confirmed outcomes are matched to predictions by id; the latest record wins"""
+    logger = PredictionLogger(str(tmp_path), backend=backend, async_writes=False)
+    first = logger.log_prediction(PATIENT, 1, 0.82, "🔴 CRITICAL")
+    logger.log_prediction(PATIENT, 0, 0.12, "🟢 LOW")
+    third = logger.log_prediction(dict(PATIENT, age=70), 0, 0.3, "🟢 LOW")
+    logger.record_outcome(first["id"], 0)
+    logger.record_outcome(third["id"], 1)
+    logger.record_outcome(first["id"], 1)
+    with pytest.raises(ValueError):
+        logger.record_outcome(first["id"], 2)
+
+    labeled = list(logger.labeled_entries())
+    assert [(entry["id"], entry["outcome"]) for entry in labeled] == [(first["id"], 1), (third["id"], 1)]
+    assert labeled[1]["patient_data"]["age"] == 70
+    logger.close()
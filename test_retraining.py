@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from model_store import ModelStore
+from prediction_logger import PredictionLogger
+from retraining import Reservoir, load_state, retrain
+from scoring import FEATURES
+from training import load_dataset
+
+X, y = (frame.to_numpy() for frame in load_dataset())
+
+
+def test_reservoir_is_bounded_and_uniform():
+    reservoir = Reservoir(capacity=100, seed=1)
+    rows = np.arange(2000, dtype=np.float64).repeat(len(FEATURES)).reshape(-1, len(FEATURES))
+    for start in range(0, 2000, 250):
+        reservoir.add(rows[start:start + 250], np.zeros(250, dtype=int))
+    assert len(reservoir) == 100 and reservoir.seen == 2000
+    # Rows from the whole stream survive, not just the first or last batch
+    assert reservoir.X[:, 0].min() < 500 and reservoir.X[:, 0].max() >= 1500
+    assert len(np.unique(reservoir.X[:, 0])) == 100
+    restored = Reservoir.from_dict(reservoir.to_dict())
+    assert np.array_equal(restored.X, reservoir.X) and restored.seen == 2000
+
+
+@pytest.fixture
+def labeled_logger(tmp_path):
+    logger = PredictionLogger(str(tmp_path / "logs"), async_writes=False)
+    for row, outcome in zip(X[-40:], y[-40:]):
+        entry = logger.log_prediction(dict(zip(FEATURES, row.tolist())), 0, 0.3, "🟢 LOW")
+        logger.record_outcome(entry["id"], outcome)
+    yield logger
+    logger.close()
+
+
+@pytest.mark.parametrize("mode, trees", [("add", 120), ("replace", 100)])
+def test_retrain_publishes_new_version(tmp_path, labeled_logger, mode, trees):
+    store = ModelStore(tmp_path / "models")
+    report = retrain(store, labeled_logger, mode=mode, trees=20, log=lambda line: None)
+
+    assert store.active_version() == report["version"]
+    assert report["n_estimators"] == trees and report["new_records"] == 40
+    assert report["full_retrain_seconds"] > 0
+    assert set(report["accuracy"]) >= {"base_holdout", "updated_holdout", "holdout_drift", "full_retrain_holdout"}
+    assert store.metadata(report["version"])["retraining"]["mode"] == mode
+
+    reservoir, used_ids, rounds = load_state(store, report["version"])
+    assert len(used_ids) == 40 and rounds == 1 and reservoir.seen == report["reservoir_rows"] + 40
+    # Nothing new to learn until more outcomes arrive
+    with pytest.raises(ValueError):
+        retrain(store, labeled_logger, mode=mode, log=lambda line: None)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from forest_compiler import compact_forest, load_compiled
+from risk_table import (APP_DOMAIN, RiskLookupTable, TableSizeError, build_risk_table,
+                        parse_domain, sample_subspace)
+
+model = load_compiled('model.pkl')
+
+DOMAIN = parse_domain(["gender=1", "cp=0", "fbs=0", "restecg=1", "exng=0", "slp=2", "caa=0", "thall=2",
+                       "oldpeak=0:1:0.5", "chol=200:240", "trtbps=110:150", "age=40:70",
+                       "thalachh=120:170"])
+table, report = build_risk_table(model, DOMAIN)
+
+def test_table_matches_forest_exactly(tmp_path):
+    assert report["cells"] <= report["full_cells"]
+    X = sample_subspace(DOMAIN, 50_000)
+    assert table.covers(X).all()
+    assert np.array_equal(table.predict_proba(X), model.predict_proba(X))
+    assert np.array_equal(table.predict(X), model.predict(X))
+
+    table.save(tmp_path / "risk_table.npz")
+    loaded = RiskLookupTable.load(tmp_path / "risk_table.npz")
+    assert np.array_equal(loaded.predict_proba(X), model.predict_proba(X))
+
+def test_compact_forest_table_matches(tmp_path):
+    compact = compact_forest(model, value_dtype=np.float64)
+    table, _ = build_risk_table(compact, DOMAIN)
+    X = sample_subspace(DOMAIN, 20_000, seed=1)
+    assert np.array_equal(table.predict_proba(X), compact.predict_proba(X))
+
+def test_rows_outside_subspace_use_fallback():
+    X = sample_subspace({**DOMAIN, "cp": [0, 3], "chol": [150, 220]}, 2_000, seed=2)
+    assert not table.covers(X).all()
+    with pytest.raises(ValueError):
+        table.predict_proba(X)
+    with_fallback = RiskLookupTable(table.thresholds, table.positions, table.codes, table.values,
+                                    table.classes_, fallback=model)
+    assert np.array_equal(with_fallback.predict_proba(X), model.predict_proba(X))
+
+def test_oversized_subspace_rejected():
+    with pytest.raises(TableSizeError, match="bins per feature"):
+        build_risk_table(model, max_cells=1_000_000)
+    with pytest.raises(ValueError):
+        parse_domain(["pressure=1,2"])
+    assert list(parse_domain(["oldpeak=0:0.3:0.1"])["oldpeak"]) == [0.0, 0.1, 0.2, 0.3]
+    assert len(APP_DOMAIN) == model.n_features_in_
@@ -0,0 +1,47 @@
+import json
+import training
+from training import cross_validate, load_dataset, load_metrics, save_metrics, train
+
+PARAMS = {"n_estimators": 10}
+
+
+def test_dataset_is_parsed_once():
+    X, y = load_dataset()
+    assert load_dataset()[0] is X
+    assert X.shape[1] == 13 and set(y.unique()) == {0, 1}
+    assert list(X.columns) == training.COLUMNS[:-1]
+
+
+def test_parallel_folds_match_serial():
+    """Folds trained in worker processes give the same scores as in-process"""
+    X, y = load_dataset()
+    serial = cross_validate(X, y, folds=3, workers=1, params=PARAMS)
+    parallel = cross_validate(X, y, folds=3, workers=2, params=PARAMS)
+    assert [fold["fold"] for fold in parallel] == [0, 1, 2]
+    assert [(f["accuracy"], f["auc"]) for f in serial] == [(f["accuracy"], f["auc"]) for f in parallel]
+    assert sum(fold["test_rows"] for fold in serial) == len(X)
+
+
+def test_train_writes_readable_metrics(tmp_path):
+    model, metrics, (X_train, X_test, _, _) = train(folds=3, workers=1, params=PARAMS, log=lambda line: None)
+    assert model.n_jobs is None
+    assert 0.5 < metrics["accuracy"] <= 1 and 0.5 < metrics["auc"] <= 1
+    assert metrics["test_rows"] == len(X_test) and len(metrics["folds"]) == 3
+    assert metrics["cv"]["folds"] == 3
+
+    path = tmp_path / "metrics.json"
+    save_metrics(metrics, path)
+    assert load_metrics(path) == json.loads(json.dumps(metrics))
+    assert load_metrics(tmp_path / "missing.json") is None
+
+
+def test_main_writes_artifacts_next_to_output(tmp_path):
+    """The first stage follows --output instead of overwriting ./first_stage.json"""
+    before = open("first_stage.json").read()
+    training.main(["--output", str(tmp_path / "model.pkl"), "--metrics", str(tmp_path / "metrics.json"),
+                   "--folds", "0"])
+    assert (tmp_path / "model.pkl").exists() and (tmp_path / "first_stage.json").exists()
+    assert open("first_stage.json").read() == before
+    training.main(["--output", str(tmp_path / "model.pkl"), "--metrics", str(tmp_path / "metrics.json"),
+                   "--folds", "0", "--first-stage", str(tmp_path / "stage.json")])
+    assert json.load(open(tmp_path / "stage.json"))["weights"]
@@ -0,0 +1,39 @@
+import numpy as np
+from training import holdout_split, load_dataset
+from tuning import parameter_grid, split_folds, successive_halving
+
+GRID = {"max_depth": [2, None], "min_samples_leaf": [1, 8], "n_estimators": [9, 27]}
+X_train, _, y_train, _ = holdout_split(*load_dataset())
+
+
+def test_folds_are_stratified_prefixes():
+    folds = split_folds(X_train, y_train, folds=3)
+    assert sum(len(X_test) for _, _, X_test, _ in folds) == len(X_train)
+    for _, y_fold, _, _ in folds:
+        # Every prefix keeps roughly the fold's class balance
+        assert abs(y_fold[:len(y_fold) // 4].mean() - y_fold.mean()) < 0.05
+
+
+def test_successive_halving_keeps_the_best_third():
+    report = successive_halving(X_train, y_train, GRID, folds=3, factor=3, min_budget=1 / 3, workers=1,
+                                log=lambda line: None)
+    assert report["rungs"] == 2
+    first = [entry for entry in report["history"] if entry["rung"] == 0]
+    last = [entry for entry in report["history"] if entry["rung"] == 1]
+    assert len(first) == len(parameter_grid(GRID)) and len(last) == 3
+    ranked = sorted(first, key=lambda entry: -entry["objective"])
+    assert [entry["params"] for entry in last] == [entry["params"] for entry in ranked[:3]]
+    # Early rungs train fewer trees on less data; the last trains the full candidate
+    assert all(entry["n_estimators"] < entry["params"]["n_estimators"] for entry in first
+               if entry["params"]["n_estimators"] == 27)
+    assert all(entry["data_fraction"] == 1 and entry["n_estimators"] == entry["params"]["n_estimators"]
+               for entry in last)
+    assert report["best_params"] == max(last, key=lambda entry: entry["objective"])["params"]
+
+
+def test_parallel_search_matches_serial_accuracy():
+    kwargs = dict(grid=GRID, folds=3, min_budget=1 / 3, log=lambda line: None)
+    serial = successive_halving(X_train, y_train, workers=1, **kwargs)
+    parallel = successive_halving(X_train, y_train, workers=2, **kwargs)
+    assert np.allclose([entry["cv_accuracy"] for entry in serial["history"][:8]],
+                       [entry["cv_accuracy"] for entry in parallel["history"][:8]])
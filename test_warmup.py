@@ -0,0 +1,35 @@
+import json
+import warmup
+
+
+def test_warm_up_publishes_readiness_with_timings(tmp_path):
+    readiness_file = tmp_path / "ready"
+    lines = []
+    assert not warmup.is_ready(readiness_file)
+
+    timings = warmup.warm_up(readiness_file=readiness_file, stages=("model", "inference", "pdf"), log=lines.append)
+
+    assert set(timings) == {"model", "inference", "pdf"}
+    assert warmup.is_ready(readiness_file)
+    report = json.loads(readiness_file.read_text())
+    assert report["stages"] == timings
+    assert report["model_version"]
+    assert any("inference" in line for line in lines)
+
+    warmup.clear_readiness(readiness_file)
+    assert not warmup.is_ready(readiness_file)
+
+
+def test_readiness_from_dead_process_is_not_ready(tmp_path):
+    readiness_file = tmp_path / "ready"
+    readiness_file.write_text(json.dumps({"pid": 2 ** 22 + 1, "stages": {}}))
+    assert not warmup.is_ready(readiness_file)
+
+    readiness_file.write_text("not json")
+    assert not warmup.is_ready(readiness_file)
+
+
+def test_representative_rows_fall_back_without_data(tmp_path):
+    rows = warmup.representative_rows(tmp_path / "missing.csv")
+    assert rows.shape == (len(warmup.EXAMPLE_ROWS), 13)
+    assert warmup.representative_rows(rows=16).shape == (16, 13)
@@ -0,0 +1,320 @@
+"""Training pipeline for the heart disease model.
+
+Usage: python model.py [--folds 5] [--workers N] [--n-jobs -1] [--metrics model_metrics.json]
+                       [--output model.pkl] [--first-stage first_stage.json]
+                       [--search [--latency-weight 0.05]] [--bundle [PATH]] [--publish [MODEL_DIR]]
+
+Cross-validates the forest with stratified k-fold (folds trained in
+parallel worker processes), fits the final model on the training split
+with n_jobs threads, and writes model.pkl plus a JSON metrics file the
+apps read for their accuracy figures. With --search the forest's
+hyperparameters are first tuned by successive halving (see tuning.py).
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from dataset import COLUMNS, DATA_PATH, load_frame
+
+METRICS_FILE = 'model_metrics.json'
+# Forest settings used by the apps' model
+DEFAULT_PARAMS = {"n_estimators": 100, "random_state": 42}
+TEST_SIZE = 0.2
+SPLIT_SEED = 42
+
+
+def clean_frame(data):
+    """Features and binary target from raw rows: rows with missing values ('?') dropped, any diagnosis > 0 is 1"""
+    data = data.replace('?', pd.NA).dropna()
+    X = data.drop('target', axis=1).apply(pd.to_numeric)
+    y = (data['target'].astype(float) != 0).astype(int)
+    return X, y
+
+
+@lru_cache(maxsize=4)
+def _parse_dataset(path, mtime_ns, size):
+    data = load_frame(path)
+    return data.drop('target', axis=1), (data['target'] != 0).astype(int)
+
+
+def load_dataset(path=DATA_PATH):
+    """Features and binary target from the CSV's binary column cache (see dataset.py).
+
+    The frames are also cached per process by path, modification time and
+    size, so repeated training runs (and forked fold workers) reuse them;
+    editing the file invalidates both caches. Treat the result as read-only.
+    """
+    stat = os.stat(path)
+    return _parse_dataset(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def holdout_split(X, y):
+    """The 80/20 train/test split the reported accuracy is measured on"""
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(X, y, test_size=TEST_SIZE, random_state=SPLIT_SEED)
+
+
+# Training data of a fold worker process, set once by the pool initializer
+_fold_data = None
+
+
+def _init_fold_worker(X, y):
+    global _fold_data
+    _fold_data = (X, y)
+
+
+def _fit_fold(fold, train_index, test_index, params):
+    """Train and score one fold; returns its metrics and timings"""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, roc_auc_score
+
+    X, y = _fold_data
+    start = time.perf_counter()
+    model = RandomForestClassifier(**params).fit(X.iloc[train_index], y.iloc[train_index])
+    fit_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    proba = model.predict_proba(X.iloc[test_index])[:, 1]
+    score_seconds = time.perf_counter() - start
+    y_test = y.iloc[test_index]
+    return {
+        "fold": fold,
+        "accuracy": float(accuracy_score(y_test, (proba > 0.5).astype(int))),
+        "auc": float(roc_auc_score(y_test, proba)),
+        "train_rows": len(train_index),
+        "test_rows": len(test_index),
+        "fit_seconds": fit_seconds,
+        "score_seconds": score_seconds,
+    }
+
+
+def cross_validate(X, y, folds=5, workers=None, params=None, random_state=SPLIT_SEED):
+    """Stratified k-fold cross-validation with the folds trained in parallel.
+
+    Up to `workers` processes (default: all cores, at most one per fold)
+    each train whole folds; cores left over are given to each fold's
+    forest as n_jobs threads. Returns one metrics dict per fold, in order.
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    cores = os.cpu_count() or 1
+    workers = min(workers or cores, folds)
+    params = {**DEFAULT_PARAMS, **(params or {}), "n_jobs": max(1, cores // workers)}
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state).split(X, y))
+
+    if workers == 1:
+        _init_fold_worker(X, y)
+        return [_fit_fold(fold, train, test, params) for fold, (train, test) in enumerate(splits)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_fold_worker, initargs=(X, y)) as pool:
+        futures = [pool.submit(_fit_fold, fold, train, test, params) for fold, (train, test) in enumerate(splits)]
+        return [future.result() for future in futures]
+
+
+def train(data_path=DATA_PATH, folds=5, workers=None, n_jobs=-1, params=None, log=print):
+    """Cross-validate, then fit and evaluate the final model on the holdout split.
+
+    Returns (model, metrics, (X_train, X_test, y_train, y_test)). The
+    final forest is fitted with n_jobs threads but saved with n_jobs unset,
+    so the apps' single-patient predictions don't pay for a thread pool.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, roc_auc_score
+    from forest_compiler import compile_forest
+    from tuning import single_row_latency
+
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    X, y = load_dataset(data_path)
+    X_train, X_test, y_train, y_test = holdout_split(X, y)
+
+    fold_metrics = []
+    cv_seconds = 0.0
+    if folds > 1:
+        log(f"🔁 Cross-validating with {folds} stratified folds...")
+        start = time.perf_counter()
+        fold_metrics = cross_validate(X_train, y_train, folds, workers, params)
+        cv_seconds = time.perf_counter() - start
+        for fold in fold_metrics:
+            log(f"   Fold {fold['fold'] + 1}: accuracy {fold['accuracy']:.2%}, AUC {fold['auc']:.3f} "
+                f"({fold['fit_seconds']:.2f}s)")
+
+    log("💪 Training Random Forest model...")
+    start = time.perf_counter()
+    model = RandomForestClassifier(**params, n_jobs=n_jobs).fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    model.set_params(n_jobs=None)
+
+    log("📊 Evaluating model...")
+    proba = model.predict_proba(X_test)[:, 1]
+    metrics = {
+        "accuracy": float(accuracy_score(y_test, model.predict(X_test))),
+        "auc": float(roc_auc_score(y_test, proba)),
+        "latency_ms": single_row_latency(compile_forest(model), X_test.to_numpy()) * 1000,
+        "n_estimators": model.n_estimators,
+        "params": params,
+        "train_rows": len(X_train),
+        "test_rows": len(X_test),
+        "fit_seconds": fit_seconds,
+        "n_jobs": n_jobs,
+        "cv": None,
+        "folds": fold_metrics,
+        "trained_at": time.time(),
+    }
+    if fold_metrics:
+        accuracy = np.array([fold["accuracy"] for fold in fold_metrics])
+        auc = np.array([fold["auc"] for fold in fold_metrics])
+        metrics["cv"] = {
+            "folds": folds,
+            "workers": min(workers or os.cpu_count() or 1, folds),
+            "accuracy_mean": float(accuracy.mean()),
+            "accuracy_std": float(accuracy.std()),
+            "auc_mean": float(auc.mean()),
+            "auc_std": float(auc.std()),
+            "wall_seconds": cv_seconds,
+        }
+    return model, metrics, (X_train, X_test, y_train, y_test)
+
+
+def save_metrics(metrics, path=METRICS_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(metrics, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_metrics(path=METRICS_FILE, registry=None):
+    """Metrics of the served model, or None if there aren't any.
+
+    With a versioned model directory (registry.store, set by MODEL_DIR)
+    they are the published metadata of the version the registry serves;
+    otherwise the file written by the last training run.
+    """
+    if registry is not None and registry.store is not None:
+        version = registry.active_version or registry.store.active_version()
+        if version is None:
+            return None
+        try:
+            return registry.store.metadata(version)
+        except (FileNotFoundError, ValueError):
+            return None
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+# Beautiful heart ASCII art
+HEART_BANNER = """
+    ❤️  ❤️  ❤️  HEART DISEASE PREDICTION MODEL  ❤️  ❤️  ❤️
+
+       ♥ Training with Love and Science ♥
+"""
+
+
+def main(argv=None):
+    import joblib
+    from cascade import DEFAULT_BAND, CascadeModel, LinearStage, cascade_report
+    from forest_compiler import compile_forest
+    from model_store import ModelStore
+    from scoring import FEATURES
+
+    parser = argparse.ArgumentParser(description="Train the heart disease model")
+    parser.add_argument("--data", default=DATA_PATH, help=f"Training CSV (default: {DATA_PATH})")
+    parser.add_argument("--output", default="model.pkl", help="Model artifact to write (default: model.pkl)")
+    parser.add_argument("--metrics", default=METRICS_FILE, help=f"Metrics JSON to write (default: {METRICS_FILE})")
+    parser.add_argument("--folds", type=int, default=5, help="Cross-validation folds (0 or 1 to skip; default: 5)")
+    parser.add_argument("--workers", type=int, default=None, help="Processes training folds (default: all cores)")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Threads fitting the final forest (default: -1, all)")
+    parser.add_argument("--search", action="store_true",
+                        help="tune max_depth, max_features, min_samples_leaf and n_estimators by successive halving "
+                             "before training")
+    parser.add_argument("--latency-weight", type=float, default=None, metavar="WEIGHT",
+                        help="accuracy traded per millisecond of single-row latency in the search objective "
+                             "(default: 0.05)")
+    parser.add_argument("--bundle", nargs="?", const="model.bundle", default=None,
+                        help="also save a memory-mappable forest bundle (default path: model.bundle)")
+    parser.add_argument("--first-stage", default=None, metavar="PATH",
+                        help="cascade first-stage model to write (default: first_stage.json next to --output)")
+    parser.add_argument("--band", nargs=2, type=float, default=DEFAULT_BAND, metavar=("LOW", "HIGH"),
+                        help="first-stage probability band sent on to the forest in the cascade report")
+    parser.add_argument("--publish", nargs="?", const=os.environ.get("MODEL_DIR", "models"), default=None,
+                        metavar="MODEL_DIR", help="also publish the model as a new active version in a versioned "
+                                                  "model directory (default: $MODEL_DIR or models)")
+    args = parser.parse_args(argv)
+    first_stage_path = args.first_stage or os.path.join(os.path.dirname(args.output), 'first_stage.json')
+
+    print(HEART_BANNER)
+    print("❤️  Loading heart disease data...")
+    start = time.perf_counter()
+    search = None
+    if args.search:
+        from tuning import LATENCY_WEIGHT, successive_halving
+
+        latency_weight = LATENCY_WEIGHT if args.latency_weight is None else args.latency_weight
+        print("🔎 Searching hyperparameters by successive halving...")
+        X, y = load_dataset(args.data)
+        X_search, _, y_search, _ = holdout_split(X, y)
+        search = successive_halving(X_search, y_search, folds=max(args.folds, 2), workers=args.workers,
+                                    latency_weight=latency_weight)
+        best = search["best"]
+        print(f"   Best: {best['params']} (CV accuracy {best['cv_accuracy']:.2%}, {best['latency_ms']:.3f} ms/row; "
+              f"{search['evaluations']} evaluations in {search['seconds']:.1f}s)")
+    model, metrics, (X_train, X_test, y_train, y_test) = train(args.data, args.folds, args.workers, args.n_jobs,
+                                                                search and search["best_params"])
+    if search:
+        metrics["search"] = {key: value for key, value in search.items() if key != "history"}
+    elapsed = time.perf_counter() - start
+
+    print("\n" + "="*60)
+    print(f"✨ Model Training Complete! ✨")
+    print(f"❤️  Accuracy: {metrics['accuracy']:.2%}   AUC: {metrics['auc']:.3f}   "
+          f"Latency: {metrics['latency_ms']:.3f} ms/row")
+    if metrics["cv"]:
+        cv = metrics["cv"]
+        print(f"🔁 Cross-validated accuracy: {cv['accuracy_mean']:.2%} ± {cv['accuracy_std']:.2%} "
+              f"({cv['folds']} folds on {cv['workers']} worker(s), {cv['wall_seconds']:.2f}s)")
+    print(f"⏱️  Total training time: {elapsed:.2f}s")
+    print("="*60)
+
+    # Save model (to a temporary file renamed into place, so running apps never load half a pickle)
+    print("💾 Saving model...")
+    joblib.dump(model, f"{args.output}.tmp")
+    os.replace(f"{args.output}.tmp", args.output)
+    save_metrics(metrics, args.metrics)
+    print(f"✅ Model saved as '{args.output}', metrics as '{args.metrics}'!\n")
+
+    # Cheap first stage for the cascade
+    print("⚡ Training calibrated logistic regression first stage...")
+    first_stage = LinearStage.fit(X_train, y_train)
+    first_stage.save(first_stage_path)
+    report = cascade_report(CascadeModel(first_stage, compile_forest(model), tuple(args.band)), X_test, y_test)
+    print(f"   Band {report['band'][0]:.2f}-{report['band'][1]:.2f}: first stage handles "
+          f"{report['first_stage_fraction']:.1%} of test patients, forest {report['forest_fraction']:.1%}")
+    print(f"   Accuracy: forest {report['forest_accuracy']:.2%}, cascade {report['cascade_accuracy']:.2%}, "
+          f"first stage alone {report['first_stage_accuracy']:.2%}")
+    print(f"✅ First stage saved as '{first_stage_path}'!\n")
+
+    if args.bundle:
+        compile_forest(model).save(args.bundle)
+        print(f"✅ Memory-mappable bundle saved as '{args.bundle}'!\n")
+
+    if args.publish:
+        version = ModelStore(args.publish).publish(args.output, {
+            "accuracy": metrics["accuracy"],
+            "auc": metrics["auc"],
+            "cv": metrics["cv"],
+            "n_estimators": model.n_estimators,
+            "train_rows": len(X_train),
+            "test_rows": len(X_test),
+            "training_columns": list(X_train.columns),
+            "feature_schema": FEATURES,
+        })
+        print(f"✅ Published model version '{version}' to '{args.publish}'!\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from training import SPLIT_SEED
+
+# Hyperparameters searched by default
+PARAM_GRID = {
+    "max_depth": [None, 4, 8],
+    "max_features": ["sqrt", "log2", 0.5],
+    "min_samples_leaf": [1, 2, 4],
+    "n_estimators": [50, 100, 200],
+}
+# Accuracy given up per millisecond of single-row latency in the objective
+LATENCY_WEIGHT = 0.05
+# Single-row predictions timed per candidate
+LATENCY_ROWS = 100
+
+
+def parameter_grid(grid=PARAM_GRID):
+    """Every combination of the grid's values, as parameter dicts"""
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def _stratified_order(y, rng):
+    """Training indices shuffled and interleaved by class, so every prefix keeps the class balance"""
+    by_class = [rng.permutation(np.flatnonzero(y == label)) for label in np.unique(y)]
+    position = np.concatenate([(np.arange(len(index)) + 0.5) / len(index) for index in by_class])
+    return np.concatenate(by_class)[np.argsort(position, kind="stable")]
+
+
+def split_folds(X, y, folds=5, random_state=SPLIT_SEED):
+    """Pre-split stratified folds as contiguous arrays.
+
+    Each fold is (X_train, y_train, X_test, y_test) with the training rows
+    in stratified-shuffled order, so a data subset is just a prefix of
+    them: no re-splitting or copying per candidate.
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    y = np.asarray(y).astype(int)
+    rng = np.random.default_rng(random_state)
+    cached = []
+    for train, test in StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state).split(X, y):
+        train = train[_stratified_order(y[train], rng)]
+        cached.append((X[train], y[train], X[test], y[test]))
+    return cached
+
+
+def single_row_latency(forest, rows):
+    """Median seconds for one single-row predict_proba call, the way the apps score patients"""
+    times = []
+    for row in rows:
+        start = time.perf_counter()
+        forest.predict_proba(row.reshape(1, -1))
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def _budgeted(params, budget, min_trees):
+    """Candidate parameters with its tree count scaled down to the rung's budget"""
+    n_estimators = params.get("n_estimators", 100)
+    return {**params, "n_estimators": min(n_estimators, max(min_trees, int(round(n_estimators * budget))))}
+
+
+# Cached folds of a search worker process, set once by the pool initializer
+_folds = None
+
+
+def _init_search_worker(folds):
+    global _folds
+    _folds = folds
+
+
+def _evaluate(params, budget, min_trees, min_fraction, random_state):
+    """Cross-validated accuracy and single-row latency of one candidate at one budget"""
+    from sklearn.ensemble import RandomForestClassifier
+    from forest_compiler import compile_forest
+
+    params = _budgeted(params, budget, min_trees)
+    fraction = max(min_fraction, budget)
+    accuracies = []
+    latency = None
+    for X_train, y_train, X_test, y_test in _folds:
+        rows = max(2, int(round(len(X_train) * fraction)))
+        model = RandomForestClassifier(**params, random_state=random_state, n_jobs=1)
+        forest = compile_forest(model.fit(X_train[:rows], y_train[:rows]))
+        accuracies.append(float(np.mean(forest.predict(X_test) == y_test)))
+        if latency is None:
+            latency = single_row_latency(forest, X_test[:LATENCY_ROWS])
+    return float(np.mean(accuracies)), latency
+
+
+def successive_halving(X, y, grid=PARAM_GRID, folds=5, factor=3, min_budget=1 / 9, min_trees=10, min_fraction=0.25,
+                       latency_weight=LATENCY_WEIGHT, workers=None, random_state=SPLIT_SEED, log=print):
+    """Search forest hyperparameters by successive halving on a combined objective.
+
+    Every candidate in the grid starts on a small budget: min_budget of its
+    trees (at least min_trees) trained on a stratified subset of each
+    training fold (at least min_fraction). After each rung the best
+    1/factor of the candidates survive and the budget grows factor-fold,
+    until the last rung trains full-size forests on the full folds. Folds
+    are split once and cached in each worker process, and a rung's
+    candidates are evaluated in parallel. The objective is
+
+        cv_accuracy - latency_weight * single_row_latency_ms
+
+    with latency measured on the compiled forest the apps serve, so a
+    smaller, faster forest wins unless a larger one is clearly more
+    accurate. Returns a report with the best parameters and every
+    evaluation made.
+    """
+    candidates = parameter_grid(grid) if isinstance(grid, dict) else list(grid)
+    rungs = 1 + min(math.ceil(math.log(len(candidates), factor)) if len(candidates) > 1 else 0,
+                    int(math.floor(math.log(1 / min_budget, factor) + 1e-9)))
+    cached = split_folds(X, y, folds, random_state)
+    workers = min(workers or os.cpu_count() or 1, len(candidates))
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_search_worker, initargs=(cached,))
+    else:
+        _init_search_worker(cached)
+    history = []
+    start = time.perf_counter()
+
+    try:
+        for rung in range(rungs):
+            budget = float(factor) ** (rung - rungs + 1)
+            rung_start = time.perf_counter()
+            if pool is None:
+                results = [_evaluate(params, budget, min_trees, min_fraction, random_state) for params in candidates]
+            else:
+                futures = [pool.submit(_evaluate, params, budget, min_trees, min_fraction, random_state)
+                           for params in candidates]
+                results = [future.result() for future in futures]
+
+            scored = []
+            for params, (accuracy, latency) in zip(candidates, results):
+                scored.append({
+                    "rung": rung,
+                    "params": params,
+                    "budget": budget,
+                    "n_estimators": _budgeted(params, budget, min_trees)["n_estimators"],
+                    "data_fraction": max(min_fraction, budget),
+                    "cv_accuracy": accuracy,
+                    "latency_ms": latency * 1000,
+                    "objective": accuracy - latency_weight * latency * 1000,
+                })
+            history.extend(scored)
+            scored.sort(key=lambda entry: -entry["objective"])
+            log(f"   Rung {rung + 1}/{rungs}: {len(candidates)} candidate(s) at {budget:.0%} budget "
+                f"({time.perf_counter() - rung_start:.1f}s); best: accuracy {scored[0]['cv_accuracy']:.2%}, "
+                f"{scored[0]['latency_ms']:.3f} ms")
+            candidates = [entry["params"] for entry in scored[:math.ceil(len(scored) / factor)]]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    best = scored[0]
+    return {
+        "best_params": best["params"],
+        "best": best,
+        "latency_weight": latency_weight,
+        "factor": factor,
+        "folds": folds,
+        "rungs": rungs,
+        "evaluations": len(history),
+        "seconds": time.perf_counter() - start,
+        "history": history,
+    }